@@ -2,10 +2,33 @@
 # Based on: https://github.com/adafruit/Adafruit-GFX-Library
 # Author: Tony DiCola (original GFX author Phil Burgess)
 # License: MIT License (https://opensource.org/licenses/MIT)
+#
+# Every primitive is clipped to the width x height drawing area before it
+# reaches the pixel, hline and vline functions: lines by Cohen-Sutherland
+# region codes, fills span by span and circles octant by octant, so only
+# visible pixels and spans are drawn.
+
+try:
+    import framebuf
+except ImportError:
+    # No native drawing, every primitive uses the Python versions below.
+    framebuf = None
+
+# Cohen-Sutherland region codes
+_LEFT = 1
+_RIGHT = 2
+_TOP = 4
+_BOTTOM = 8
+
+# Octants of a circle as (x sign, y sign, x and y swapped) of the points
+# drawn from the first octant's (x, y)
+_OCTANTS = ((1, 1, False), (-1, 1, False), (1, -1, False), (-1, -1, False),
+            (1, 1, True), (-1, 1, True), (1, -1, True), (-1, -1, True))
+
 
 class GFX:
 
-    def __init__(self, width, height, pixel, hline=None, vline=None):
+    def __init__(self, width, height, pixel, hline=None, vline=None, framebuffer=None):
         # Create an instance of the GFX drawing class.  You must pass in the
         # following parameters:
         #  - width = The width of the drawing area in pixels.
@@ -21,61 +44,146 @@ class GFX:
         #  - vline = A function to quickly draw a vertical line on the display.
         #            This should take at least an x, y, and height paraemter and
         #            any number of optional color or other parameters.
+        #  - framebuffer = A framebuf.FrameBuffer (e.g. an SSD1306 display) to
+        #            draw lines, rectangles and circles with its native
+        #            methods instead of one Python call per pixel.  It is
+        #            found automatically when pixel is a FrameBuffer's bound
+        #            pixel method; pass False to always use Python drawing.
         self.width = width
         self.height = height
         self._pixel = pixel
         # Default to slow horizontal & vertical line implementations if no
-        # faster versions are provided.
+        # faster versions are provided.  hline() and vline() clip the span
+        # and then call these.
         if hline is None:
-            self.hline = self._slow_hline
+            self._hline = self._slow_hline
         else:
-            self.hline = hline
+            self._hline = hline
         if vline is None:
-            self.vline = self._slow_vline
+            self._vline = self._slow_vline
         else:
-            self.vline = vline
+            self._vline = vline
+        # Route primitives the framebuffer has natively to it.
+        if framebuffer is None:
+            framebuffer = _framebuffer_of(pixel)
+        self.framebuffer = framebuffer or None
+        self._ellipse = None
+        if self.framebuffer is not None:
+            self._hline = self.framebuffer.hline
+            self._vline = self.framebuffer.vline
+            # ellipse() is only in MicroPython 1.20 and later
+            self._ellipse = getattr(self.framebuffer, 'ellipse', None)
+
+    def _native_colour(self, args, kwargs):
+        # The colour for a native framebuf call: the first optional
+        # parameter, or a color (or framebuf's c) keyword.  None without a
+        # framebuffer or a colour, the primitive is then drawn through
+        # pixel, hline and vline as it would be without native dispatch.
+        if self.framebuffer is None:
+            return None
+        if args:
+            return args[0]
+        return kwargs.get('color', kwargs.get('c'))
 
     def _slow_hline(self, x0, y0, width, *args, **kwargs):
         # Slow implementation of a horizontal line using pixel drawing.
         # This is used as the default horizontal line if no faster override
-        # is provided.
-        if y0 < 0 or y0 > self.height or x0 < -width or x0 > self.width:
-            return
+        # is provided.  The span arrives clipped by hline().
         for i in range(width):
             self._pixel(x0+i, y0, *args, **kwargs)
 
     def _slow_vline(self, x0, y0, height, *args, **kwargs):
         # Slow implementation of a vertical line using pixel drawing.
         # This is used as the default vertical line if no faster override
-        # is provided.
-        if y0 < -height or y0 > self.height or x0 < 0 or x0 > self.width:
-            return
+        # is provided.  The span arrives clipped by vline().
         for i in range(height):
             self._pixel(x0, y0+i, *args, **kwargs)
 
+    def _outcode(self, x, y):
+        # Cohen-Sutherland region code of a point, 0 when it is on screen.
+        code = 0
+        if x < 0:
+            code = _LEFT
+        elif x >= self.width:
+            code = _RIGHT
+        if y < 0:
+            code |= _TOP
+        elif y >= self.height:
+            code |= _BOTTOM
+        return code
+
+    def hline(self, x0, y0, width, *args, **kwargs):
+        # Horizontal line clipped to the drawing area.
+        if y0 < 0 or y0 >= self.height:
+            return
+        if x0 < 0:
+            width += x0
+            x0 = 0
+        if x0 + width > self.width:
+            width = self.width - x0
+        if width > 0:
+            self._hline(x0, y0, width, *args, **kwargs)
+
+    def vline(self, x0, y0, height, *args, **kwargs):
+        # Vertical line clipped to the drawing area.
+        if x0 < 0 or x0 >= self.width:
+            return
+        if y0 < 0:
+            height += y0
+            y0 = 0
+        if y0 + height > self.height:
+            height = self.height - y0
+        if height > 0:
+            self._vline(x0, y0, height, *args, **kwargs)
+
     def rect(self, x0, y0, width, height, *args, **kwargs):
         # Rectangle drawing function.  Will draw a single pixel wide rectangle
         # starting in the upper left x0, y0 position and width, height pixels in
         # size.
-        if y0 < -height or y0 > self.height or x0 < -width or x0 > self.width:
+        if width < 1 or height < 1 or x0 >= self.width or y0 >= self.height or \
+                x0 + width <= 0 or y0 + height <= 0:
+            return
+        c = self._native_colour(args, kwargs)
+        if c is not None:
+            self.framebuffer.rect(x0, y0, width, height, c)
             return
         self.hline(x0, y0, width, *args, **kwargs)
-        self.hline(x0, y0+height-1, width, *args, **kwargs)
-        self.vline(x0, y0, height, *args, **kwargs)
-        self.vline(x0+width-1, y0, height, *args, **kwargs)
+        if height > 1:
+            self.hline(x0, y0+height-1, width, *args, **kwargs)
+        if height > 2:
+            self.vline(x0, y0+1, height-2, *args, **kwargs)
+            if width > 1:
+                self.vline(x0+width-1, y0+1, height-2, *args, **kwargs)
 
     def fill_rect(self, x0, y0, width, height, *args, **kwargs):
         # Filled rectangle drawing function.  Will draw a single pixel wide
         # rectangle starting in the upper left x0, y0 position and width, height
-        # pixels in size.
-        if y0 < -height or y0 > self.height or x0 < -width or x0 > self.width:
+        # pixels in size.  Clipped once, then one span per visible column.
+        x1 = min(x0 + width, self.width)
+        y1 = min(y0 + height, self.height)
+        x0 = max(x0, 0)
+        y0 = max(y0, 0)
+        if x0 >= x1 or y0 >= y1:
             return
-        for i in range(x0, x0+width):
-            self.vline(i, y0, height, *args, **kwargs)
+        c = self._native_colour(args, kwargs)
+        if c is not None:
+            self.framebuffer.fill_rect(x0, y0, x1-x0, y1-y0, c)
+            return
+        for i in range(x0, x1):
+            self._vline(i, y0, y1-y0, *args, **kwargs)
 
     def line(self, x0, y0, x1, y1, *args, **kwargs):
         # Line drawing function.  Will draw a single pixel wide line starting at
         # x0, y0 and ending at x1, y1.
+        code0 = self._outcode(x0, y0)
+        code1 = self._outcode(x1, y1)
+        if code0 & code1:
+            # both ends beyond the same edge
+            return
+        c = self._native_colour(args, kwargs)
+        if c is not None:
+            self.framebuffer.line(x0, y0, x1, y1, c)
+            return
         steep = abs(y1 - y0) > abs(x1 - x0)
         if steep:
             x0, y0 = y0, x0
@@ -91,11 +199,52 @@ class GFX:
             ystep = 1
         else:
             ystep = -1
-        while x0 <= x1:
-            if steep:
-                self._pixel(y0, x0, *args, **kwargs)
-            else:
-                self._pixel(x0, y0, *args, **kwargs)
+
+        if not (code0 | code1):
+            # Entirely on screen.
+            while x0 <= x1:
+                if steep:
+                    self._pixel(y0, x0, *args, **kwargs)
+                else:
+                    self._pixel(x0, y0, *args, **kwargs)
+                err -= dy
+                if err < 0:
+                    y0 += ystep
+                    err += dx
+                x0 += 1
+            return
+
+        # Clip the run along x (the long axis) to the screen, and the start
+        # to where y enters it.  Bresenham's state at any step k follows
+        # from the start, so the line is picked up exactly where it would
+        # have been and the visible pixels don't move.
+        if steep:
+            x_max = self.height - 1
+            y_max = self.width - 1
+        else:
+            x_max = self.width - 1
+            y_max = self.height - 1
+        end = min(x1, x_max)
+        k = max(0, -x0)
+        # y changes in more than m - 1 steps once k * dy > (m - 1) * dx + err
+        if ystep > 0 and y0 < 0:
+            k = max(k, ((-y0 - 1) * dx + err) // dy + 1)
+        elif ystep < 0 and y0 > y_max:
+            k = max(k, ((y0 - y_max - 1) * dx + err) // dy + 1)
+        if k:
+            n = -((err - k * dy) // dx) if k * dy > err else 0
+            x0 += k
+            y0 += ystep * n
+            err = err - k * dy + n * dx
+        while x0 <= end:
+            if 0 <= y0 <= y_max:
+                if steep:
+                    self._pixel(y0, x0, *args, **kwargs)
+                else:
+                    self._pixel(x0, y0, *args, **kwargs)
+            elif (y0 > y_max) == (ystep > 0):
+                # left the screen for good
+                return
             err -= dy
             if err < 0:
                 y0 += ystep
@@ -105,16 +254,69 @@ class GFX:
     def circle(self, x0, y0, radius, *args, **kwargs):
         # Circle drawing function.  Will draw a single pixel wide circle with
         # center at x0, y0 and the specified radius.
+        width = self.width
+        height = self.height
+        if x0 + radius < 0 or x0 - radius >= width or y0 + radius < 0 or y0 - radius >= height:
+            return
+        c = self._native_colour(args, kwargs)
+        if c is not None and self._ellipse is not None:
+            self._ellipse(x0, y0, radius, radius, c)
+            return
         f = 1 - radius
         ddF_x = 1
         ddF_y = -2 * radius
         x = 0
         y = radius
-        self._pixel(x0, y0 + radius, *args, **kwargs)
-        self._pixel(x0, y0 - radius, *args, **kwargs)
-        self._pixel(x0 + radius, y0, *args, **kwargs)
-        self._pixel(x0 - radius, y0, *args, **kwargs)
-        while x < y:
+
+        if x0 - radius >= 0 and x0 + radius < width and y0 - radius >= 0 and y0 + radius < height:
+            # Entirely on screen.
+            self._pixel(x0, y0 + radius, *args, **kwargs)
+            self._pixel(x0, y0 - radius, *args, **kwargs)
+            self._pixel(x0 + radius, y0, *args, **kwargs)
+            self._pixel(x0 - radius, y0, *args, **kwargs)
+            while x < y:
+                if f >= 0:
+                    y -= 1
+                    ddF_y += 2
+                    f += ddF_y
+                x += 1
+                ddF_x += 2
+                f += ddF_x
+                self._pixel(x0 + x, y0 + y, *args, **kwargs)
+                self._pixel(x0 - x, y0 + y, *args, **kwargs)
+                self._pixel(x0 + x, y0 - y, *args, **kwargs)
+                self._pixel(x0 - x, y0 - y, *args, **kwargs)
+                self._pixel(x0 + y, y0 + x, *args, **kwargs)
+                self._pixel(x0 - y, y0 + x, *args, **kwargs)
+                self._pixel(x0 + y, y0 - x, *args, **kwargs)
+                self._pixel(x0 - y, y0 - x, *args, **kwargs)
+            return
+
+        for px, py in ((x0, y0 + radius), (x0, y0 - radius), (x0 + radius, y0), (x0 - radius, y0)):
+            if 0 <= px < width and 0 <= py < height:
+                self._pixel(px, py, *args, **kwargs)
+
+        # Octant culling.  In the first octant x runs from 1 to about
+        # 0.71 * radius and y from radius down to about the same, so each
+        # octant's arc lies in a known box.  Octants whose box misses the
+        # screen are dropped, and only those that cross an edge check
+        # their pixels.
+        near = radius * 2 // 3
+        far = radius * 3 // 4 + 1
+        octants = []
+        for sx, sy, swap in _OCTANTS:
+            if swap:
+                ax0, ax1, ay0, ay1 = near, radius, 0, far
+            else:
+                ax0, ax1, ay0, ay1 = 0, far, near, radius
+            left, right = (x0 + ax0, x0 + ax1) if sx > 0 else (x0 - ax1, x0 - ax0)
+            top, bottom = (y0 + ay0, y0 + ay1) if sy > 0 else (y0 - ay1, y0 - ay0)
+            if right < 0 or left >= width or bottom < 0 or top >= height:
+                continue
+            check = left < 0 or right >= width or top < 0 or bottom >= height
+            octants.append((sx, sy, swap, check))
+
+        while octants and x < y:
             if f >= 0:
                 y -= 1
                 ddF_y += 2
@@ -122,18 +324,26 @@ class GFX:
             x += 1
             ddF_x += 2
             f += ddF_x
-            self._pixel(x0 + x, y0 + y, *args, **kwargs)
-            self._pixel(x0 - x, y0 + y, *args, **kwargs)
-            self._pixel(x0 + x, y0 - y, *args, **kwargs)
-            self._pixel(x0 - x, y0 - y, *args, **kwargs)
-            self._pixel(x0 + y, y0 + x, *args, **kwargs)
-            self._pixel(x0 - y, y0 + x, *args, **kwargs)
-            self._pixel(x0 + y, y0 - x, *args, **kwargs)
-            self._pixel(x0 - y, y0 - x, *args, **kwargs)
+            for sx, sy, swap, check in octants:
+                if swap:
+                    px = x0 + sx * y
+                    py = y0 + sy * x
+                else:
+                    px = x0 + sx * x
+                    py = y0 + sy * y
+                if check and not (0 <= px < width and 0 <= py < height):
+                    continue
+                self._pixel(px, py, *args, **kwargs)
 
     def fill_circle(self, x0, y0, radius, *args, **kwargs):
         # Filled circle drawing function.  Will draw a filled circule with
         # center at x0, y0 and the specified radius.
+        if x0 + radius < 0 or x0 - radius >= self.width or y0 + radius < 0 or y0 - radius >= self.height:
+            return
+        c = self._native_colour(args, kwargs)
+        if c is not None and self._ellipse is not None:
+            self._ellipse(x0, y0, radius, radius, c, True)
+            return
         self.vline(x0, y0 - radius, 2*radius + 1, *args, **kwargs)
         f = 1 - radius
         ddF_x = 1
@@ -162,7 +372,8 @@ class GFX:
 
     def fill_triangle(self, x0, y0, x1, y1, x2, y2, *args, **kwargs):
         # Filled triangle drawing function.  Will draw a filled triangle around
-        # the points (x0, y0), (x1, y1), and (x2, y2).
+        # the points (x0, y0), (x1, y1), and (x2, y2).  Only rows on screen
+        # are walked, each span clipped by hline().
         if y0 > y1:
             y0, y1 = y1, y0
             x0, x1 = x1, x0
@@ -172,6 +383,8 @@ class GFX:
         if y0 > y1:
             y0, y1 = y1, y0
             x0, x1 = x1, x0
+        if y2 < 0 or y0 >= self.height or max(x0, x1, x2) < 0 or min(x0, x1, x2) >= self.width:
+            return
         a = 0
         b = 0
         y = 0
@@ -201,13 +414,15 @@ class GFX:
             dy02 = 1
         if dy12 == 0:
             dy12 = 1
-        sa = 0
-        sb = 0
         if y1 == y2:
             last = y1
         else:
             last = y1-1
-        for y in range(y0, last+1):
+        # Upper part, rows y0 to last, edges 0-1 and 0-2.
+        y = max(y0, 0)
+        sa = dx01 * (y - y0)
+        sb = dx02 * (y - y0)
+        for y in range(y, min(last, self.height - 1) + 1):
             a = x0 + sa // dy01
             b = x0 + sb // dy02
             sa += dx01
@@ -215,9 +430,11 @@ class GFX:
             if a > b:
                 a, b = b, a
             self.hline(a, y, b-a+1, *args, **kwargs)
+        # Lower part, rows last + 1 to y2, edges 1-2 and 0-2.
+        y = max(last + 1, 0)
         sa = dx12 * (y - y1)
         sb = dx02 * (y - y0)
-        while y <= y2:
+        while y <= y2 and y < self.height:
             a = x1 + sa // dy12
             b = x0 + sb // dy02
             sa += dx12
@@ -226,3 +443,17 @@ class GFX:
                 a, b = b, a
             self.hline(a, y, b-a+1, *args, **kwargs)
             y += 1
+
+
+def _framebuffer_of(pixel):
+    # The FrameBuffer a bound pixel method belongs to, None if it isn't one
+    # or the port has no framebuf module.
+    if framebuf is None:
+        return None
+    try:
+        target = pixel.__self__
+    except AttributeError:
+        return None
+    if isinstance(target, framebuf.FrameBuffer):
+        return target
+    return None
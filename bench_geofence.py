@@ -0,0 +1,62 @@
+"""
+bench_geofence.py
+Host (CPython) benchmark for geofence.py
+  the synthetic track in nmea_sample.nmea against 1000 zones scattered
+  over 10 km plus the targets: candidate list rebuilds, zone tests and
+  time per fix for the incremental zone search at several margins,
+  against testing every zone on every fix
+  check_geofence.py checks the events
+  run with: python3 bench_geofence.py
+"""
+import random
+import time
+
+from bench_nav import SEED, synthetic_targets
+from geofence import Geofence
+from host_check import track_fixes
+from navigation import TargetTable
+from quadcorder_targets import targets
+
+# label, margin in metres
+MARGINS = (("every zone (no index)", 1e9), ("margin 100 m", 100),
+           ("margin 200 m", 200), ("margin 500 m", 500))
+
+
+def incremental_events(fixes, rng):
+    """
+    the track against 1000 zones scattered over 10 km plus the targets,
+    for every margin
+      returns [(label, [(event, zone name)], Geofence, seconds)]
+    """
+    synthetic = synthetic_targets(1000, 10000, rng)
+    synthetic.update(targets)
+    table = TargetTable(synthetic)
+
+    runs = []
+    for label, margin in MARGINS:
+        fences = Geofence(margin=margin, dwell_ms=10000)
+        fences.add_targets(table, 25)
+        events = []
+        start = time.perf_counter()
+        for ms, lat_e7, lon_e7, speed, course, hdop in fixes:
+            events.extend(fences.update(lat_e7, lon_e7, ms))
+        elapsed = time.perf_counter() - start
+        runs.append((label, [(event, zone.name) for event, zone in events], fences, elapsed))
+    return runs
+
+
+def bench_incremental(fixes, rng):
+    runs = incremental_events(fixes, rng)
+    print("%d zones, %d fixes" % (len(runs[0][2].zones), len(fixes)))
+    print("%-22s %10s %12s %10s %8s" % ("", "rebuilds", "zone tests", "us/fix", "events"))
+    for label, events, fences, elapsed in runs:
+        print("%-22s %10d %12d %10.1f %8d" % (label, fences.rebuilds, fences.zone_tests,
+                                             elapsed / len(fixes) * 1e6, len(events)))
+
+
+def main():
+    bench_incremental(track_fixes(), random.Random(SEED))
+
+
+if __name__ == "__main__":
+    main()
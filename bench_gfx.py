@@ -0,0 +1,144 @@
+"""
+bench_gfx.py
+Host (CPython) benchmark for adafruitGFX's native framebuf dispatch and
+clipping
+  draws each primitive the Quadcorder uses, and a few it doesn't yet,
+  into a host_framebuf FrameBuffer with GFX's Python drawing and with
+  the native methods, and compares
+    calls - calls into the FrameBuffer per primitive. on the device each
+            is a trip through the interpreter, so this is the cost that
+            the native methods remove
+    host us - time per primitive here. the emulator's native methods are
+              Python too, so this understates the device speedup
+    pixels differ - pixels the two versions set differently, framebuf.c
+              walks lines and circles a little differently
+  then draws primitives that leave the screen with GFX's Python drawing
+  and counts the calls that reach the backend against the same primitive
+  drawn unclipped on a canvas big enough to hold it
+  check_gfx.py checks the calls, clipped pixels and colour handling
+  run with: python3 bench_gfx.py
+"""
+import time
+
+import host_framebuf
+host_framebuf.install()
+
+from adafruitGFX import GFX
+import framebuf
+
+WIDTH = 128
+HEIGHT = 64
+
+# name, GFX method, arguments
+PRIMITIVES = (("compass needle", "line", (106, 30, 92, 15, 1)),
+              ("line, long shallow", "line", (0, 5, 127, 60, 1)),
+              ("rect 40x20", "rect", (10, 10, 40, 20, 1)),
+              ("fill_rect menu bar", "fill_rect", (0, 20, 128, 10, 1)),
+              ("fill_rect cursor", "fill_rect", (24, 20, 8, 8, 1)),
+              ("circle r=20, compass", "circle", (106, 30, 20, 1)),
+              ("fill_circle r=10", "fill_circle", (64, 32, 10, 1)),
+              ("triangle", "triangle", (10, 60, 60, 5, 120, 50, 1)),
+              ("fill_triangle", "fill_triangle", (10, 60, 60, 5, 120, 50, 1)))
+
+# primitives partly or wholly off the 128x64 screen
+OFF_SCREEN = (("needle leaving the top", "line", (120, 30, 150, -10, 1)),
+              ("line across, ends off", "line", (-200, -40, 300, 100, 1)),
+              ("line wholly off", "line", (-50, 70, 200, 90, 1)),
+              ("circle r=60 centred", "circle", (64, 32, 60, 1)),
+              ("circle r=30 in a corner", "circle", (120, 60, 30, 1)),
+              ("circle wholly off", "circle", (-40, 20, 30, 1)),
+              ("fill_circle r=40 corner", "fill_circle", (0, 0, 40, 1)),
+              ("rect 200x100 around", "rect", (-30, -20, 200, 100, 1)),
+              ("fill_rect half off", "fill_rect", (100, 40, 80, 60, 1)),
+              ("fill_triangle, tip off", "fill_triangle", (-60, -30, 200, 20, 40, 150, 1)))
+
+BIG = 100000
+
+
+def new_gfx(native):
+    fb = framebuf.FrameBuffer(bytearray(WIDTH * HEIGHT // 8), WIDTH, HEIGHT, framebuf.MONO_VLSB)
+    gfx = GFX(WIDTH, HEIGHT, fb.pixel, fb.hline, fb.vline, framebuffer=fb if native else False)
+    return fb, gfx
+
+
+def run(method, args, native, repeat=50):
+    """
+    (calls per primitive, host us per primitive, buffer drawn)
+    """
+    fb, gfx = new_gfx(native)
+    draw = getattr(gfx, method)
+    draw(*args)
+    calls = fb.calls
+    image = bytes(fb.buf)
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        draw(*args)
+    elapsed = time.perf_counter() - start
+    return calls, elapsed / repeat * 1e6, image
+
+
+def differ(a, b):
+    return sum(bin(x ^ y).count("1") for x, y in zip(a, b))
+
+
+def unclipped(method, args):
+    """
+    (backend calls, set of on screen pixels) of the primitive drawn with
+    no clipping, on a canvas big enough that nothing leaves it
+    """
+    pixels = set()
+    calls = [0]
+
+    def pixel(x, y, *a):
+        calls[0] += 1
+        pixels.add((x - BIG, y - BIG))
+
+    def hline(x, y, w, *a):
+        calls[0] += 1
+        for i in range(w):
+            pixels.add((x + i - BIG, y - BIG))
+
+    def vline(x, y, h, *a):
+        calls[0] += 1
+        for i in range(h):
+            pixels.add((x - BIG, y + i - BIG))
+
+    gfx = GFX(2 * BIG, 2 * BIG, pixel, hline, vline, framebuffer=False)
+    if method in ("circle", "fill_circle", "rect", "fill_rect"):
+        shifted = (args[0] + BIG, args[1] + BIG) + args[2:]
+    else:
+        shifted = tuple(v + BIG for v in args[:-1]) + args[-1:]
+    getattr(gfx, method)(*shifted)
+    return calls[0], set(p for p in pixels if 0 <= p[0] < WIDTH and 0 <= p[1] < HEIGHT)
+
+
+def image_pixels(image):
+    return set((x, y) for y in range(HEIGHT) for x in range(WIDTH)
+               if image[(y >> 3) * WIDTH + x] >> (y & 7) & 1)
+
+
+def bench_clipping():
+    print("\nclipping, calls reaching the backend with GFX's Python drawing")
+    print("%-26s %10s %10s %10s %8s" % ("", "unclipped", "clipped", "fb native", "differ"))
+    for name, method, args in OFF_SCREEN:
+        before, visible = unclipped(method, args)
+        calls, host_us, image = run(method, args, False, repeat=1)
+        fb_calls = run(method, args, True, repeat=1)[0]
+        differ = len(image_pixels(image) ^ visible)
+        print("%-26s %10d %10d %10d %8d" % (name, before, calls, fb_calls, differ))
+
+
+def main():
+    print("%-22s %10s %10s %12s %12s %8s %8s" %
+          ("", "py calls", "fb calls", "py host us", "fb host us", "speedup", "differ"))
+    for name, method, args in PRIMITIVES:
+        py_calls, py_us, py_image = run(method, args, False)
+        fb_calls, fb_us, fb_image = run(method, args, True)
+        print("%-22s %10d %10d %12.1f %12.1f %7.1fx %8d" %
+              (name, py_calls, fb_calls, py_us, fb_us, py_us / fb_us, differ(py_image, fb_image)))
+    bench_clipping()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+"""
+bench_gps.py
+Host (CPython) benchmark suite for the micropyGPS parser
+  replays the synthetic NMEA track in nmea_sample.nmea, generated by
+  make_nmea_sample.py, and streams derived from it: mixed GP/GL/GN talkers, corrupted checksums,
+  truncated sentences and 10 Hz bursts
+  run with: python3 bench_gps.py [--save FILE] [--check FILE]
+    --save  writes the results as a JSON baseline
+    --check compares against a saved baseline and exits 1 if any
+            throughput dropped by more than --tolerance (default 15%)
+"""
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+from host_check import CORPUS
+from micropyGPS import MicropyGPS
+
+REPEAT = 5
+SEED = 1017
+
+
+def load_corpus(path=CORPUS):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def chunks(data, size):
+    """
+    split data into uart.read() sized chunks
+    """
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def checksum(body):
+    crc = 0
+    for c in body:
+        crc ^= c
+    return b"$" + body + b"*%02X\r\n" % crc
+
+
+def sentence_bodies(data):
+    """
+    the text between '$' and '*' of every sentence in data
+    """
+    return [line[1:line.index(b"*")] for line in data.splitlines() if line.startswith(b"$")]
+
+
+"""
+Streams
+  every builder returns the raw bytes the receiver would send
+"""
+def stream_sample(data, rng):
+    return data
+
+
+def stream_mixed_talkers(data, rng):
+    """
+    multi constellation receivers interleave GP, GL and GN talkers
+    """
+    out = []
+    for i, body in enumerate(sentence_bodies(data)):
+        talker = (b"GP", b"GL", b"GN")[i % 3]
+        out.append(checksum(talker + body[2:]))
+    return b"".join(out)
+
+
+def stream_corrupted(data, rng):
+    """
+    one sentence in three has a flipped char so its checksum fails
+    """
+    out = []
+    for i, body in enumerate(sentence_bodies(data)):
+        sentence = bytearray(checksum(body))
+        if i % 3 == 0:
+            pos = rng.randrange(7, len(body))
+            sentence[pos] ^= 0x01
+        out.append(bytes(sentence))
+    return b"".join(out)
+
+
+def stream_truncated(data, rng):
+    """
+    one sentence in four is cut short, as when the uart drops bytes
+    """
+    out = []
+    for i, body in enumerate(sentence_bodies(data)):
+        sentence = checksum(body)
+        if i % 4 == 0:
+            sentence = sentence[:rng.randrange(2, len(sentence) - 3)]
+        out.append(sentence)
+    return b"".join(out)
+
+
+def stream_10hz(data, rng):
+    """
+    RMC and GGA at 10 Hz, ten epochs per sample second
+    """
+    out = []
+    for body in sentence_bodies(data):
+        if body[2:5] not in (b"RMC", b"GGA"):
+            continue
+        fields = body.split(b",")
+        for tenth in range(10):
+            fields[1] = fields[1][:7] + b"%d0" % tenth
+            out.append(checksum(b",".join(fields)))
+    return b"".join(out)
+
+
+STREAMS = (("sample", stream_sample),
+           ("mixed GP/GL/GN", stream_mixed_talkers),
+           ("corrupted crc", stream_corrupted),
+           ("truncated", stream_truncated),
+           ("10 Hz burst", stream_10hz))
+
+
+"""
+Parser entry points
+"""
+def run_per_char(data, gps):
+    """
+    the original boot_*.py path, one chr() and update() per byte
+    """
+    for char in data:
+        gps.update(chr(char))
+    return gps
+
+
+def run_update_bytes(bufs, gps):
+    for buf in bufs:
+        gps.update_bytes(buf)
+    return gps
+
+
+def run_update_buffer(bufs, gps):
+    """
+    emulate uart.readinto() into one preallocated buffer
+    """
+    rxbuf = bytearray(max(len(b) for b in bufs))
+    for buf in bufs:
+        n = len(buf)
+        rxbuf[:n] = buf
+        gps.update_buffer(rxbuf, n)
+    return gps
+
+
+def run_parse_sentence(lines, gps):
+    """
+    the uart.readline() path, one call per complete sentence
+    """
+    for line in lines:
+        gps.parse_sentence(line)
+    return gps
+
+
+def timed(func, arg, make_gps):
+    """
+    best of REPEAT runs, returns (seconds, parser from the last run)
+    """
+    best = None
+    for _ in range(REPEAT):
+        gps = make_gps()
+        start = time.perf_counter()
+        func(arg, gps)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, gps
+
+
+def alloc_per_sentence(lines, feed, make_gps):
+    """
+    average transient heap (bytes) and blocks left behind per sentence
+      tracemalloc peak is reset before each sentence is fed
+    """
+    gps = make_gps()
+    for line in lines[:50]:
+        feed(gps, line)  # warm up
+
+    tracemalloc.start()
+    peak_total = 0
+    before = tracemalloc.take_snapshot()
+    for line in lines:
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        feed(gps, line)
+        peak_total += tracemalloc.get_traced_memory()[1] - base
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    stats = after.filter_traces((tracemalloc.Filter(True, "*micropyGPS.py"),)).compare_to(
+        before.filter_traces((tracemalloc.Filter(True, "*micropyGPS.py"),)), "filename")
+    retained = sum(s.count_diff for s in stats)
+    return peak_total / len(lines), retained / len(lines)
+
+
+def feed_update(gps, line):
+    for char in line:
+        gps.update(chr(char))
+
+
+def feed_update_bytes(gps, line):
+    gps.update_bytes(line)
+
+
+def feed_parse_sentence(gps, line):
+    gps.parse_sentence(line)
+
+
+def bench_paths(data, results):
+    print("\nentry points, sample track: %d bytes, best of %d runs" % (len(data), REPEAT))
+    print("%-30s %12s %8s %8s" % ("", "chars/sec", "speedup", "parsed"))
+
+    cases = (("update(chr(c))", run_per_char, data, MicropyGPS),
+             ("update_bytes (80 byte reads)", run_update_bytes, chunks(data, 80), MicropyGPS),
+             ("update_bytes (256 byte reads)", run_update_bytes, chunks(data, 256), MicropyGPS),
+             ("update_bytes (1024 byte reads)", run_update_bytes, chunks(data, 1024), MicropyGPS),
+             ("update_buffer (readinto 256)", run_update_buffer, chunks(data, 256), MicropyGPS),
+             ("update_bytes RMC/GGA only", run_update_bytes, chunks(data, 256),
+              lambda: MicropyGPS(sentences=("RMC", "GGA"))),
+             ("parse_sentence (readline)", run_parse_sentence, data.splitlines(True), MicropyGPS))
+
+    base = None
+    for label, func, arg, make_gps in cases:
+        elapsed, gps = timed(func, arg, make_gps)
+        rate = len(data) / elapsed
+        if base is None:
+            base = rate
+        print("%-30s %12.0f %7.2fx %8d" % (label, rate, rate / base, gps.parsed_sentences))
+        results["path: " + label] = rate
+
+
+def bench_streams(rng, data, results):
+    print("\nstreams through update_bytes (256 byte reads) / parse_sentence")
+    print("%-16s %8s %12s %12s %12s %6s %6s" %
+          ("", "bytes", "bytes/sec", "sent/sec", "line sent/s", "clean", "crc"))
+
+    for name, build in STREAMS:
+        stream = build(data, rng)
+        sentences = stream.count(b"$")
+
+        elapsed, gps = timed(run_update_bytes, chunks(stream, 256), MicropyGPS)
+        line_elapsed, _ = timed(run_parse_sentence, stream.splitlines(True), MicropyGPS)
+
+        print("%-16s %8d %12.0f %12.0f %12.0f %6d %6d" %
+              (name, len(stream), len(stream) / elapsed, sentences / elapsed,
+               sentences / line_elapsed, gps.clean_sentences, gps.crc_fails))
+        results["stream: " + name] = sentences / elapsed
+        results["stream lines: " + name] = sentences / line_elapsed
+
+
+def bench_crc_cost(rng, data, results):
+    """
+    cost of rejecting a bad checksum against parsing a clean sentence
+    """
+    print("\ncrc fail handling, us per sentence")
+    bodies = sentence_bodies(data)
+    clean = [checksum(body) for body in bodies]
+    failed = []
+    for sentence in clean:
+        sentence = bytearray(sentence)
+        sentence[-4] = ord("0") if sentence[-4] != ord("0") else ord("1")
+        failed.append(bytes(sentence))
+
+    for label, lines in (("clean", clean), ("crc fail", failed)):
+        elapsed, gps = timed(run_update_bytes, lines, MicropyGPS)
+        line_elapsed, _ = timed(run_parse_sentence, lines, MicropyGPS)
+        print("%-16s update_bytes %7.2f   parse_sentence %7.2f   (%d crc fails)" %
+              (label, elapsed / len(lines) * 1e6, line_elapsed / len(lines) * 1e6, gps.crc_fails))
+        results["crc us: " + label] = elapsed / len(lines) * 1e6
+
+
+def bench_alloc(data, results):
+    print("\nheap per sentence (tracemalloc), sample track")
+    print("%-30s %16s %16s" % ("", "transient bytes", "retained blocks"))
+    lines = data.splitlines(True)
+    for label, feed in (("update(chr(c))", feed_update),
+                        ("update_bytes", feed_update_bytes),
+                        ("parse_sentence", feed_parse_sentence)):
+        transient, retained = alloc_per_sentence(lines, feed, MicropyGPS)
+        print("%-30s %16.1f %16.3f" % (label, transient, retained))
+        results["alloc bytes: " + label] = transient
+
+
+def check(results, baseline_file, tolerance):
+    """
+    throughput metrics must not drop more than tolerance below baseline
+    """
+    with open(baseline_file) as f:
+        baseline = json.load(f)
+
+    failed = False
+    print("\ncheck against %s (tolerance %d%%)" % (baseline_file, tolerance * 100))
+    for key, value in sorted(results.items()):
+        if key not in baseline or not key.startswith(("path:", "stream")):
+            continue
+        ratio = value / baseline[key]
+        status = "ok"
+        if ratio < 1 - tolerance:
+            status = "REGRESSION"
+            failed = True
+        print("%-44s %6.2fx  %s" % (key, ratio, status))
+    return not failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("--save", help="write results to a JSON baseline")
+    parser.add_argument("--check", help="compare results with a JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    args = parser.parse_args()
+
+    data = load_corpus()
+    results = {}
+
+    bench_paths(data, results)
+    bench_streams(random.Random(SEED), data, results)
+    bench_crc_cost(random.Random(SEED), data, results)
+    bench_alloc(data, results)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+
+    if args.check and not check(results, args.check, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
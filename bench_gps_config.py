@@ -0,0 +1,174 @@
+"""
+bench_gps_config.py
+Host (CPython) benchmark for gps_config.py
+  the link and parser load per second of nmea_sample.nmea before and
+  after configuring the receiver
+  FakeReceiver stands in for the UART and a MediaTek or u-blox receiver,
+  replaying the corpus and answering configuration commands with
+  scripted ACKs, NAKs or silence. bytes heard at the wrong baud rate come
+  out garbled, as from a real UART. check_gps_config.py and check_ubx.py
+  configure it
+  run with: python3 bench_gps_config.py
+"""
+from struct import unpack_from
+import time
+
+from gps_config import pmtk_sentence, PMTK_FIELDS, ubx_checksum, ubx_frame, \
+    UBX_CFG_MSG, UBX_CFG_PRT, UBX_CFG_RATE, UBX_CLASS_ACK, UBX_ACK_ACK, UBX_ACK_NAK, UBX_NMEA_IDS
+from host_check import CORPUS, load_lines
+from micropyGPS import MicropyGPS
+
+EPOCH = 8
+
+
+def load_epochs(path=CORPUS):
+    """
+    the corpus as a list of epochs, each a list of sentences
+    """
+    lines = [line for line in load_lines(path) if line.startswith(b"$")]
+    return [lines[i:i + EPOCH] for i in range(0, len(lines), EPOCH)]
+
+
+class FakeReceiver():
+    def __init__(self, protocol, epochs, baudrate=9600, nak=(), silent=()):
+        """
+        protocol - 'pmtk' or 'ubx', the commands it understands
+        epochs   - sentences to send, one list per fix
+        nak      - commands answered with a failure, e.g. 220 or 'RATE'
+        silent   - commands that get no answer at all
+        """
+        self.protocol = protocol
+        self.epochs = epochs
+        self.nak = nak
+        self.silent = silent
+
+        # the receiver's side
+        self.baudrate = baudrate
+        self.sentences = None
+        self.period_ms = 1000
+
+        # the host uart's side
+        self.host_baudrate = baudrate
+        self.out = bytearray()
+        self.epoch = 0
+        self.written = []
+
+    # UART interface
+    def init(self, baudrate=None, **kwargs):
+        if baudrate is not None:
+            self.host_baudrate = baudrate
+
+    def write(self, data):
+        self.written.append(bytes(data))
+        if self.protocol == "pmtk":
+            self.pmtk_command(bytes(data))
+        else:
+            self.ubx_command(bytes(data))
+        return len(data)
+
+    def any(self):
+        if not self.out:
+            self.next_epoch()
+        return len(self.out)
+
+    def readinto(self, buf, nbytes=None):
+        if not self.out:
+            self.next_epoch()
+        n = min(len(buf) if nbytes is None else nbytes, len(self.out))
+        buf[0:n] = self.out[0:n]
+        del self.out[0:n]
+        return n
+
+    # receiver
+    def send(self, data):
+        if self.host_baudrate != self.baudrate:
+            # wrong baud rate, the uart sees framing garbage
+            data = bytes((b * 7 + 3) & 0xFF for b in data)
+        self.out.extend(data)
+
+    def next_epoch(self):
+        epoch = self.epochs[self.epoch % len(self.epochs)]
+        self.epoch += 1
+        for sentence in epoch:
+            if self.sentences is None or sentence[3:6].decode() in self.sentences:
+                self.send(sentence)
+
+    def pmtk_command(self, data):
+        body = data[1:data.index(b"*")].decode()
+        fields = body.split(",")
+        command = int(fields[0][4:])
+        if command in self.silent:
+            return
+
+        flag = 3
+        if command in self.nak:
+            flag = 2
+        elif command == 314:
+            self.sentences = [name for name in PMTK_FIELDS if fields[1 + PMTK_FIELDS[name]] == "1"]
+        elif command == 220:
+            self.period_ms = int(fields[1])
+        elif command == 251:
+            # changes rate without an answer
+            self.baudrate = int(fields[1])
+            return
+        self.send(pmtk_sentence("PMTK001,%d,%d" % (command, flag)))
+
+    def ubx_command(self, data):
+        msg_class, msg_id, length = unpack_from("<BBH", data, 2)
+        assert ubx_checksum(data, 2, 6 + length) == (data[6 + length], data[7 + length])
+        name = {UBX_CFG_MSG: "MSG", UBX_CFG_RATE: "RATE", UBX_CFG_PRT: "PRT"}[msg_id]
+        if name in self.silent:
+            return
+
+        ack = UBX_ACK_ACK
+        if name in self.nak:
+            ack = UBX_ACK_NAK
+        elif name == "MSG":
+            nmea_id, rate = data[7], data[8]
+            names = [n for n in UBX_NMEA_IDS if UBX_NMEA_IDS[n] == nmea_id]
+            if self.sentences is None:
+                self.sentences = list(UBX_NMEA_IDS)
+            if rate and names[0] not in self.sentences:
+                self.sentences.append(names[0])
+            if not rate and names[0] in self.sentences:
+                self.sentences.remove(names[0])
+        elif name == "RATE":
+            self.period_ms = unpack_from("<H", data, 6)[0]
+        elif name == "PRT":
+            self.baudrate = unpack_from("<I", data, 14)[0]
+            return
+        self.send(ubx_frame(UBX_CLASS_ACK, ack, bytes((msg_class, msg_id))))
+
+
+def bench_load(epochs):
+    """
+    link bytes and parse time per second of fixes, before and after
+    """
+    print("link and parser load per second")
+    print("%-28s %10s %10s %12s" % ("", "bytes/s", "link use", "parse us/s"))
+
+    lines = [line for epoch in epochs for line in epoch]
+    rmc_gga = [line for line in lines if line[3:6] in (b"RMC", b"GGA")]
+    cases = (("default: all, 1 Hz, 9600", lines, 1, 9600),
+             ("RMC+GGA, 1 Hz, 9600", rmc_gga, 1, 9600),
+             ("RMC+GGA, 10 Hz, 115200", rmc_gga, 10, 115200),
+             ("all, 10 Hz, 9600 (overruns)", lines, 10, 9600))
+
+    for label, sentences, hz, baud in cases:
+        per_epoch = sum(len(s) for s in sentences) / len(epochs)
+        rate = per_epoch * hz
+        gps = MicropyGPS()
+        start = time.perf_counter()
+        for line in sentences:
+            gps.parse_sentence(line)
+        per_fix = (time.perf_counter() - start) / len(epochs)
+        print("%-28s %10.0f %9.0f%% %12.0f" % (label, rate, rate * 10 / baud * 100, per_fix * hz * 1e6))
+
+
+def main():
+    epochs = load_epochs()
+    bench_load(epochs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""
+bench_nav.py
+Host (CPython) benchmark for navigation.py
+  counts trig calls and times a refresh against every Quadcorder target.
+  CPython's math calls are cheap C calls, so here the table only draws
+  level with the old functions; the trig calls are what it saves
+  times haversine against the flat earth mode
+  times the target store's grid queries against a scan of every target
+  check_navigation.py checks the flat earth error bound and float32
+  accuracy, check_target_store.py the store's results
+  run with: python3 bench_nav.py
+"""
+import math
+import random
+import time
+
+import navigation
+from navigation import distance_bearing, fast_distance_bearing, flat_distance_bearing, Position, R, TargetTable
+from quadcorder_targets import targets
+from target_store import TargetStore
+
+REPEAT = 2000
+
+# the targets as float degrees, for the old functions and the sweeps
+target_degrees = dict((code, (float(lat), float(lon))) for code, (lat, lon) in targets.items())
+
+# somewhere on the way from Home to the Substation
+HERE = (42.040101, -86.435902)
+
+# synthetic city scale hunt for the target store
+STORE_TARGETS = 10000
+STORE_SPREAD_M = 10000
+STORE_QUERIES = 200
+SEED = 1017
+
+TRIG = ("sin", "cos", "asin", "atan2", "sqrt", "radians", "degrees")
+calls = dict((name, 0) for name in TRIG)
+
+
+def counted(name):
+    func = getattr(math, name)
+
+    def wrapper(*args):
+        calls[name] += 1
+        return func(*args)
+    return wrapper
+
+
+class counting_math:
+    """
+    math functions that count their calls, patched into both versions
+    """
+    pass
+
+
+for name in TRIG:
+    setattr(counting_math, name, staticmethod(counted(name)))
+
+
+"""
+calc_distance() and calc_bearing() as they were in boot_quadcorder.py
+"""
+def calc_distance(lat1, lon1, lat2, lon2, m=counting_math):
+    R = 6371000
+    lat1r = m.radians(lat1)
+    lat2r = m.radians(lat2)
+    deltaLat = m.radians(lat2-lat1)
+    deltaLon = m.radians(lon2-lon1)
+    a = (m.sin(deltaLat/2) * m.sin(deltaLat/2)) + (m.cos(lat1r) * m.cos(lat2r) * (m.sin(deltaLon/2) * m.sin(deltaLon/2)))
+    c = 2 * m.atan2(m.sqrt(a), m.sqrt(1-a))
+    return R * c
+
+
+def calc_bearing(lat1, lon1, lat2, lon2, m=counting_math):
+    lat1r = m.radians(lat1)
+    lat2r = m.radians(lat2)
+    deltaLon = m.radians(lon2-lon1)
+    a = m.cos(lat2r) * m.sin(deltaLon)
+    b = m.cos(lat1r) * m.sin(lat2r) - m.sin(lat1r) * m.cos(lat2r) * m.cos(deltaLon)
+    return (m.degrees(m.atan2(a, b)) + 360) % 360
+
+
+def legacy_refresh(lat, lon, m=counting_math):
+    out = []
+    for code in target_degrees:
+        tgt_lat, tgt_lon = target_degrees[code]
+        out.append((calc_distance(lat, lon, tgt_lat, tgt_lon, m), calc_bearing(lat, lon, tgt_lat, tgt_lon, m)))
+    return out
+
+
+def table_refresh(table, pos, lat, lon):
+    pos.set(lat, lon)
+    return [(d, b) for _, d, b in table.navigate(pos)]
+
+
+def reset_calls():
+    for name in TRIG:
+        calls[name] = 0
+
+
+def patch_navigation(on):
+    for name in TRIG:
+        setattr(navigation, name, counted(name) if on else getattr(math, name))
+
+
+def bench_trig_calls():
+    print("trig calls for one refresh against %d targets" % len(targets))
+    print("%-26s %s" % ("", "  ".join("%7s" % name for name in TRIG + ("total",))))
+
+    reset_calls()
+    legacy = legacy_refresh(*HERE)
+    print("%-26s %s" % ("calc_distance+calc_bearing",
+                        "  ".join("%7d" % calls[name] for name in TRIG) + "  %7d" % sum(calls.values())))
+
+    patch_navigation(True)
+    table = TargetTable(targets)
+    reset_calls()
+    pos = Position()
+    new = table_refresh(table, pos, *HERE)
+    print("%-26s %s" % ("TargetTable.navigate",
+                        "  ".join("%7d" % calls[name] for name in TRIG) + "  %7d" % sum(calls.values())))
+    patch_navigation(False)
+
+    worst_d = max(abs(a[0] - b[0]) for a, b in zip(legacy, new))
+    worst_b = max(abs(a[1] - b[1]) for a, b in zip(legacy, new))
+    print("max difference: %.6f m, %.8f deg" % (worst_d, worst_b))
+
+
+def bench_refresh_time():
+    print("\ntime per refresh against %d targets, best of %d" % (len(targets), REPEAT))
+    table = TargetTable(targets)
+    pos = Position()
+
+    for label, func, args in (("calc_distance+calc_bearing", legacy_refresh, HERE + (math,)),
+                              ("TargetTable.navigate", table_refresh, (table, pos) + HERE)):
+        best = None
+        for _ in range(REPEAT):
+            start = time.perf_counter()
+            func(*args)
+            elapsed = time.perf_counter() - start
+            if best is None or elapsed < best:
+                best = elapsed
+        print("%-26s %8.2f us" % (label, best * 1e6))
+
+
+def destination(lat, lon, distance, bearing):
+    """
+    great circle destination, for points at a known distance
+    """
+    lat_r = math.radians(lat)
+    bearing = math.radians(bearing)
+    a = distance / R
+    lat2 = math.asin(math.sin(lat_r) * math.cos(a) + math.cos(lat_r) * math.sin(a) * math.cos(bearing))
+    lon2 = math.radians(lon) + math.atan2(math.sin(bearing) * math.sin(a) * math.cos(lat_r),
+                                          math.cos(a) - math.sin(lat_r) * math.sin(lat2))
+    return math.degrees(lat2), math.degrees(lon2)
+
+
+def bench_flat_time():
+    print("\ntime per refresh against %d targets, best of %d" % (len(targets), REPEAT))
+    table = TargetTable(targets)
+    pos = Position(HERE[0], HERE[1], tolerance=1.0)
+    cases = (("haversine", distance_bearing),
+             ("flat", flat_distance_bearing),
+             ("fast (flat, 1 m tolerance)", fast_distance_bearing))
+
+    for label, func in cases:
+        best = None
+        for _ in range(REPEAT):
+            start = time.perf_counter()
+            for target in table.targets.values():
+                func(pos, target)
+            elapsed = time.perf_counter() - start
+            if best is None or elapsed < best:
+                best = elapsed
+        print("%-26s %8.2f us" % (label, best * 1e6))
+
+
+"""
+Target store
+"""
+def synthetic_targets(count, spread, rng):
+    """
+    count targets scattered uniformly within spread metres of Home
+    """
+    lat0, lon0 = target_degrees["0000#CCCC"]
+    out = {}
+    for i in range(count):
+        lat, lon = destination(lat0, lon0, spread * math.sqrt(rng.random()), rng.uniform(0, 360))
+        out["T%05d" % i] = ("%.6f" % lat, "%.6f" % lon)
+    return out
+
+
+def brute_nearest(table, pos, k):
+    found = sorted((fast_distance_bearing(pos, t) + (t,) for t in table.targets.values()),
+                   key=lambda item: item[0])
+    return [(t, d, b) for d, b, t in found[:k]]
+
+
+def brute_within(table, pos, radius):
+    found = sorted((fast_distance_bearing(pos, t) + (t,) for t in table.targets.values()),
+                   key=lambda item: item[0])
+    return [(t, d, b) for d, b, t in found if d <= radius]
+
+
+def store_queries():
+    """
+    the synthetic targets and query positions, up to 10% beyond them
+    """
+    rng = random.Random(SEED)
+    synthetic = synthetic_targets(STORE_TARGETS, STORE_SPREAD_M, rng)
+    lat0, lon0 = target_degrees["0000#CCCC"]
+    queries = []
+    for _ in range(STORE_QUERIES):
+        pos = Position(tolerance=1.0)
+        pos.set(*destination(lat0, lon0, STORE_SPREAD_M * 1.1 * math.sqrt(rng.random()), rng.uniform(0, 360)))
+        queries.append(pos)
+    return synthetic, queries
+
+
+# label, scan, grid query, k or radius
+STORE_CASES = (("nearest 1", brute_nearest, TargetStore.nearest, 1),
+               ("nearest 5", brute_nearest, TargetStore.nearest, 5),
+               ("nearest 20", brute_nearest, TargetStore.nearest, 20),
+               ("within 100 m", brute_within, TargetStore.within, 100),
+               ("within 500 m", brute_within, TargetStore.within, 500),
+               ("within 2000 m", brute_within, TargetStore.within, 2000))
+
+STORE_CELLS = (100, 250, 1000)
+
+
+def bench_store():
+    """
+    nearest k and within R on 10k targets, grid index against a scan of
+    every target
+    """
+    synthetic, queries = store_queries()
+
+    start = time.perf_counter()
+    table = TargetTable(synthetic)
+    table_time = time.perf_counter() - start
+
+    print("\ntarget store, %d targets within %d m, %d queries" % (STORE_TARGETS, STORE_SPREAD_M, STORE_QUERIES))
+    print("TargetTable load %.1f ms" % (table_time * 1e3))
+
+    # the scan doesn't depend on the cell size, time it once per case
+    scans = []
+    for label, brute, query, arg in STORE_CASES:
+        start = time.perf_counter()
+        for pos in queries:
+            brute(table, pos, arg)
+        scans.append(time.perf_counter() - start)
+
+    for cell_m in STORE_CELLS:
+        start = time.perf_counter()
+        store = TargetStore(synthetic, cell_m)
+        build = time.perf_counter() - start
+        print("\ncell %d m: %d x %d grid, %d cells used, load %.1f ms" %
+              (cell_m, store.rows, store.cols, len(store.cells), build * 1e3))
+        print("%-14s %12s %12s %8s %10s" % ("", "scan us", "grid us", "speedup", "results"))
+
+        for (label, brute, query, arg), scan in zip(STORE_CASES, scans):
+            start = time.perf_counter()
+            got = [query(store, pos, arg) for pos in queries]
+            grid = time.perf_counter() - start
+            print("%-14s %12.1f %12.1f %7.1fx %10.1f" %
+                  (label, scan / len(queries) * 1e6, grid / len(queries) * 1e6, scan / grid,
+                   sum(len(r) for r in got) / len(queries)))
+
+
+def main():
+    bench_trig_calls()
+    bench_refresh_time()
+    bench_flat_time()
+    bench_store()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""
+bench_oled.py
+Host (CPython) benchmark for the SSD1306 partial and chunked flush
+  FakePanel stands in for the I2C bus and the panel's controller, it
+  decodes the column and page windows and data the driver sends into
+  its own copy of the display RAM, and keeps a clock of the time the
+  bytes take on the bus at 400 kHz
+  replays the Quadcorder's screens: update_oled() along the synthetic
+  track in nmea_sample.nmea, scrolling qc_menu() and typing a code into
+  qc_enter_code(), and compares bytes on the bus and transfer time
+  against sending the whole frame every time, and the longest the main
+  loop is held up per pass with show() against begin_flush() and poll()
+  check_oled.py checks the panel matches the framebuffer and the
+  driver's byte counts match the bus
+  run with: python3 bench_oled.py
+"""
+from math import ceil, cos, radians, sin
+
+import host_framebuf
+host_framebuf.install()
+
+from adafruitGFX import GFX
+from host_check import track_fixes
+from navigation import fast_distance_bearing, Position, TargetTable
+from quadcorder_targets import targets
+import ssd1306
+
+I2C_HZ = 400000
+BUDGET_US = 2000
+
+# SSD1306 commands followed by argument bytes
+ARGS = {0x20: 1, 0x21: 2, 0x22: 2, 0x81: 1, 0x8D: 1, 0xA8: 1, 0xD3: 1, 0xD5: 1, 0xD9: 1, 0xDA: 1, 0xDB: 1}
+
+
+class FakePanel():
+    """
+    I2C bus with an SSD1306 on it, horizontal addressing mode only
+    """
+    def __init__(self, width=128, pages=8):
+        self.width = width
+        self.pages = pages
+        self.ram = bytearray(width * pages)
+        self.col0 = self.col = 0
+        self.col1 = width - 1
+        self.page0 = self.page = 0
+        self.page1 = pages - 1
+        self.command = []
+
+        # bytes on the wire, address bytes included, and transactions
+        self.wire_bytes = 0
+        self.transfers = 0
+
+    def writeto(self, addr, buf):
+        self.wire_bytes += 1 + len(buf)
+        self.transfers += 1
+        if buf[0] == 0x80:
+            self.write_cmd(buf[1])
+        else:
+            self.write_data(buf[1:])
+
+    def writevto(self, addr, bufs):
+        self.wire_bytes += 1 + sum(len(b) for b in bufs)
+        self.transfers += 1
+        self.write_data(b''.join(bytes(b) for b in bufs)[1:])
+
+    def write_cmd(self, cmd):
+        self.command.append(cmd)
+        if len(self.command) <= ARGS.get(self.command[0], 0):
+            return
+        command = self.command
+        self.command = []
+        if command[0] == 0x21:
+            self.col0 = self.col = command[1]
+            self.col1 = command[2]
+        elif command[0] == 0x22:
+            self.page0 = self.page = command[1]
+            self.page1 = command[2]
+
+    def write_data(self, data):
+        for b in data:
+            self.ram[self.page * self.width + self.col] = b
+            self.col += 1
+            if self.col > self.col1:
+                self.col = self.col0
+                self.page += 1
+                if self.page > self.page1:
+                    self.page = self.page0
+
+    def clock_us(self):
+        """
+        time the bytes so far took on the bus, 9 clocks a byte
+        """
+        return self.wire_bytes * 9 * 1000000 // I2C_HZ
+
+    def reset_counts(self):
+        self.wire_bytes = 0
+        self.transfers = 0
+
+
+def new_display():
+    panel = FakePanel()
+    display = ssd1306.SSD1306_I2C(128, 64, panel)
+    # the flush budget runs on the bus clock
+    ssd1306.ticks_us = panel.clock_us
+    return panel, display
+
+
+class Screen():
+    """
+    the Quadcorder's display, drawing as boot_quadcorder.py does
+      mode - 'full' and 'dirty' show() whole or changed frames,
+             'chunked' sends changed frames with begin_flush() and poll()
+    """
+    def __init__(self, mode):
+        self.mode = mode
+        self.panel, self.display = new_display()
+        self.gfx = GFX(128, 64, self.display.pixel, self.display.hline, self.display.vline)
+        self.panel.reset_counts()
+        self.shows = []
+        self.stalls = []
+        self.mismatches = 0
+        # per frame, bytes on the bus less the address bytes, and what
+        # the driver counted
+        self.payload = []
+        self.sent = []
+
+    def show(self):
+        """
+        the frame on the bus, each pass of the main loop it takes is
+        timed as a stall
+        """
+        panel = self.panel
+        before = panel.wire_bytes
+        transfers = panel.transfers
+        if self.mode == 'chunked':
+            self.display.begin_flush()
+            more = True
+            while more:
+                start = panel.clock_us()
+                more = self.display.poll(BUDGET_US)
+                self.stalls.append(panel.clock_us() - start)
+        else:
+            start = panel.clock_us()
+            self.display.show(full=self.mode == 'full')
+            self.stalls.append(panel.clock_us() - start)
+        self.shows.append(panel.wire_bytes - before)
+        self.payload.append(panel.wire_bytes - before - (panel.transfers - transfers))
+        self.sent.append(self.display.bytes_sent)
+        if panel.ram != self.display.buffer:
+            self.mismatches += 1
+
+    def bearing(self, cx, cy, radius, angle):
+        display = self.display
+        display.text('N', cx - 4, 0, 1)
+        self.gfx.circle(cx, cy, radius, 1)
+        if angle < 0:
+            display.text("No", cx - 8, cy - 8)
+            display.text("GPS", cx - 12, cy + 8)
+        else:
+            angle = angle - radians(90)
+            rx = cx - ceil(radius * cos(angle))
+            ry = cy - ceil(radius * sin(angle))
+            display.line(cx, cy, rx, ry, 1)
+
+    def update_oled(self, header, code, tgt, d, b):
+        display = self.display
+        display.fill(0)
+        display.text(header, 0, 0, 1)
+        display.text(code, 0, 10, 1)
+        display.text("^" + str(tgt.lat), 0, 20)
+        display.text(">" + str(tgt.lon), 0, 30)
+        self.bearing(106, 30, 20, b)
+        display.text("dist (km)", 0, 40, 1)
+        display.text(str(d / 1000) if d > 0 else "--.----", 0, 50, 1)
+        self.show()
+
+    def menu(self, items, moves):
+        display = self.display
+        for curr in moves:
+            display.fill(0)
+            for i, item in enumerate(items):
+                if i == curr:
+                    self.gfx.fill_rect(0, curr * 10, 128, 10, 1)
+                    display.text(item, 0, i * 10, 0)
+                else:
+                    display.text(item, 0, i * 10, 1)
+            self.show()
+
+    def enter_code(self, code):
+        display = self.display
+        display.fill(0)
+        display.text("Enter Code:", 0, 0, 1)
+        self.gfx.fill_rect(0, 20, 8, 8, 1)
+        self.show()
+        t = ""
+        for c, ch in enumerate(code, 1):
+            t += ch
+            self.gfx.fill_rect(0, 20, 128, 10, 0)
+            display.text(t, 0, 20, 1)
+            self.gfx.fill_rect(c * 8, 20, 8, 8, 1)
+            self.show()
+
+
+def replay(mode):
+    """
+    every screen once
+      returns {screen name: Screen}
+    """
+    table = TargetTable(targets)
+    code = "CB69#A409"
+    tgt = table.get(code)
+    here = Position(tolerance=1.0)
+
+    results = {}
+    screen = Screen(mode)
+    for ms, lat_e7, lon_e7, speed, course, hdop in track_fixes():
+        here.set_e7(lat_e7, lon_e7)
+        d, b = fast_distance_bearing(here, tgt)
+        screen.update_oled("Scan for", code, tgt, d, radians(b))
+    results["update_oled, track"] = screen
+
+    screen = Screen(mode)
+    items = ["Targets", "Scan", "Beacon", "Log", "Settings"]
+    screen.menu(items, [0, 1, 2, 3, 4, 3, 2, 1, 0, 1, 2, 3, 4])
+    results["qc_menu, scrolling"] = screen
+
+    screen = Screen(mode)
+    screen.enter_code(code)
+    results["qc_enter_code, 9 keys"] = screen
+    return results
+
+
+def main():
+    results = {mode: replay(mode) for mode in ('full', 'dirty', 'chunked')}
+    full = results['full']
+    dirty = results['dirty']
+    chunked = results['chunked']
+
+    print("bytes on the i2c bus per frame, ms at %d kHz" % (I2C_HZ // 1000))
+    print("%-24s %6s %12s %12s %9s %9s %7s" % ("", "frames", "full bytes", "dirty bytes", "full ms", "dirty ms", "saved"))
+    for name in full:
+        f = full[name].shows
+        d = dirty[name].shows
+        f_bytes = sum(f) / len(f)
+        d_bytes = sum(d) / len(d)
+        print("%-24s %6d %12.0f %12.0f %9.2f %9.2f %6.0f%%" %
+              (name, len(d), f_bytes, d_bytes, f_bytes * 9 * 1000 / I2C_HZ, d_bytes * 9 * 1000 / I2C_HZ,
+               100 - d_bytes * 100 / f_bytes))
+
+    print("\nmain loop held up per pass, ms, poll() budget %d us" % BUDGET_US)
+    print("%-24s %-22s %9s %9s %12s" % ("", "", "mean", "max", "passes/frame"))
+    for name in full:
+        for label, screen in (("show(full=True)", full[name]), ("show()", dirty[name]),
+                              ("begin_flush() + poll()", chunked[name])):
+            stalls = screen.stalls
+            print("%-24s %-22s %9.2f %9.2f %12.1f" %
+                  (name, label, sum(stalls) / len(stalls) / 1000, max(stalls) / 1000, len(stalls) / len(screen.shows)))
+
+    display = dirty["update_oled, track"].display
+    print("\nupdate_oled driver counters: %d shows, %d windows, %d bytes, last show %d bytes" %
+          (display.shows, display.windows, display.bytes_total, display.bytes_sent))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+bench_sprites.py
+Host (CPython) benchmark for oled_background.py on the Quadcorder's
+update_oled() screen
+  replays the synthetic track in nmea_sample.nmea through update_oled()
+  drawn two ways
+    redraw     - everything drawn every frame, as before
+    background - the header, target and chrome drawn into a Background
+                 when they change, each frame restores it and draws only
+                 the needle and distance, as boot_quadcorder.py does
+  the header changes part way along, so the background is captured twice
+  compares per frame
+    calls - calls into the FrameBuffer, on the device each is a trip
+            through the interpreter
+    host us - time to draw a frame here. the emulator's text is a
+              Python loop over pixels, so this overstates what it costs
+              on the device; restore() is a memory copy on both
+  check_sprites.py checks every frame is the same as the redrawn one
+  run with: python3 bench_sprites.py
+"""
+from math import ceil, cos, radians, sin
+import time
+
+import host_framebuf
+host_framebuf.install()
+
+from adafruitGFX import GFX
+from host_check import track_fixes
+from navigation import fast_distance_bearing, Position, TargetTable
+from oled_background import Background
+from quadcorder_targets import targets
+import ssd1306
+
+CX = 106
+CY = 30
+RADIUS = 20
+
+
+class Panel():
+    """
+    I2C bus that drops what it's sent, only drawing is measured
+    """
+    def writeto(self, addr, buf):
+        pass
+
+    def writevto(self, addr, bufs):
+        pass
+
+
+class Screen():
+    """
+    update_oled() drawn one of the two ways
+    """
+    def __init__(self, mode):
+        self.mode = mode
+        self.display = ssd1306.SSD1306_I2C(128, 64, Panel())
+        self.gfx = GFX(128, 64, self.display.pixel, self.display.hline, self.display.vline,
+                       framebuffer=self.display)
+        self.background = Background(self.display)
+        self.frames = []
+        self.calls = []
+        self.us = []
+
+    def chrome(self, header, code, tgt):
+        display = self.display
+        display.text(header, 0, 0, 1)
+        display.text(code, 0, 10, 1)
+        display.text("^" + str(tgt.lat), 0, 20)
+        display.text(">" + str(tgt.lon), 0, 30)
+        display.text('N', CX - 4, 0, 1)
+        self.gfx.circle(CX, CY, RADIUS, 1)
+        display.text("dist (km)", 0, 40, 1)
+
+    def update_oled(self, header, code, tgt, d, b):
+        display = self.display
+        calls = display.calls
+        start = time.perf_counter()
+
+        if self.mode == 'redraw':
+            display.fill(0)
+            self.chrome(header, code, tgt)
+        else:
+            key = (header, code, tgt.lat, tgt.lon)
+            if self.background.stale(key):
+                display.fill(0)
+                self.chrome(header, code, tgt)
+                self.background.capture(display, key)
+            else:
+                self.background.restore(display)
+
+        angle = b - radians(90)
+        display.line(CX, CY, CX - ceil(RADIUS * cos(angle)), CY - ceil(RADIUS * sin(angle)), 1)
+        display.text(str(d / 1000) if d > 0 else "--.----", 0, 50, 1)
+
+        self.us.append((time.perf_counter() - start) * 1e6)
+        self.calls.append(display.calls - calls)
+        self.frames.append(bytes(display.buffer))
+
+
+def replay(mode):
+    table = TargetTable(targets)
+    code = "CB69#A409"
+    tgt = table.get(code)
+    here = Position(tolerance=1.0)
+    screen = Screen(mode)
+    fixes = list(track_fixes())
+    for i, (ms, lat_e7, lon_e7, speed, course, hdop) in enumerate(fixes):
+        header = "Scan for" if i < len(fixes) * 2 // 3 else "*IN ZONE*"
+        here.set_e7(lat_e7, lon_e7)
+        d, b = fast_distance_bearing(here, tgt)
+        screen.update_oled(header, code, tgt, d, radians(b))
+    return screen
+
+
+def main():
+    screens = [replay(mode) for mode in ('redraw', 'background')]
+    redraw = screens[0]
+
+    print("update_oled() along the track, %d frames" % len(redraw.frames))
+    print("%-12s %12s %14s %14s %10s" % ("", "calls/frame", "host us/frame", "host us max", "speedup"))
+    for screen in screens:
+        us = sum(screen.us) / len(screen.us)
+        print("%-12s %12.1f %14.1f %14.1f %9.1fx" %
+              (screen.mode, sum(screen.calls) / len(screen.calls), us, max(screen.us),
+               sum(redraw.us) / len(redraw.us) / us))
+
+    background = screens[1].background
+    print("\nbackground: %d captures, %d restores" % (background.captures, background.restores))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+bench_track.py
+Host (CPython) benchmark for the position estimators, on the synthetic
+track in nmea_sample.nmea (make_nmea_sample.py)
+  dead_reckoning.py: time per 10 Hz frame against holding the last fix
+  gps_filter.py: time per filter update on the sample track and a
+  noisier one with HDOP spikes, and oled redraws at 5 Hz with and
+  without the filter and redraw gate
+  check_dead_reckoning.py and check_gps_filter.py check the estimates
+  run with: python3 bench_track.py
+"""
+import math
+import random
+import time
+
+from bench_nav import destination, SEED, target_degrees
+from dead_reckoning import DeadReckoner
+from gps_filter import PositionFilter, RedrawGate
+from host_check import track_fixes
+from navigation import fast_distance_bearing, M_PER_E7, Position, TargetTable
+from quadcorder_targets import targets
+
+FRAME_MS = 100
+OLED_MS = 200
+REPEAT = 20
+
+
+def metres(lat1, lon1, lat2, lon2):
+    dy = (lat2 - lat1) * M_PER_E7
+    dx = (lon2 - lon1) * M_PER_E7 * math.cos(lat1 * math.pi / 1800000000)
+    return math.sqrt(dx * dx + dy * dy)
+
+
+def frames(fixes, estimator):
+    """
+    feed every fix and sample estimator.estimate() every FRAME_MS up to
+    the next fix
+      returns (errors against the next fix just before it lands,
+               distance moved between consecutive frames)
+    """
+    errors = []
+    steps = []
+    last = None
+    for i, (ms, lat_e7, lon_e7, speed, course, hdop) in enumerate(fixes):
+        estimator.fix(lat_e7, lon_e7, speed, course, ms)
+        if i + 1 == len(fixes):
+            break
+
+        next_ms, next_lat, next_lon = fixes[i + 1][:3]
+        for t in range(ms, next_ms, FRAME_MS):
+            est = estimator.estimate(t)
+            if last is not None:
+                steps.append(metres(last[0], last[1], est[0], est[1]))
+            last = est
+        errors.append(metres(last[0], last[1], next_lat, next_lon))
+    return errors, steps
+
+
+class HoldLastFix():
+    """
+    what the display does without dead reckoning
+    """
+    def fix(self, lat_e7, lon_e7, speed, course, now_ms):
+        self.position = (lat_e7, lon_e7)
+
+    def estimate(self, now_ms):
+        return self.position
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def estimate_time(fixes, estimator):
+    """
+    seconds for every fix() and estimate() along the track, and the
+    number of estimates
+    """
+    count = 0
+    start = time.perf_counter()
+    for i, (ms, lat_e7, lon_e7, speed, course, hdop) in enumerate(fixes[:-1]):
+        estimator.fix(lat_e7, lon_e7, speed, course, ms)
+        for t in range(ms, fixes[i + 1][0], FRAME_MS):
+            estimator.estimate(t)
+            count += 1
+    return time.perf_counter() - start, count
+
+
+def bench_dead_reckoning(fixes):
+    print("dead reckoning, %d fixes, estimate every %d ms, best of %d" % (len(fixes), FRAME_MS, REPEAT))
+    print("%-22s %14s" % ("", "host us/frame"))
+    for label, make in (("hold last fix", HoldLastFix),
+                        ("dead reckoning", DeadReckoner)):
+        best = min(estimate_time(fixes, make()) for _ in range(REPEAT))
+        print("%-22s %14.2f" % (label, best[0] / best[1] * 1e6))
+
+
+def noisy_stationary(rng, count=300):
+    """
+    standing at Home with 4 m noise, one fix in ten a 15 m outlier the
+    receiver flags with a high HDOP
+    """
+    lat, lon = target_degrees["0000#CCCC"]
+    fixes = []
+    for i in range(count):
+        hdop = 1.0
+        sigma = 4.0
+        if i % 10 == 5:
+            hdop = 4.0
+            sigma = 15.0
+        p = destination(lat, lon, abs(rng.gauss(0, sigma)), rng.uniform(0, 360))
+        fixes.append((i * 1000, int(round(p[0] * 1e7)), int(round(p[1] * 1e7)), 0.0, 0.0, hdop))
+    return fixes
+
+
+def filter_time(fixes):
+    """
+    seconds for a PositionFilter.update() of every fix
+    """
+    kf = PositionFilter()
+    start = time.perf_counter()
+    for ms, lat_e7, lon_e7, speed, course, hdop in fixes:
+        kf.update(lat_e7, lon_e7, hdop, ms)
+    return time.perf_counter() - start
+
+
+def bench_filter(fixes, rng):
+    print("\nPositionFilter.update(), best of %d" % REPEAT)
+    print("%-30s %8s %14s" % ("", "fixes", "host us/fix"))
+    for label, track in (("sample track", fixes), ("synthetic 4 m, hdop spikes", noisy_stationary(rng))):
+        best = min(filter_time(track) for _ in range(REPEAT))
+        print("%-30s %8d %14.2f" % (label, len(track), best / len(track) * 1e6))
+
+
+def oled_frames(fixes, target, use_filter, gate):
+    """
+    the Quadcorder at OLED_MS: every fix goes to the reckoner, through
+    the filter if use_filter, and each frame redraws if the gate lets it
+      returns (redraws, redraws while standing still, frames)
+    """
+    kf = PositionFilter()
+    reckoner = DeadReckoner()
+    here = Position(tolerance=1.0)
+    redraws = still_redraws = frames = 0
+    shown = None
+
+    for i, (ms, lat_e7, lon_e7, speed, course, hdop) in enumerate(fixes):
+        if use_filter:
+            kf.update(lat_e7, lon_e7, hdop, ms)
+            lat_e7, lon_e7 = kf.lat_e7, kf.lon_e7
+        reckoner.fix(lat_e7, lon_e7, speed, course, ms)
+        if i + 1 == len(fixes):
+            break
+
+        for t in range(ms, fixes[i + 1][0], OLED_MS):
+            frames += 1
+            here.set_e7(*reckoner.estimate(t))
+            d, b = fast_distance_bearing(here, target)
+            if gate is None:
+                # without a gate the oled is redrawn whenever the shown
+                # text or needle changes at all
+                draw = (str(d / 1000), round(b)) != shown
+                shown = (str(d / 1000), round(b))
+            else:
+                draw = gate.check(d, b)
+            if draw:
+                redraws += 1
+                if speed < 0.5:
+                    still_redraws += 1
+    return redraws, still_redraws, frames
+
+
+# label, filter the fixes, redraw gate
+REDRAW_CASES = (("raw fixes", False, None),
+                ("filtered", True, None),
+                ("raw + gate 2 m / 3 deg", False, RedrawGate),
+                ("filtered + gate 2 m / 3 deg", True, RedrawGate))
+
+
+def bench_redraws(fixes):
+    """
+    each redraw is a full oled flush on the device, so the count is the
+    cost here, host us/frame is what deciding it costs
+    """
+    table = TargetTable(targets)
+    print("\noled redraws at %d ms over the sample track" % OLED_MS)
+    print("%-12s %-30s %8s %8s %8s %14s" % ("target", "", "frames", "redraws", "still", "host us/frame"))
+    for code in ("A08D#6CDD", "CB69#A409"):
+        target = table.get(code)
+        for label, use_filter, gate in REDRAW_CASES:
+            start = time.perf_counter()
+            redraws, still, frames = oled_frames(fixes, target, use_filter, gate() if gate else None)
+            elapsed = time.perf_counter() - start
+            print("%-12s %-30s %8d %8d %8d %14.2f" % (code, label, frames, redraws, still, elapsed / frames * 1e6))
+
+
+def main():
+    fixes = track_fixes()
+    bench_dead_reckoning(fixes)
+    bench_filter(fixes, random.Random(SEED))
+    bench_redraws(fixes)
+
+
+if __name__ == "__main__":
+    main()
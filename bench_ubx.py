@@ -0,0 +1,105 @@
+"""
+bench_ubx.py
+Host (CPython) benchmark for ubx.py against micropyGPS.py on the same
+synthetic track
+  every epoch of nmea_sample.nmea is parsed with MicropyGPS and written
+  back out as the NAV-PVT frame a u-blox receiver would have sent for it,
+  then both parsers are timed per fix
+  check_ubx.py checks UBXParser gives the same fixes
+  run with: python3 bench_ubx.py
+"""
+from math import cos, radians, sin
+from struct import pack_into
+import time
+
+from bench_gps_config import load_epochs
+from gps_config import ubx_frame
+from micropyGPS import MicropyGPS
+from ubx import MMS_TO_KNOTS, NAV_PVT_FORMAT, NAV_PVT_LENGTH, UBX_CLASS_NAV, UBX_NAV_PVT, UBXParser
+
+
+def nmea_fixes(epochs):
+    """
+    MicropyGPS's fix after each epoch, the attributes UBXParser shares
+    """
+    gps = MicropyGPS(fixed_point=True)
+    fixes = []
+    for epoch in epochs:
+        for line in epoch:
+            gps.parse_sentence(line)
+        fixes.append({'valid': gps.valid,
+                      'latitude_e7': gps.latitude_e7,
+                      'longitude_e7': gps.longitude_e7,
+                      'speed': gps.speed[0],
+                      'course': gps.course,
+                      'altitude': gps.altitude,
+                      'geoid_height': gps.geoid_height,
+                      'satellites_in_use': gps.satellites_in_use,
+                      'hdop': gps.hdop,
+                      'pdop': gps.pdop,
+                      'timestamp': list(gps.timestamp),
+                      'date': tuple(gps.date),
+                      'fix_type': gps.fix_type})
+    return fixes
+
+
+def nav_pvt(fix):
+    """
+    The NAV-PVT frame for a fix
+    """
+    payload = bytearray(NAV_PVT_LENGTH)
+    h, m, s = fix['timestamp']
+    day, month, year = fix['date']
+    g_speed = int(round(fix['speed'] / MMS_TO_KNOTS))
+    course = radians(fix['course'])
+    height = int(round(fix['altitude'] * 1000))
+    fix_type, flags = (fix['fix_type'], 0x01) if fix['valid'] else (0, 0)
+    pack_into(NAV_PVT_FORMAT, payload, 0,
+              (((h * 60 + m) * 60) + int(s)) * 1000, 2000 + year, month, day, h, m, int(s), 0x07, 50,
+              int(round((s - int(s)) * 1e9)), fix_type, flags, 0, fix['satellites_in_use'],
+              fix['longitude_e7'], fix['latitude_e7'], height + int(round(fix['geoid_height'] * 1000)), height,
+              int(fix['hdop'] * 2500), int(fix['pdop'] * 2500),
+              int(g_speed * cos(course)), int(g_speed * sin(course)), 0, g_speed,
+              int(round(fix['course'] * 100000)), 300, 500000, int(round(fix['pdop'] * 100)))
+    return ubx_frame(UBX_CLASS_NAV, UBX_NAV_PVT, payload)
+
+
+def per_fix_us(parser, stream, epochs, repeat=5):
+    best = None
+    for _ in range(repeat):
+        gps = parser()
+        start = time.perf_counter()
+        for i in range(0, len(stream), 256):
+            gps.update_bytes(stream[i:i + 256])
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(epochs) * 1e6
+
+
+def bench_parse(epochs, frames):
+    print("parse cost per fix, %d fixes, fed in 256 byte chunks" % len(epochs))
+    print("%-34s %10s %10s %12s" % ("", "bytes/fix", "us/fix", "vs RMC+GGA"))
+
+    all_nmea = b"".join(line for epoch in epochs for line in epoch)
+    rmc_gga = b"".join(line for epoch in epochs for line in epoch if line[3:6] in (b"RMC", b"GGA"))
+    ubx = b"".join(frames)
+
+    cases = (("NMEA, all sentences", lambda: MicropyGPS(fixed_point=True), all_nmea),
+             ("NMEA, RMC+GGA", lambda: MicropyGPS(sentences=("RMC", "GGA"), fixed_point=True), rmc_gga),
+             ("UBX NAV-PVT", UBXParser, ubx))
+    results = []
+    for label, parser, stream in cases:
+        results.append(per_fix_us(parser, stream, epochs))
+    for (label, parser, stream), us in zip(cases, results):
+        print("%-34s %10.0f %10.1f %11.1fx" % (label, len(stream) / len(epochs), us, results[1] / us))
+
+
+def main():
+    epochs = load_epochs()
+    fixes = nmea_fixes(epochs)
+    frames = [nav_pvt(fix) for fix in fixes]
+    bench_parse(epochs, frames)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@ from adafruitGFX import GFX
 from machine import disable_irq, enable_irq, I2C, Pin, reset, Timer, UART
 from math import atan2, degrees, ceil, cos, floor, pi, radians, sin, sqrt
 from micropyGPS import MicropyGPS
+from nmea_capture import NMEACapture
 
 import ssd1306
 import sys
@@ -22,6 +23,7 @@ display.show()
 """
 Set up the GPS receiver on UART 1
   set up the gps parser
+  the last 16 raw sentences are kept for debugging, gps_log.dump()
 """
 uart = UART(1,
             rx=21,
@@ -33,29 +35,23 @@ uart = UART(1,
             timeout=5000,
             rxbuf=1024)
 
-gps_message = ""
-gps = MicropyGPS()
+gps_log = NMEACapture(16)
+gps = MicropyGPS(sentences=("RMC", "GGA"))
 
 
 def update_gps_info():
     """
     Query gps module for data and pass it to the gps parser
       read from the serial port
-      convert int to char and feed to parser one char at a time
+      parse the whole line in one call
       retval is True when a message is read from uart, False if not
     """
-    global gps_message
     retval = False
 
     buf = uart.readline()
-    if buf is None:
-        gps_message = "empty"
-        
-    else:
-        for char in buf:
-            gps.update(chr(char))
-            gps_message += chr(char)
-            
+    if buf is not None:
+        gps.parse_sentence(buf)
+        gps_log.feed(buf, len(buf))
         retval = True
 
     return retval
@@ -10,12 +10,22 @@ from adafruitGFX import GFX
 from basic_ble import *
 from KeyPad import KeyPad
 from machine import disable_irq, enable_irq, I2C, Pin, reset, Timer, UART
-from math import atan2, degrees, ceil, cos, floor, pi, radians, sin, sqrt
+from math import ceil, cos, floor, pi, radians, sin
+from dead_reckoning import DeadReckoner
+from geofence import EXIT, Geofence
+from gps_config import GPSConfig
+from gps_filter import PositionFilter, RedrawGate
+from gps_ingest import GPSIngest
 from micropyGPS import MicropyGPS
+from navigation import fast_distance_bearing, Position, TargetTable
+from nmea_capture import NMEACapture
+from oled_background import Background
+from quadcorder_targets import targets
 from rotary_irq_esp import RotaryIRQ
 import ssd1306
 import sys
 import time
+from ubx import UBXParser
 import ubluetooth
 
 # Device Pin numbers
@@ -35,15 +45,16 @@ KP_C2=25
 KP_C3=33
 KP_C4=32
 
-# GPS Targets
-targets = {"0000#CCCC": (42.040545, -86.435835), # Home
-           "A08D#6CDD": (42.039323, -86.435976), # Substation
-           "CB69#A409": (42.044174, -86.446875), # EP Clark Elementary
-           "D694#734A": (42.048659, -86.473342), # Upton Middle School
-           "B2A5#55BD": (42.013209, -86.492442), # Lakeshore High School
-           "60C3#6748": (42.094203, -86.391581), # Lake Michigan College
-           "5DC3#154D": (42.015690, -86.504157)  # Lincoln Twp Library
-}
+# GPS receiver protocol
+#   'nmea' - MediaTek receiver, RMC and GGA sentences
+#   'ubx'  - u-blox receiver, binary NAV-PVT frames, cheaper to parse
+GPS_PROTOCOL = 'nmea'
+
+# radians, sin and cos of every target, computed once
+target_table = TargetTable(targets)
+# current position, trig updated once per refresh. targets within the
+# flat earth limit skip haversine, distance error stays under 1 m
+here = Position(tolerance=1.0)
 beacon_key = b'67D7A2D5'
 
 """
@@ -53,7 +64,11 @@ Set up OLED on I2C
 """
 i2c = I2C(0) 
 display = ssd1306.SSD1306_I2C(128, 64, i2c)
-gfx = GFX(128, 64, display.pixel, display.hline, display.vline)
+# lines, rectangles and circles go to the display's native framebuf methods
+gfx = GFX(128, 64, display.pixel, display.hline, display.vline, framebuffer=display)
+# the header, target, compass ring and captions of update_oled(), drawn
+# once per header and target and copied in to start each refresh
+oled_background = Background(display)
 
 display.fill(1)
 display.show()
@@ -119,7 +134,9 @@ knob.add_listener(knob_listener)
 
 """
 Set up the GPS receiver on UART 1
-  set up the gps parser
+  set up the parser for GPS_PROTOCOL, both publish the same fix
+  the ingest stage drains the uart into the parser from the main loop
+  with NMEA the last 16 raw sentences are kept for debugging, gps_log.dump()
 """
 uart = UART(1,
             rx=UART_RX,
@@ -131,8 +148,53 @@ uart = UART(1,
             timeout=5000,
             rxbuf=1024)
 
-gps_message = ""
-gps = MicropyGPS()
+if GPS_PROTOCOL == 'ubx':
+    gps = UBXParser()
+    gps_log = None
+else:
+    gps = MicropyGPS(sentences=("RMC", "GGA"), fixed_point=True)
+    gps_log = NMEACapture(16)
+gps_in = GPSIngest(uart, gps, rxbuf=1024, capture=gps_log)
+
+"""
+Cut the receiver's output to what the parser uses at 115200 baud, 5
+fixes a second for the dead reckoning
+  NMEA: RMC and GGA only
+  UBX: NAV-PVT only, every NMEA sentence off
+  the uart follows the baud change, a receiver that doesn't answer is
+  left at its defaults and the parser skips what it doesn't use
+"""
+if GPS_PROTOCOL == 'ubx':
+    gps_config = GPSConfig(uart, 'ubx', baudrate=9600, ingest=gps_in)
+    gps_ok = gps_config.configure(sentences=(), baudrate=115200, hz=5, nav_pvt=True)
+else:
+    gps_config = GPSConfig(uart, 'pmtk', baudrate=9600, ingest=gps_in)
+    gps_ok = gps_config.configure(sentences=("RMC", "GGA"), baudrate=115200, hz=5)
+if not gps_ok:
+    print('GPS configuration incomplete, acks ' + str(gps_config.acks) +
+          ' naks ' + str(gps_config.naks) + ' timeouts ' + str(gps_config.timeouts))
+
+"""
+Geofence of 25 m around every target
+  10 m of hysteresis keeps jitter at the edge from flickering in and out
+"""
+fences = Geofence(hysteresis=10, dwell_ms=30000)
+fences.add_targets(target_table, 25)
+
+"""
+Position estimate between fixes from the last fix's speed and course,
+so the compass and distance move at the oled refresh rate
+"""
+reckoner = DeadReckoner()
+
+"""
+Fixes are smoothed, weighted by HDOP, before they reach the reckoner and
+the geofences. the oled timer only redraws when the distance or needle
+would visibly change
+"""
+kf = PositionFilter()
+redraw = RedrawGate(distance_m=2, bearing_deg=3)
+oled_header = ""
 
 """
 Set up the keypad
@@ -152,8 +214,12 @@ RX_UUID  = ubluetooth.UUID('6E400002-B5A3-F393-E0A9-E50E24DCCA9E')
 
 """
 set up a timer for oled refresh, period is in ms
+    5 Hz, the dead reckoning estimate moves between fixes
     Timer(0) used by basic_ble.py
+  frames go out a page per main loop pass, within OLED_BUDGET_US, so BLE
+  and knob events are still handled while one is in flight
 """
+OLED_BUDGET_US = 2000
 oled_timer_triggered = False
 
 def oled_timer_isr(t):
@@ -162,7 +228,7 @@ def oled_timer_isr(t):
     
 oled_timer = Timer(1)
 
-oled_timer.init(period = 5000,
+oled_timer.init(period = 200,
                 mode=Timer.PERIODIC,
                 callback=oled_timer_isr)
 
@@ -175,67 +241,24 @@ def debounce_pin(pin):
     time.sleep_ms(50)
     pin.irq(trigger=Pin.IRQ_FALLING, handler=knob_btn_isr)
 
-def update_gps_info():
+def calc_distance_bearing(lat_e7, lon_e7, target):
     """
-    Query gps module for data and pass it to the gps parser
-      read from the serial port
-      convert int to char and feed to parser one char at a time
-      retval is True when a message is read from uart, False if not
+    Distance (metres) and bearing (degrees) from a 1e-7 degree fix to a
+    target from target_table, both -1 without a fix or a target
     """
-    global gps_message
-    retval = False
+    if target is None or lat_e7 == 0 or lon_e7 == 0:
+        return -1, -1
 
-    buf = uart.readline()
-    if buf is None:
-        gps_message = "empty"
-        
-    else:
-        for char in buf:
-            gps.update(chr(char))
-            gps_message += chr(char)
-            
-        retval = True
-
-    return retval
-
-def calc_distance(lat1, lon1, lat2, lon2):
-    if lat1 == 0 or lon1 == 0 or lat2 == 0 or lon2 == 0:
-        return -1
-
-    #radius of Earth in metres
-    R = 6371000
-
-    #convert lat/lon to radians
-    lat1r = radians(lat1)
-    lat2r = radians(lat2)
-    deltaLat = radians(lat2-lat1)
-    deltaLon = radians(lon2-lon1)
-
-    #haversine formula
-    a = (sin(deltaLat/2) * sin(deltaLat/2)) + (cos(lat1r) * cos(lat2r) * (sin(deltaLon/2) * sin(deltaLon/2)))
-    c = 2 * atan2(sqrt(a), sqrt(1-a))
-    return R * c
-
-def calc_bearing(lat1, lon1, lat2, lon2):
-    if lat1 == 0 or lon1 == 0 or lat2 == 0 or lon2 == 0:
-        return -1
+    here.set_e7(lat_e7, lon_e7)
+    return fast_distance_bearing(here, target)
 
-    #convert lat/lon to radians
-    lat1r = radians(lat1)
-    lat2r = radians(lat2)
-    deltaLat = radians(lat2-lat1)
-    deltaLon = radians(lon2-lon1)
-
-    a = cos(lat2r) * sin(deltaLon)
-    b = cos(lat1r) * sin(lat2r) - sin(lat1r) * cos(lat2r) * cos(deltaLon)
-    return (degrees(atan2(a,b)) + 360) % 360
-
-def display_bearing(cx, cy, radius, angleR):
+def display_compass(cx, cy, radius):
     global gfx
 
     display.text('N', cx-4, 0, 1)
     gfx.circle(cx, cy, radius, 1)
-    
+
+def display_bearing(cx, cy, radius, angleR):
     if angleR < 0:
         display.text("No", cx-8, cy-8)
         display.text("GPS", cx-12, cy+8)
@@ -247,55 +270,63 @@ def display_bearing(cx, cy, radius, angleR):
 
         display.line(cx, cy, rx, ry, 1)
 
-    display.show()
-
 def update_oled(s):
     """
-    Get new data from GPS module and format it on the oled display
+    Format the latest published GPS fix on the oled display
+      timer refreshes are skipped unless something visible changed
+      each refresh starts from the background and only draws the needle
+      and distance
+      the frame is sent a page at a time from the main loop
     """
-    global tgt_found, tgt_code, tgt_lat, tgt_lon
-
-    display.fill(0)
+    global tgt_found, tgt_near, tgt_code, tgt_lat, tgt_lon, tgt, oled_header
 
     if tgt_found:
-        display.text("*BLINKING*", 0, 0, 1)
+        header = "*BLINKING*"
+    elif tgt_near:
+        header = "*IN ZONE*"
+    elif ble.scanning == True:
+        header = "Scan for"
     else:
-        if ble.scanning == True:
-            display.text("Scan for", 0, 0, 1)
+        header = "Scan OFF"
+
+    my_lat_e7, my_lon_e7 = reckoner.estimate()
+    d, b = calc_distance_bearing(my_lat_e7, my_lon_e7, tgt)
+
+    if s != "timer" or header != oled_header:
+        redraw.force()
+    if not redraw.check(d, b):
+        return
+    oled_header = header
+
+    key = (header, tgt_code, tgt_lat, tgt_lon)
+    if oled_background.stale(key):
+        display.fill(0)
+        display.text(header, 0, 0, 1)
+
+        if tgt_code > "":
+            display.text(tgt_code, 0, 10, 1)
+
+            display.text("^" + str(tgt_lat), 0, 20)
+            display.text(">" + str(tgt_lon), 0, 30)
         else:
-            display.text("Scan OFF", 0, 0, 1)
-
-    gps.coord_format = "dd"
-    if update_gps_info():
-        gps.coord_format = "dd"
-        my_lat=gps.latitude[0]
-        if gps.latitude[1] == "S":
-            my_lat = my_lat * -1
-        my_lon=gps.longitude[0]
-        if gps.longitude[1] == "W":
-            my_lon = my_lon * -1
-
-    if tgt_code > "":
-        display.text(tgt_code, 0, 10, 1)
-
-        display.text("^" + str(tgt_lat), 0, 20)
-        display.text(">" + str(tgt_lon), 0, 30)
+            display.text("   No", 0, 10, 1)
+            display.text(" Target", 0, 20)
+            display.text("Selected", 0, 30)
+
+        display_compass(106, 30, 20)
+        display.text("dist (km)", 0, 40, 1)
+        oled_background.capture(display, key)
     else:
-        display.text("   No", 0, 10, 1)
-        display.text(" Target", 0, 20)
-        display.text("Selected", 0, 30)
+        oled_background.restore(display)
 
-    b = calc_bearing(my_lat, my_lon, tgt_lat, tgt_lon)
-    display_bearing(106, 30, 20, b)
-    
-    d = calc_distance(my_lat, my_lon, tgt_lat, tgt_lon)
-    display.text("dist (km)", 0, 40, 1)
+    # bearing is in degrees, the needle wants radians, -1 is no fix
+    display_bearing(106, 30, 20, radians(b) if b >= 0 else -1)
     if d>0:
         display.text(str(d/1000), 0, 50, 1)
     else:
         display.text("--.----", 0, 50, 1)
     
-    display.show()
+    display.begin_flush()
 
 def qc_menu(menu_items):
     global knob_dir, knob_change, knob_btn_pushed
@@ -304,8 +335,12 @@ def qc_menu(menu_items):
     prev_item = 1
     display.fill(0)
     display.show()
+    # the menu replaces update_oled()'s frame, redraw it after
+    redraw.force()
 
     while True:
+        gps_in.poll()
+
         if knob_btn_pushed:
             knob_btn_pushed = False
             break
@@ -346,8 +381,12 @@ def qc_enter_code():
     display.text("Enter Code:", 0, 0, 1)
     gfx.fill_rect(len(t)*8, 20, 8, 8, 1)
     display.show()
+    # the code entry replaces update_oled()'s frame, redraw it after
+    redraw.force()
     
     while True:
+        gps_in.poll()
+
         if knob_btn_pushed:
             debounce_pin(knob_btn)
             knob_btn_pushed = False
@@ -374,15 +413,20 @@ display.text("   initialize   ", 0, 30, 1)
 display.show()
 
 while True:
+    gps_in.poll()
+
     if knob_btn_pushed:
         debounce_pin(knob_btn)
         knob_btn_pushed = False
         break
 
 tgt_found=False
+tgt_near=False
 tgt_code=""
 tgt_lat=0
 tgt_lon=0
+tgt=None
+last_fix=0
 
 while True:
     """
@@ -396,15 +440,19 @@ while True:
         """ do whatever """
         tgt_code = qc_enter_code()
 
-        if tgt_code in targets.keys():
-            tgt_lat = targets[tgt_code][0]
-            tgt_lon = targets[tgt_code][1]
+        if tgt_code in target_table:
+            tgt = target_table.get(tgt_code)
+            tgt_lat = tgt.lat
+            tgt_lon = tgt.lon
             tgt_found = False
+            tgt_near = fences.get(tgt_code).inside
             ble.scan()
             update_oled("button")
         else:
+            tgt = None
             tgt_lat = 0
             tgt_lon = 0
+            tgt_near = False
             display.fill(0)
             display.text("Invalid Code", 5*4, 20, 1)
             display.text(tgt_code, int(16-(len(tgt_code))/2)*4, 30, 1)
@@ -414,11 +462,17 @@ while True:
             tgt_code=""
 
             while True:
+                gps_in.poll()
+
                 if knob_btn_pushed:
                     debounce_pin(knob_btn)
                     knob_btn_pushed = False
                     break
 
+            # back from "Invalid Code", the gate would otherwise keep it
+            # up while the distance and bearing stay -1
+            update_oled("button")
+
     """
     timer interrupt was triggered
       reset, then do whatever
@@ -486,4 +540,28 @@ while True:
         if ble.event_id == ble.IRQ_PERIPHERAL_DISCONNECT:
             ble.disconnected()
 
-    time.sleep_ms(10)
+    """
+    drain the GPS uart every pass so the rx buffer never overflows
+    """
+    gps_in.poll()
+
+    """
+    send the next pages of an oled frame in flight
+    """
+    display.poll(OLED_BUDGET_US)
+
+    """
+    new GPS fix, filter it, restart the estimate from it and check the
+    geofences
+    """
+    if gps_in.fix_count != last_fix and gps_in.valid:
+        last_fix = gps_in.fix_count
+        kf.update(gps_in.latitude_e7, gps_in.longitude_e7, gps.hdop)
+        reckoner.fix(kf.lat_e7, kf.lon_e7, gps.speed[0], gps.course)
+        for event, zone in fences.update(kf.lat_e7, kf.lon_e7):
+            if zone.name == tgt_code:
+                tgt_near = event != EXIT
+                update_oled("zone")
+
+    if not display.flushing():
+        time.sleep_ms(10)
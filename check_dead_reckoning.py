@@ -0,0 +1,50 @@
+"""
+check_dead_reckoning.py
+Host (CPython) check for dead_reckoning.py, on the synthetic track in
+nmea_sample.nmea (make_nmea_sample.py)
+  the 10 Hz estimate against holding the last fix, as the display does
+  without dead reckoning
+    it must be nearer the next fix when that lands, on average
+    the shown position must move in smaller steps between frames
+  and blending into a new fix must give smaller steps than jumping to it
+  exits 1 if any check fails
+  run with: python3 check_dead_reckoning.py
+"""
+import sys
+
+from bench_track import FRAME_MS, frames, HoldLastFix, percentile
+from dead_reckoning import DeadReckoner
+from host_check import check, track_fixes
+
+
+def main():
+    fixes = track_fixes()
+    results = {}
+    print("%d fixes, estimate every %d ms" % (len(fixes), FRAME_MS))
+    print("%-22s %12s %12s %12s %12s" % ("", "mean err m", "p95 err m", "p95 step m", "max step m"))
+    for label, estimator in (("hold last fix", HoldLastFix()),
+                             ("dead reckoning", DeadReckoner()),
+                             ("no blending", DeadReckoner(blend_ms=1))):
+        errors, steps = frames(fixes, estimator)
+        moving = [s for s in steps if s > 0]
+        results[label] = (sum(errors) / len(errors), max(steps))
+        print("%-22s %12.2f %12.2f %12.2f %12.2f" %
+              (label, results[label][0], percentile(errors, 0.95),
+               percentile(moving, 0.95) if moving else 0.0, results[label][1]))
+
+    failures = []
+    held = results["hold last fix"]
+    reckoned = results["dead reckoning"]
+    jumped = results["no blending"]
+    check("mean error %.2f m, holding the last fix %.2f m" % (reckoned[0], held[0]),
+          reckoned[0] < held[0], failures)
+    check("max step %.2f m, holding the last fix %.2f m" % (reckoned[1], held[1]),
+          reckoned[1] < held[1], failures)
+    check("max step %.2f m, without blending %.2f m" % (reckoned[1], jumped[1]),
+          reckoned[1] < jumped[1], failures)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+check_geofence.py
+Host (CPython) check for geofence.py
+  replays the synthetic track in nmea_sample.nmea and checks the enter,
+  exit and dwell events it raises, in order
+  fixes jittering at a zone edge must raise fewer events with hysteresis
+  than without
+  the incremental zone search, for every margin, must raise the same
+  events as testing every zone on every fix
+  exits 1 if any check fails
+  run with: python3 check_geofence.py
+"""
+import math
+import random
+import sys
+
+from bench_geofence import incremental_events
+from bench_nav import destination, SEED, target_degrees
+from geofence import DWELL, ENTER, EXIT, Geofence
+from host_check import check, track_fixes
+from navigation import TargetTable
+from quadcorder_targets import targets
+
+# the track idles at Home, walks to the Substation, dwells, then heads
+# off toward EP Clark and crosses the Road zone on the way
+EXPECTED = [(ENTER, "0000#CCCC"), (DWELL, "0000#CCCC"), (EXIT, "0000#CCCC"),
+            (ENTER, "A08D#6CDD"), (DWELL, "A08D#6CDD"), (EXIT, "A08D#6CDD"),
+            (ENTER, "Road"), (DWELL, "Road"), (EXIT, "Road")]
+
+
+def road_polygon():
+    """
+    a 60 m wide box across the track, 120 - 180 m out from the
+    Substation toward EP Clark
+    """
+    lat, lon = target_degrees["A08D#6CDD"]
+    tlat, tlon = target_degrees["CB69#A409"]
+    heading = math.degrees(math.atan2((tlon - lon) * math.cos(math.radians(lat)), tlat - lat))
+    near = destination(lat, lon, 120, heading)
+    far = destination(lat, lon, 180, heading)
+    return [destination(near[0], near[1], 30, heading - 90),
+            destination(far[0], far[1], 30, heading - 90),
+            destination(far[0], far[1], 30, heading + 90),
+            destination(near[0], near[1], 30, heading + 90)]
+
+
+def jitter_fixes(rng, count=600):
+    """
+    fixes scattered with 3 m noise around a point on the edge of a 25 m
+    zone around Home, as when the player stands at the boundary
+    """
+    lat, lon = target_degrees["0000#CCCC"]
+    edge = destination(lat, lon, 25, 45)
+    fixes = []
+    for _ in range(count):
+        p = destination(edge[0], edge[1], abs(rng.gauss(0, 3)), rng.uniform(0, 360))
+        fixes.append((int(round(p[0] * 1e7)), int(round(p[1] * 1e7))))
+    return fixes
+
+
+def check_replay(fixes, failures):
+    fences = Geofence(hysteresis=10, dwell_ms=10000)
+    fences.add_targets(TargetTable(targets), 25)
+    fences.add_polygon("Road", road_polygon())
+
+    got = []
+    for ms, lat_e7, lon_e7, speed, course, hdop in fixes:
+        for event, zone in fences.update(lat_e7, lon_e7, ms):
+            got.append((event, zone.name))
+    check("track raises %d events: Home, Substation, Road" % len(got), got == EXPECTED, failures)
+    if got != EXPECTED:
+        print("  got %r" % got)
+
+
+def check_jitter(failures):
+    lat, lon = target_degrees["0000#CCCC"]
+    fixes = jitter_fixes(random.Random(SEED))
+    events = {}
+    for hysteresis in (0, 10):
+        fences = Geofence(hysteresis=hysteresis, dwell_ms=10000)
+        fences.add_circle("Home", lat, lon, 25)
+        for i, (lat_e7, lon_e7) in enumerate(fixes):
+            fences.update(lat_e7, lon_e7, i * 1000)
+        events[hysteresis] = fences.events
+    check("edge jitter: %d events without hysteresis, %d with 10 m" % (events[0], events[10]),
+          events[10] < events[0] and events[10] <= 3, failures)
+
+
+def check_incremental(fixes, failures):
+    runs = incremental_events(fixes, random.Random(SEED))
+    reference = runs[0][1]
+    for (label, events, fences, elapsed) in runs[1:]:
+        check("%s raises the same %d events as every zone" % (label, len(reference)),
+              events == reference, failures)
+
+
+def main():
+    fixes = track_fixes()
+    failures = []
+    check_replay(fixes, failures)
+    check_jitter(failures)
+    check_incremental(fixes, failures)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
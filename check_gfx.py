@@ -0,0 +1,85 @@
+"""
+check_gfx.py
+Host (CPython) check for adafruitGFX's native framebuf dispatch and
+clipping, with bench_gfx.py's primitives
+  a native primitive must not need more FrameBuffer calls than GFX's
+  Python drawing of it, and the dispatch must be found from a
+  FrameBuffer's pixel method alone
+  the native primitives must take the colour as a color or c keyword as
+  well as positionally, and without a colour do what the Python drawing
+  does
+  primitives that leave the screen must reach the backend no more often
+  than unclipped, and set exactly the unclipped pixels that land on
+  screen
+  exits 1 if any check fails
+  run with: python3 check_gfx.py
+"""
+import sys
+
+import host_framebuf
+host_framebuf.install()
+
+from adafruitGFX import GFX
+from bench_gfx import HEIGHT, image_pixels, new_gfx, OFF_SCREEN, PRIMITIVES, run, unclipped, WIDTH
+from host_check import check
+
+# primitives with a native framebuf method
+NATIVE = ("line", "rect", "fill_rect", "circle", "fill_circle")
+
+
+def outcome(native, method, args, kwargs):
+    """
+    the buffer drawn, or the name of the exception drawing raised
+    """
+    fb, gfx = new_gfx(native)
+    try:
+        getattr(gfx, method)(*args, **kwargs)
+    except Exception as e:
+        return type(e).__name__
+    return bytes(fb.buf)
+
+
+def check_calls(failures):
+    for name, method, args in PRIMITIVES:
+        py_calls = run(method, args, False, repeat=1)[0]
+        fb_calls = run(method, args, True, repeat=1)[0]
+        check("%s: %d native calls, %d Python" % (name, fb_calls, py_calls), fb_calls <= py_calls, failures)
+
+    fb, gfx = new_gfx(True)
+    check("native dispatch found from pixel alone", GFX(WIDTH, HEIGHT, fb.pixel).framebuffer is fb, failures)
+
+
+def check_colour(failures):
+    for name, method, args in PRIMITIVES:
+        if method not in NATIVE:
+            continue
+        drawn = outcome(True, method, args, {})
+        keyword = outcome(True, method, args[:-1], {'color': args[-1]})
+        c = outcome(True, method, args[:-1], {'c': args[-1]})
+        check("%s: color and c keywords draw the same" % name, keyword == drawn and c == drawn, failures)
+        omitted = outcome(True, method, args[:-1], {})
+        python = outcome(False, method, args[:-1], {})
+        check("%s: no colour, as the Python drawing (%s)" % (name, omitted if isinstance(omitted, str) else "drawn"),
+              omitted == python, failures)
+
+
+def check_clipping(failures):
+    for name, method, args in OFF_SCREEN:
+        before, visible = unclipped(method, args)
+        calls, host_us, image = run(method, args, False, repeat=1)
+        differ = len(image_pixels(image) ^ visible)
+        check("%s: %d calls clipped, %d unclipped, %d differ" % (name, calls, before, differ),
+              differ == 0 and calls <= before, failures)
+
+
+def main():
+    failures = []
+    check_calls(failures)
+    check_colour(failures)
+    check_clipping(failures)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+check_gps_async.py
+Host (CPython) check for gps_async.py
+  runs GPSReader to the end of a StreamReader fed nmea_sample.nmea a line
+  at a time, as a uart would, with a task waiting on wait_fix() and one
+  on wait_moved() beside it, and checks
+    the reader publishes one fix for every fix the parser takes, at the
+    same positions a plain MicropyGPS replay gives, and the loss of the
+    fix from a void RMC after the corpus
+    the waiter sees every published position and the loss
+    wait_moved() returns once the track has moved far enough
+    waiters already waiting, and waiters that call after the stream has
+    ended, return False / -1 instead of waiting forever
+  exits 1 if any check fails
+  run with: python3 check_gps_async.py
+"""
+import asyncio
+import sys
+
+from gps_async import distance_m, GPSReader
+from host_check import check, load_lines
+from micropyGPS import MicropyGPS
+
+MOVED_M = 50
+# the receiver losing the fix a second after the corpus ends
+LOST = b"$GPRMC,142425.00,V,,,,,,,171026,,,N*7A\r\n"
+TIMEOUT_S = 5
+
+
+def replay_fixes(lines):
+    """
+    (valid, latitude, longitude) after every sentence that gave
+    MicropyGPS a new fix or lost it
+    """
+    gps = MicropyGPS()
+    fix_time = gps.fix_time
+    valid = gps.valid
+    fixes = []
+    for line in lines:
+        if gps.parse_sentence(line) and (gps.fix_time != fix_time or gps.valid != valid):
+            fix_time = gps.fix_time
+            valid = gps.valid
+            fixes.append((valid, gps.latitude_decimal, gps.longitude_decimal))
+    return fixes
+
+
+async def feed(stream, lines):
+    """
+    one line at a time, letting the reader and the waiters run between
+    """
+    for line in lines:
+        stream.feed_data(line)
+        for _ in range(3):
+            await asyncio.sleep(0)
+    stream.feed_eof()
+
+
+async def watch_fixes(reader, seen):
+    while await reader.wait_fix():
+        seen.append((reader.valid, reader.latitude, reader.longitude))
+    return False
+
+
+async def run_reader(lines):
+    stream = asyncio.StreamReader()
+    reader = GPSReader(stream, MicropyGPS())
+    seen = []
+    watcher = asyncio.create_task(watch_fixes(reader, seen))
+    mover = asyncio.create_task(reader.wait_moved(MOVED_M))
+    feeder = asyncio.create_task(feed(stream, lines))
+    await asyncio.wait_for(reader.run(), TIMEOUT_S)
+    await feeder
+    watched = await asyncio.wait_for(watcher, TIMEOUT_S)
+    moved = await asyncio.wait_for(mover, TIMEOUT_S)
+
+    # called after the stream ended, must not wait for another pulse
+    try:
+        late_fix = await asyncio.wait_for(reader.wait_fix(), TIMEOUT_S)
+        late_moved = await asyncio.wait_for(reader.wait_moved(MOVED_M), TIMEOUT_S)
+    except asyncio.TimeoutError:
+        late_fix = late_moved = None
+    return reader, seen, watched, moved, late_fix, late_moved
+
+
+def main():
+    lines = load_lines() + [LOST]
+    fixes = replay_fixes(lines)
+    reader, seen, watched, moved, late_fix, late_moved = asyncio.run(run_reader(lines))
+    failures = []
+
+    check("reader ran to the end of the stream", not reader.running and reader.stopped, failures)
+    valid = [fix[1:] for fix in fixes if fix[0]]
+    check("%d fixes published, as many as the parser took" % reader.fix_count,
+          reader.fix_count == len(valid) and len(valid) > 0, failures)
+    check("loss of the fix published last", (reader.valid, reader.latitude, reader.longitude) == fixes[-1]
+          and not reader.valid, failures)
+    check("waiter saw every published position and the loss", seen == fixes, failures)
+    check("waiter returned False at the end of the stream", watched is False, failures)
+    first = valid[0]
+    far = max(distance_m(first[0], first[1], lat, lon) for lat, lon in valid)
+    check("wait_moved(%d) returned after moving %.0f m" % (MOVED_M, moved),
+          far > MOVED_M and moved > MOVED_M, failures)
+    check("wait_fix() after the end returns False", late_fix is False, failures)
+    check("wait_moved() after the end returns -1", late_moved == -1, failures)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
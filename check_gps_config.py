@@ -0,0 +1,75 @@
+"""
+check_gps_config.py
+Host (CPython) check for gps_config.py against bench_gps_config.py's
+FakeReceiver, for both protocols
+  the happy path, a NAKed command, an unanswered command and a lost
+  baud change
+  exits 1 if any check fails
+  run with: python3 check_gps_config.py
+"""
+import sys
+
+from bench_gps_config import FakeReceiver, load_epochs
+from gps_config import GPSConfig
+from gps_ingest import GPSIngest
+from host_check import check
+from micropyGPS import MicropyGPS
+
+
+def check_happy_path(protocol, epochs, failures):
+    receiver = FakeReceiver(protocol, epochs)
+    gps = MicropyGPS(sentences=("RMC", "GGA"))
+    ingest = GPSIngest(receiver, gps)
+    config = GPSConfig(receiver, protocol, baudrate=9600, timeout_ms=200, ingest=ingest)
+
+    ok = config.configure(sentences=("RMC", "GGA"), baudrate=115200, hz=10)
+    check("%s configure() returns True" % protocol, ok, failures)
+    check("%s receiver sends RMC, GGA only" % protocol, sorted(receiver.sentences) == ["GGA", "RMC"], failures)
+    check("%s receiver at 100 ms, 115200 baud" % protocol,
+          receiver.period_ms == 100 and receiver.baudrate == 115200, failures)
+    check("%s uart followed to 115200" % protocol,
+          receiver.host_baudrate == 115200 and config.baudrate == 115200, failures)
+
+    clean = gps.clean_sentences
+    for _ in range(20):
+        ingest.poll()
+    check("%s parser gets clean sentences afterwards" % protocol,
+          gps.clean_sentences > clean and gps.crc_fails == 0, failures)
+
+
+def check_nak(protocol, epochs, failures):
+    receiver = FakeReceiver(protocol, epochs, nak=(220, "RATE"))
+    config = GPSConfig(receiver, protocol, baudrate=9600, timeout_ms=200)
+    ok = config.set_rate(10)
+    check("%s NAKed rate change returns False" % protocol, ok is False and config.naks == 1, failures)
+
+
+def check_silent(protocol, epochs, failures):
+    receiver = FakeReceiver(protocol, epochs, silent=(314, "MSG"))
+    config = GPSConfig(receiver, protocol, baudrate=9600, timeout_ms=50)
+    ok = config.set_sentences(("RMC", "GGA"))
+    check("%s unanswered command times out" % protocol, ok is False and config.timeouts > 0, failures)
+
+
+def check_lost_baud(protocol, epochs, failures):
+    receiver = FakeReceiver(protocol, epochs, silent=(251, "PRT"))
+    config = GPSConfig(receiver, protocol, baudrate=9600, timeout_ms=100)
+    ok = config.set_baudrate(115200)
+    check("%s ignored baud change falls back to 9600" % protocol,
+          ok is False and receiver.host_baudrate == 9600 and config.baudrate == 9600, failures)
+
+
+def main():
+    epochs = load_epochs()
+    failures = []
+    for protocol in ("pmtk", "ubx"):
+        check_happy_path(protocol, epochs, failures)
+        check_nak(protocol, epochs, failures)
+        check_silent(protocol, epochs, failures)
+        check_lost_baud(protocol, epochs, failures)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
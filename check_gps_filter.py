@@ -0,0 +1,99 @@
+"""
+check_gps_filter.py
+Host (CPython) check for gps_filter.py, on the synthetic track in
+nmea_sample.nmea (make_nmea_sample.py)
+  position scatter standing still must be smaller filtered than raw, on
+  the sample track and a noisier one with HDOP spikes
+  the redraw gate must redraw the oled less often than on every change
+  of the raw fixes, and filtering the fixes before the gate less often
+  still, toward either target
+  exits 1 if any check fails
+  run with: python3 check_gps_filter.py
+"""
+import math
+import random
+import sys
+
+from bench_nav import SEED
+from bench_track import metres, noisy_stationary, oled_frames, OLED_MS, REDRAW_CASES
+from gps_filter import PositionFilter
+from host_check import check, track_fixes
+from navigation import TargetTable
+from quadcorder_targets import targets
+
+
+def scatter(points):
+    """
+    rms distance (metres) of 1e-7 degree points from their mean
+    """
+    lat = sum(p[0] for p in points) / len(points)
+    lon = sum(p[1] for p in points) / len(points)
+    return math.sqrt(sum(metres(lat, lon, p[0], p[1]) ** 2 for p in points) / len(points))
+
+
+def stationary_runs(fixes):
+    """
+    runs of consecutive fixes with a speed under 0.5 knots, the filter
+    needs a few fixes to settle so the first 5 of each run are skipped
+    """
+    runs = []
+    run = []
+    for i, fix in enumerate(fixes):
+        if fix[3] < 0.5:
+            run.append(i)
+        else:
+            if len(run) > 10:
+                runs.append(run[5:])
+            run = []
+    if len(run) > 10:
+        runs.append(run[5:])
+    return runs
+
+
+def filtered(fixes, kf):
+    out = []
+    for ms, lat_e7, lon_e7, speed, course, hdop in fixes:
+        kf.update(lat_e7, lon_e7, hdop, ms)
+        out.append((kf.lat_e7, kf.lon_e7))
+    return out
+
+
+def check_scatter(fixes, rng, failures):
+    """
+    rms metres from the mean over each stationary run, averaged
+    """
+    for label, track in (("sample track", fixes), ("synthetic 4 m, hdop spikes", noisy_stationary(rng))):
+        smooth = filtered(track, PositionFilter())
+        runs = stationary_runs(track)
+        raw = sum(scatter([track[i][1:3] for i in run]) for run in runs) / len(runs)
+        filt = sum(scatter([smooth[i] for i in run]) for run in runs) / len(runs)
+        check("%s: scatter %.2f m filtered, %.2f m raw" % (label, filt, raw), filt < raw, failures)
+
+
+def check_redraws(fixes, failures):
+    table = TargetTable(targets)
+    for code in ("A08D#6CDD", "CB69#A409"):
+        target = table.get(code)
+        counts = {}
+        for label, use_filter, gate in REDRAW_CASES:
+            counts[label] = oled_frames(fixes, target, use_filter, gate() if gate else None)[0]
+        raw = counts[REDRAW_CASES[0][0]]
+        gated = counts[REDRAW_CASES[2][0]]
+        filtered_gated = counts[REDRAW_CASES[3][0]]
+        check("%s: %d redraws raw + gated, %d raw" % (code, gated, raw), gated < raw, failures)
+        check("%s: %d redraws filtered + gated, %d raw + gated" % (code, filtered_gated, gated),
+              filtered_gated < gated, failures)
+
+
+def main():
+    fixes = track_fixes()
+    failures = []
+    print("%d fixes, oled at %d ms" % (len(fixes), OLED_MS))
+    check_scatter(fixes, random.Random(SEED), failures)
+    check_redraws(fixes, failures)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
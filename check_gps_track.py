@@ -0,0 +1,95 @@
+"""
+check_gps_track.py
+Host (CPython) check for the binary track log, MicropyGPS's
+start_logging(log_format='track') and gps_track.py
+  logs the synthetic track in nmea_sample.nmea both as NMEA and as a
+  track, replays the track through a fresh parser and checks
+    one record for every valid RMC fix
+    every latitude_e7, longitude_e7, date and time comes back as the
+    parser first had it
+    hdop is the last GGA's, 0 only in the first record
+    the track log is at least 20 times smaller than the NMEA log
+  and that _days_since_2000() and _civil_from_days() are inverses, and
+  agree with datetime, for every day from 2000 to 2099
+  exits 1 if any check fails
+  run with: python3 check_gps_track.py
+"""
+from datetime import date, timedelta
+import os
+import sys
+import tempfile
+
+from gps_track import _civil_from_days, read_track, replay_track
+from host_check import check, load_lines
+from micropyGPS import _days_since_2000, MicropyGPS
+
+MIN_RATIO = 20
+
+
+def log_corpus(lines, path, log_format):
+    """
+    parse every line with logging on
+      returns (latitude_e7, longitude_e7, date, timestamp, hdop) after
+      every valid RMC
+    """
+    gps = MicropyGPS(fixed_point=True)
+    gps.start_logging(path, mode='new', log_format=log_format)
+    fixes = []
+    for line in lines:
+        if gps.parse_sentence(line) == 'GPRMC' and gps.valid:
+            fixes.append((gps.latitude_e7, gps.longitude_e7, tuple(gps.date), list(gps.timestamp), gps.hdop))
+    gps.stop_logging()
+    return fixes
+
+
+def check_round_trip(lines, folder, failures):
+    track = os.path.join(folder, "track.bin")
+    nmea = os.path.join(folder, "nmea.log")
+    fixes = log_corpus(lines, track, 'track')
+    log_corpus(lines, nmea, 'nmea')
+
+    records = list(read_track(track))
+    check("%d records for %d valid RMC fixes" % (len(records), len(fixes)),
+          len(records) == len(fixes) and len(fixes) > 0, failures)
+
+    replayed = []
+    replay_track(track, MicropyGPS(fixed_point=True),
+                 lambda gps, record: replayed.append((gps.latitude_e7, gps.longitude_e7, tuple(gps.date),
+                                                      list(gps.timestamp))))
+    positions = sum(1 for a, b in zip(fixes, replayed) if a[:2] == b[:2])
+    dates = sum(1 for a, b in zip(fixes, replayed) if a[2:4] == b[2:4])
+    check("%d of %d positions come back exactly" % (positions, len(fixes)), positions == len(fixes), failures)
+    check("%d of %d dates and times come back" % (dates, len(fixes)), dates == len(fixes), failures)
+
+    hdops = [record[6] for record in records]
+    check("hdop as logged, 0 in the first record only",
+          hdops == [round(fix[4], 2) for fix in fixes] and hdops[0] == 0 and all(hdops[1:]), failures)
+
+    ratio = os.path.getsize(nmea) / os.path.getsize(track)
+    check("track %d bytes, NMEA %d bytes, %.1fx smaller" % (os.path.getsize(track), os.path.getsize(nmea), ratio),
+          ratio >= MIN_RATIO, failures)
+
+
+def check_days(failures):
+    start = date(2000, 1, 1)
+    wrong = 0
+    for days in range(36525):
+        d = start + timedelta(days)
+        civil = (d.day, d.month, d.year - 2000)
+        if _civil_from_days(days) != civil or _days_since_2000(*civil) != days:
+            wrong += 1
+    check("days since 2000 match datetime, 2000 - 2099 (%d wrong)" % wrong, wrong == 0, failures)
+
+
+def main():
+    lines = load_lines()
+    failures = []
+    with tempfile.TemporaryDirectory() as folder:
+        check_round_trip(lines, folder, failures)
+    check_days(failures)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
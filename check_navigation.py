@@ -0,0 +1,274 @@
+"""
+check_navigation.py
+Host (CPython) check for navigation.py
+  sweeps every target from points 10 m to 300 km around the targets and
+  checks the flat earth projection stays within its error bound
+  d**3 / (16 R**2 cos**2 lat) of haversine, and fast_distance_bearing()
+  within each tolerance
+  emulates the ESP32's float32 with array('f') and checks the integer
+  delta math stays within a metre of a float64 reference, next to the
+  old float degree math
+  exits 1 if any check fails
+  run with: python3 check_navigation.py
+"""
+from array import array
+import math
+import sys
+
+from bench_nav import calc_bearing, calc_distance, destination, HERE, target_degrees, TRIG
+from host_check import check
+import navigation
+from navigation import (distance_bearing, fast_distance_bearing, flat_distance_bearing,
+                        Position, R, Target, TargetTable)
+from quadcorder_targets import targets
+
+# flat earth tolerances (metres) checked by the sweep
+TOLERANCES = (0.01, 0.1, 1.0, 10.0)
+
+
+def sweep_positions():
+    """
+    every target, HERE, and points 10 m to 300 km out from each target
+    on 24 bearings
+    """
+    positions = [HERE] + list(target_degrees.values())
+    for lat, lon in target_degrees.values():
+        for distance in (10, 100, 1000, 10000, 30000, 100000, 300000):
+            for bearing in range(0, 360, 15):
+                positions.append(destination(lat, lon, distance, bearing))
+    return positions
+
+
+def check_flat_bound(positions, table, failures):
+    """
+    flat projection against haversine from every sweep position to every
+    target, the error must stay under the bound flat_limit() is built on
+    """
+    broken = 0
+    worst = 0.0
+    for lat, lon in positions:
+        pos = Position(lat, lon)
+        for target in table.targets.values():
+            d, b = distance_bearing(pos, target)
+            fd, fb = flat_distance_bearing(pos, target)
+            error = abs(fd - d)
+            bound = d ** 3 / (16 * R * R * pos.cos_lat * pos.cos_lat)
+            if error > bound + 1e-9:
+                broken += 1
+            elif bound > 0:
+                worst = max(worst, error / bound)
+    check("flat error within d**3 / (16 R**2 cos**2 lat), worst %.2f of it" % worst, broken == 0, failures)
+
+
+def check_tolerances(positions, table, failures):
+    for tolerance in TOLERANCES:
+        max_error = 0.0
+        for lat, lon in positions:
+            pos = Position(lat, lon, tolerance)
+            for target in table.targets.values():
+                d, b = distance_bearing(pos, target)
+                fd, fb = fast_distance_bearing(pos, target)
+                max_error = max(max_error, abs(fd - d))
+        check("fast_distance_bearing within %.2f m of haversine (max %.6f m)" % (tolerance, max_error),
+              max_error <= tolerance, failures)
+
+
+def check_flat_used(table, failures):
+    """
+    the Quadcorder's 1 m tolerance reaches every target from HERE
+    """
+    pos = Position(HERE[0], HERE[1], tolerance=1.0)
+    flat = all(fast_distance_bearing(pos, t) == flat_distance_bearing(pos, t) for t in table.targets.values())
+    check("every target takes the flat path at a 1 m tolerance (limit %.0f m)" % math.sqrt(pos.flat_limit2),
+          flat, failures)
+
+
+"""
+float32 emulation
+  every F32 operation is done in float64 and rounded to float32 through
+  array('f'), which is what an ESP32 MicroPython float gives for + - * /
+"""
+_f32 = array('f', [0.0])
+
+
+def f32(value):
+    _f32[0] = value
+    return _f32[0]
+
+
+def _value(other):
+    return other.v if isinstance(other, F32) else f32(other)
+
+
+class F32:
+    __slots__ = ("v",)
+
+    def __init__(self, value):
+        self.v = f32(float(value))
+
+    def __add__(self, other):
+        return F32(self.v + _value(other))
+
+    def __radd__(self, other):
+        return F32(_value(other) + self.v)
+
+    def __sub__(self, other):
+        return F32(self.v - _value(other))
+
+    def __rsub__(self, other):
+        return F32(_value(other) - self.v)
+
+    def __mul__(self, other):
+        return F32(self.v * _value(other))
+
+    def __rmul__(self, other):
+        return F32(_value(other) * self.v)
+
+    def __truediv__(self, other):
+        return F32(self.v / _value(other))
+
+    def __rtruediv__(self, other):
+        return F32(_value(other) / self.v)
+
+    def __mod__(self, other):
+        return F32(self.v % _value(other))
+
+    def __pow__(self, other):
+        return F32(self.v ** _value(other))
+
+    def __neg__(self):
+        return F32(-self.v)
+
+    def __lt__(self, other):
+        return self.v < _value(other)
+
+    def __le__(self, other):
+        return self.v <= _value(other)
+
+    def __gt__(self, other):
+        return self.v > _value(other)
+
+    def __ge__(self, other):
+        return self.v >= _value(other)
+
+    def __bool__(self):
+        return self.v != 0
+
+    def __float__(self):
+        return self.v
+
+    def __round__(self, ndigits=None):
+        return round(self.v, ndigits)
+
+
+def f32_math(name):
+    func = getattr(math, name)
+
+    def wrapper(*args):
+        return F32(func(*(_value(a) for a in args)))
+    return wrapper
+
+
+class f32_m:
+    """
+    math functions returning float32, for the legacy functions
+    """
+    pass
+
+
+for name in TRIG:
+    setattr(f32_m, name, staticmethod(f32_math(name)))
+
+
+def patch_navigation_f32(on):
+    """
+    navigation.py's math and constants as float32 (or back to float64)
+    """
+    for name in TRIG:
+        setattr(navigation, name, f32_math(name) if on else getattr(math, name))
+    navigation.E7_TO_RAD = F32(math.pi / 1800000000) if on else math.pi / 1800000000
+    navigation.R = F32(6371000) if on else 6371000
+
+
+def float32_positions():
+    """
+    points 1 m to 10 km out from every target on 16 bearings, as the
+    parser would give them: whole 1e-7 degrees
+    """
+    positions = []
+    for lat, lon in target_degrees.values():
+        for distance in (1, 3, 10, 30, 100, 300, 1000, 3000, 10000):
+            for bearing in range(0, 360, 360 // 16):
+                lat2, lon2 = destination(lat, lon, distance, bearing)
+                positions.append((int(round(lat2 * 1e7)), int(round(lon2 * 1e7))))
+    return positions
+
+
+def check_float32(failures):
+    """
+    distance errors in float32 against a float64 reference from the same
+    1e-7 degree positions
+      the integer delta path must stay within a metre, the old float
+      degree calc_distance is shown for comparison
+    """
+    positions = float32_positions()
+    table = TargetTable(targets)
+    bins = [10, 100, 1000, 10000]
+    cases = ("calc_distance (f32)", "haversine e7 (f32)", "flat e7 (f32)")
+    worst = dict((case, dict((b, [0.0, 0.0]) for b in bins)) for case in cases)
+
+    for lat_e7, lon_e7 in positions:
+        pos = Position()
+        pos.set_e7(lat_e7, lon_e7)
+        for target in table.targets.values():
+            ref_d, ref_b = distance_bearing(pos, target)
+            if ref_d > bins[-1]:
+                continue
+            top = [b for b in bins if ref_d <= b][0]
+
+            lat = F32(lat_e7 / 1e7)
+            lon = F32(lon_e7 / 1e7)
+            legacy_d = calc_distance(lat, lon, F32(target.lat), F32(target.lon), f32_m)
+            legacy_b = calc_bearing(lat, lon, F32(target.lat), F32(target.lon), f32_m)
+
+            patch_navigation_f32(True)
+            pos32 = Position()
+            pos32.set_e7(lat_e7, lon_e7)
+            target32 = Target(target.code, target.lat, target.lon)
+            results = ((legacy_d, legacy_b),
+                       distance_bearing(pos32, target32),
+                       flat_distance_bearing(pos32, target32))
+            patch_navigation_f32(False)
+
+            for case, (d, b) in zip(cases, results):
+                w = worst[case][top]
+                w[0] = max(w[0], abs(float(d) - ref_d))
+                if ref_d >= 1:
+                    w[1] = max(w[1], abs((float(b) - ref_b + 180) % 360 - 180))
+
+    print("\nfloat32 against float64, %d positions x %d targets, max distance error m / bearing deg"
+          % (len(positions), len(table)))
+    print("%-22s %s" % ("", "".join("%20s" % ("<= %d m" % b) for b in bins)))
+    for case in cases:
+        print("%-22s %s" % (case, "".join("%10.3f /%7.3f" % tuple(worst[case][b]) for b in bins)))
+
+    for case in cases[1:]:
+        error = max(worst[case][b][0] for b in bins)
+        check("%s within 1 m of float64 (max %.3f m)" % (case, error), error <= 1.0, failures)
+
+
+def main():
+    positions = sweep_positions()
+    table = TargetTable(targets)
+    failures = []
+    print("%d positions x %d targets" % (len(positions), len(table)))
+    check_flat_bound(positions, table, failures)
+    check_tolerances(positions, table, failures)
+    check_flat_used(table, failures)
+    check_float32(failures)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+check_oled.py
+Host (CPython) check for the SSD1306 partial and chunked flush, against
+bench_oled.py's FakePanel
+  replays the Quadcorder's screens with show(full=True), show() and
+  begin_flush() + poll(), and checks after every frame that the panel
+  holds exactly the framebuffer and that the driver's bytes_sent is what
+  went on the bus, less the I2C address bytes
+  the chunked flush must hold the main loop up for less than show()
+  a frame redrawn mid flush, show() during a flush and flush_async()
+  alongside another task must still leave the panel matching
+  exits 1 if any check fails
+  run with: python3 check_oled.py
+"""
+import asyncio
+import sys
+
+from bench_oled import BUDGET_US, new_display, replay
+from host_check import check
+
+
+def check_replay(failures):
+    results = {mode: replay(mode) for mode in ('full', 'dirty', 'chunked')}
+    for mode, screens in results.items():
+        for name, screen in screens.items():
+            check("%s, %s: panel matches every frame" % (name, mode), screen.mismatches == 0, failures)
+            check("%s, %s: bytes_sent matches the bus" % (name, mode), screen.sent == screen.payload, failures)
+
+    for name, screen in results['chunked'].items():
+        chunked = max(screen.stalls)
+        dirty = max(results['dirty'][name].stalls)
+        check("%s: poll() holds the loop %.2f ms, show() %.2f ms" % (name, chunked / 1000, dirty / 1000),
+              chunked < dirty or dirty <= 3000, failures)
+
+
+def check_interrupted(failures):
+    """
+    a frame redrawn while the last is in flight, and a show() in the
+    middle of a flush
+    """
+    panel, display = new_display()
+    display.fill_rect(0, 0, 128, 64, 1)
+    display.begin_flush()
+    display.poll(0)
+    display.fill(0)
+    display.text("redrawn", 0, 30, 1)
+    display.begin_flush()
+    while display.poll(BUDGET_US):
+        pass
+    check("frame redrawn mid flush: panel matches",
+          panel.ram == display.buffer and not display.flushing(), failures)
+
+    display.fill_rect(10, 10, 100, 40, 1)
+    display.begin_flush()
+    display.poll(0)
+    display.text("shown", 0, 56, 1)
+    display.show()
+    check("show() during a flush: panel matches",
+          panel.ram == display.buffer and not display.flushing(), failures)
+
+
+def check_async(failures):
+    """
+    flush_async() with a task that counts loop passes beside it
+    """
+    panel, display = new_display()
+    display.fill_rect(0, 0, 128, 64, 1)
+    passes = []
+
+    async def other_task():
+        while True:
+            passes.append(display.flushing())
+            await asyncio.sleep(0)
+
+    async def run():
+        task = asyncio.create_task(other_task())
+        await display.flush_async(budget_us=BUDGET_US)
+        task.cancel()
+
+    asyncio.run(run())
+    check("flush_async(): other task ran %d times during a full frame" % sum(passes),
+          sum(passes) >= 2, failures)
+    check("flush_async(): panel matches", panel.ram == display.buffer, failures)
+
+
+def main():
+    failures = []
+    check_replay(failures)
+    check_interrupted(failures)
+    check_async(failures)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
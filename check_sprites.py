@@ -0,0 +1,33 @@
+"""
+check_sprites.py
+Host (CPython) check for oled_background.py on the Quadcorder's
+update_oled() screen, with bench_sprites.py's replay of the synthetic
+track in nmea_sample.nmea
+  every frame drawn over a restored Background must be the same as the
+  frame redrawn from scratch, and the background must be captured once
+  for each header, twice along the track
+  exits 1 if any check fails
+  run with: python3 check_sprites.py
+"""
+import sys
+
+from bench_sprites import replay
+from host_check import check
+
+
+def main():
+    redraw = replay('redraw')
+    screen = replay('background')
+    failures = []
+    differ = sum(1 for a, b in zip(screen.frames, redraw.frames) if a != b)
+    check("%d frames, %d differ from the redraw" % (len(screen.frames), differ),
+          differ == 0 and len(screen.frames) == len(redraw.frames), failures)
+    background = screen.background
+    check("background captured %d times, restored %d" % (background.captures, background.restores),
+          background.captures == 2, failures)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
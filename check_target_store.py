@@ -0,0 +1,85 @@
+"""
+check_target_store.py
+Host (CPython) check for target_store.py
+  nearest k and within R on 10k synthetic targets, for every cell size,
+  must give exactly what a scan of every target gives
+  a target just inside the radius but past the longitude the query's own
+  latitude would allow, as happens at the poleward edge of the search
+  box, must still be found
+  exits 1 if any check fails
+  run with: python3 check_target_store.py
+"""
+from math import radians, tan
+import sys
+
+from bench_nav import destination, STORE_CASES, STORE_CELLS, store_queries
+from host_check import check
+from navigation import distance_bearing, M_PER_E7, Position, R, TargetTable
+from target_store import TargetStore
+
+
+def same(a, b):
+    return [(t.code, d) for t, d, _ in a] == [(t.code, d) for t, d, _ in b]
+
+
+def check_against_scan(failures):
+    synthetic, queries = store_queries()
+    table = TargetTable(synthetic)
+    expected = [[brute(table, pos, arg) for pos in queries] for _, brute, _, arg in STORE_CASES]
+
+    for cell_m in STORE_CELLS:
+        store = TargetStore(synthetic, cell_m)
+        for (label, brute, query, arg), scans in zip(STORE_CASES, expected):
+            got = [query(store, pos, arg) for pos in queries]
+            mismatches = sum(1 for a, b in zip(scans, got) if not same(a, b))
+            check("cell %d m, %s: %d queries match the scan" % (cell_m, label, len(queries)),
+                  mismatches == 0, failures)
+
+
+def check_poleward_edge(failures):
+    """
+    at 60 N a circle of 50 km reaches about 800 1e-7 degrees further east
+    north of the query than at its latitude. the query is placed so the
+    box worked out at its own latitude ends one 1e-7 degree short of a
+    cell boundary, and the target sits just past it
+    """
+    radius = 50000
+    cell_m = 1000
+    lat, lon = 60.0, 10.0
+    corner = destination(lat, lon, 2 * radius, 225)
+    targets = {"corner": ("%.7f" % corner[0], "%.7f" % corner[1]),
+               "far": ("%.7f" % (lat + 1), "%.7f" % (lon + 2))}
+    store = TargetStore(targets, cell_m)
+
+    # box edge as worked out from the query's latitude
+    pos = Position(lat, lon)
+    dlon = int(radius / (M_PER_E7 * pos.cos_lat)) + 1
+    boundary = store.lon0 + (store.col(pos.lon_e7 + dlon) + 1) * store.cell_lon
+    pos.set_e7(pos.lat_e7, boundary - 1 - dlon)
+
+    # north of pos, where a degree of longitude is shorter, at the
+    # latitude the circle reaches furthest east
+    north_e7 = pos.lat_e7 + int(radius * radius * tan(radians(lat)) / R / M_PER_E7)
+    targets["edge"] = ("%.7f" % (north_e7 / 1e7), "%.7f" % (boundary / 1e7))
+    store = TargetStore(targets, cell_m)
+    edge = store.get("edge")
+    distance, _ = distance_bearing(pos, edge)
+
+    found = [t.code for t, d, b in store.within(pos, radius)]
+    check("edge target %.1f m inside the radius, past the box" % (radius - distance),
+          distance <= radius and edge.lon_e7 - pos.lon_e7 > dlon, failures)
+    check("within() finds a target at the poleward edge", "edge" in found, failures)
+    nearest = store.nearest(pos, 1)
+    check("nearest() finds it too", nearest and nearest[0][0].code == "edge", failures)
+
+
+def main():
+    failures = []
+    check_against_scan(failures)
+    check_poleward_edge(failures)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
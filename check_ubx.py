@@ -0,0 +1,130 @@
+"""
+check_ubx.py
+Host (CPython) check for ubx.py against micropyGPS.py on the synthetic
+track in nmea_sample.nmea, written out as the NAV-PVT frame a u-blox
+receiver would have sent for every epoch
+  UBXParser must give the same fix as MicropyGPS for every epoch, fed in
+  odd sized chunks with noise between frames, return the decoded frame
+  types from update_bytes() as MicropyGPS returns sentence types, and
+  drop a corrupted frame
+  GPSConfig must switch a fake u-blox receiver to NAV-PVT only
+  exits 1 if any check fails
+  run with: python3 check_ubx.py
+"""
+import sys
+
+from bench_gps_config import FakeReceiver, load_epochs
+from bench_ubx import nav_pvt, nmea_fixes
+from gps_config import GPSConfig, ubx_frame, UBX_CFG_MSG
+from gps_ingest import GPSIngest
+from host_check import check
+from ubx import UBX_CLASS_NAV, UBX_NAV_PVT, UBXParser
+
+CHUNK = 61
+
+
+def same_fix(gps, fix):
+    if gps.valid != fix['valid']:
+        return False
+    if not fix['valid']:
+        return True
+    return (gps.latitude_e7 == fix['latitude_e7'] and gps.longitude_e7 == fix['longitude_e7'] and
+            abs(gps.speed[0] - fix['speed']) < 0.002 and abs(gps.course - fix['course']) < 0.00001 and
+            abs(gps.altitude - fix['altitude']) < 0.001 and gps.satellites_in_use == fix['satellites_in_use'] and
+            gps.timestamp[:2] == fix['timestamp'][:2] and abs(gps.timestamp[2] - fix['timestamp'][2]) < 1e-6 and
+            gps.date == fix['date'] and gps.fix_type == fix['fix_type'])
+
+
+def check_fixes(fixes, frames, failures):
+    """
+    frames fed in CHUNK byte pieces with noise between them, the fix
+    compared after each frame
+    """
+    gps = UBXParser()
+    stream = bytearray()
+    ends = []
+    for i, frame in enumerate(frames):
+        # a stray sync char and a foreign frame between every few fixes
+        if i % 5 == 0:
+            stream += b'\xb5\x00$GPTXT\r\n' + ubx_frame(0x01, 0x35, bytes(40))
+        stream += frame
+        ends.append(len(stream))
+
+    matches = 0
+    fed = 0
+    parsed = []
+    for i, end in enumerate(ends):
+        while fed < end:
+            n = min(CHUNK, end - fed)
+            parsed.extend(gps.update_bytes(stream[fed:fed + n]))
+            fed += n
+        if same_fix(gps, fixes[i]):
+            matches += 1
+
+    check("UBXParser matches MicropyGPS on %d fixes" % len(fixes), matches == len(fixes), failures)
+    check("foreign frames stepped over, no checksum fails",
+          gps.crc_fails == 0 and gps.skipped_sentences == (len(frames) + 4) // 5, failures)
+    check("update_bytes() returns 'PVT' for each of %d frames" % len(parsed),
+          parsed == ['PVT'] * len(frames), failures)
+
+    gps = UBXParser()
+    gps.update_bytes(frames[0])
+    before = (gps.latitude_e7, gps.fix_time)
+    bad = bytearray(frames[len(frames) // 2])
+    bad[30] ^= 0x10
+    check("corrupted frame dropped", gps.update_bytes(bad) == [] and gps.crc_fails == 1 and
+          (gps.latitude_e7, gps.fix_time) == before, failures)
+
+
+class UBXReceiver(FakeReceiver):
+    """
+    FakeReceiver that can also send the epochs as NAV-PVT frames
+    """
+    def __init__(self, epochs, frames, **kwargs):
+        FakeReceiver.__init__(self, 'ubx', epochs, **kwargs)
+        self.frames = frames
+        self.nav_pvt = False
+
+    def next_epoch(self):
+        i = self.epoch % len(self.epochs)
+        FakeReceiver.next_epoch(self)
+        if self.nav_pvt:
+            self.send(self.frames[i])
+
+    def ubx_command(self, data):
+        if data[3] == UBX_CFG_MSG and data[6] == UBX_CLASS_NAV:
+            self.nav_pvt = data[7] == UBX_NAV_PVT and data[8] > 0
+            self.send(ubx_frame(0x05, 0x01, bytes((data[2], data[3]))))
+            return
+        FakeReceiver.ubx_command(self, data)
+
+
+def check_config(epochs, frames, failures):
+    receiver = UBXReceiver(epochs, frames)
+    gps = UBXParser()
+    ingest = GPSIngest(receiver, gps)
+    config = GPSConfig(receiver, 'ubx', baudrate=9600, timeout_ms=200, ingest=ingest)
+
+    ok = config.configure(sentences=(), baudrate=115200, hz=5, nav_pvt=True)
+    check("configure(nav_pvt=True) returns True", ok, failures)
+    check("receiver sends NAV-PVT only at 115200",
+          receiver.nav_pvt and receiver.sentences == [] and receiver.baudrate == 115200, failures)
+
+    for _ in range(20):
+        ingest.poll()
+    check("ingest publishes UBX fixes", gps.clean_sentences >= 20 and gps.crc_fails == 0 and ingest.valid, failures)
+
+
+def main():
+    epochs = load_epochs()
+    fixes = nmea_fixes(epochs)
+    frames = [nav_pvt(fix) for fix in fixes]
+    failures = []
+    check_fixes(fixes, frames, failures)
+    check_config(epochs, frames, failures)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+dead_reckoning.py
+Position estimate between GPS fixes, extrapolated from the last fix
+with the speed and course the receiver reports, so the compass and
+distance can refresh several times a second
+
+  reckoner = DeadReckoner()
+  on every fix:
+    reckoner.fix(gps.latitude_e7, gps.longitude_e7, gps.speed[0], gps.course, gps.fix_time)
+  on every redraw:
+    lat_e7, lon_e7 = reckoner.estimate()
+
+When a fix lands away from where the estimate had got to, the difference
+is blended out over blend_ms instead of jumping to the new fix
+"""
+from math import cos, radians, sin
+
+from navigation import E7_TO_RAD, M_PER_E7
+from ticks import ticks_diff, ticks_ms
+
+# knots to metres per second
+KNOT = 0.514444
+
+
+class DeadReckoner():
+    def __init__(self, blend_ms=1000, max_age_ms=5000, min_speed=0.5, snap_m=100):
+        """
+        blend_ms   - time over which a fix's correction is blended in
+        max_age_ms - extrapolation stops this long after the last fix, the
+                     estimate then holds still until the next one
+        min_speed  - speeds below this (knots) are taken as standing still,
+                     receivers report a wandering speed and course at rest
+        snap_m     - corrections larger than this jump straight to the fix
+        """
+        self.blend_ms = blend_ms
+        self.max_age_ms = max_age_ms
+        self.min_speed = min_speed
+        self.snap_m = snap_m
+
+        self.valid = False
+        self.lat_e7 = 0
+        self.lon_e7 = 0
+        self.fix_ms = 0
+
+        # velocity in 1e-7 degrees per ms
+        self.v_lat = 0.0
+        self.v_lon = 0.0
+
+        # remaining correction, in 1e-7 degrees at the time of the fix
+        self.off_lat = 0.0
+        self.off_lon = 0.0
+
+        # Statistics
+        self.fixes = 0
+        self.last_correction = 0.0
+
+    def fix(self, lat_e7, lon_e7, speed, course, now_ms=None):
+        """
+        Take a new fix
+          lat_e7, lon_e7 - signed 1e-7 degrees
+          speed          - knots over ground
+          course         - degrees true
+          now_ms         - ticks_ms() when the fix arrived, now by default
+        """
+        if now_ms is None:
+            now_ms = ticks_ms()
+
+        off_lat = 0.0
+        off_lon = 0.0
+        if self.valid:
+            # where the estimate had got to, blended from there to the fix
+            est_lat, est_lon = self.estimate(now_ms)
+            off_lat = est_lat - lat_e7
+            off_lon = est_lon - lon_e7
+
+        cos_lat = cos(lat_e7 * E7_TO_RAD)
+        dy = off_lat * M_PER_E7
+        dx = off_lon * M_PER_E7 * cos_lat
+        self.last_correction = (dx * dx + dy * dy) ** 0.5
+        if self.last_correction > self.snap_m:
+            off_lat = off_lon = 0.0
+
+        if speed < self.min_speed:
+            self.v_lat = self.v_lon = 0.0
+        else:
+            course_r = radians(course)
+            v = speed * KNOT / 1000 / M_PER_E7
+            self.v_lat = v * cos(course_r)
+            self.v_lon = v * sin(course_r) / cos_lat
+
+        self.lat_e7 = lat_e7
+        self.lon_e7 = lon_e7
+        self.fix_ms = now_ms
+        self.off_lat = off_lat
+        self.off_lon = off_lon
+        self.valid = True
+        self.fixes += 1
+
+    def age(self, now_ms=None):
+        """
+        Milliseconds since the last fix, -1 if there has been no fix
+        """
+        if not self.valid:
+            return -1
+        if now_ms is None:
+            now_ms = ticks_ms()
+        return ticks_diff(now_ms, self.fix_ms)
+
+    def estimate(self, now_ms=None):
+        """
+        Estimated position now as signed 1e-7 degrees, (0, 0) before the
+        first fix
+          the offset from the fix is worked out as a small float and added
+          to the integer fix, float32 can't hold the whole value to 1e-7
+        """
+        if not self.valid:
+            return 0, 0
+        if now_ms is None:
+            now_ms = ticks_ms()
+
+        age = ticks_diff(now_ms, self.fix_ms)
+        if age < 0:
+            age = 0
+        elif age > self.max_age_ms:
+            age = self.max_age_ms
+
+        dlat = self.v_lat * age
+        dlon = self.v_lon * age
+        if age < self.blend_ms:
+            k = 1 - age / self.blend_ms
+            dlat += self.off_lat * k
+            dlon += self.off_lon * k
+
+        return self.lat_e7 + int(round(dlat)), self.lon_e7 + int(round(dlon))
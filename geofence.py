@@ -0,0 +1,260 @@
+"""
+geofence.py
+Circular and polygonal zones around targets with enter, exit and dwell
+events as fixes arrive
+
+  fences = Geofence(hysteresis=10, dwell_ms=30000)
+  fences.add_targets(target_table, 25)
+  for event, zone in fences.update(gps.latitude_e7, gps.longitude_e7):
+      ...
+
+Only zones whose bounding box lies within margin metres of where the
+candidate list was last built are tested, the list is rebuilt once the
+position has moved margin metres. A zone is entered on crossing its
+boundary and only exited once hysteresis metres outside, so GPS jitter
+at the edge doesn't produce a storm of events
+"""
+from math import cos, sqrt
+
+from navigation import E7_TO_RAD, M_PER_E7, to_e7
+from ticks import ticks_diff, ticks_ms
+
+ENTER = 'enter'
+EXIT = 'exit'
+DWELL = 'dwell'
+
+
+class Zone():
+    def __init__(self, name, lat_e7, lon_e7):
+        """
+        Base for zones, positions inside are measured in flat metres
+        from the reference point lat_e7, lon_e7
+          a zone class sets the bounding box and defines distance(x, y),
+          the signed distance (metres) of the local() point x, y from
+          its boundary, negative inside
+        """
+        self.name = name
+        self.lat_e7 = lat_e7
+        self.lon_e7 = lon_e7
+        self.m_per_lon = M_PER_E7 * cos(lat_e7 * E7_TO_RAD)
+
+        # bounding box in 1e-7 degrees, set by the subclass
+        self.lat_min = self.lat_max = lat_e7
+        self.lon_min = self.lon_max = lon_e7
+
+        # event state
+        self.inside = False
+        self.entered_ms = 0
+        self.dwelled = False
+
+    def local(self, lat_e7, lon_e7):
+        """
+        Flat metres (east, north) from the reference point
+        """
+        return (lon_e7 - self.lon_e7) * self.m_per_lon, (lat_e7 - self.lat_e7) * M_PER_E7
+
+
+class CircleZone(Zone):
+    def __init__(self, name, lat_e7, lon_e7, radius):
+        Zone.__init__(self, name, lat_e7, lon_e7)
+        self.radius = radius
+
+        dlat = int(radius / M_PER_E7) + 1
+        dlon = int(radius / self.m_per_lon) + 1
+        self.lat_min = lat_e7 - dlat
+        self.lat_max = lat_e7 + dlat
+        self.lon_min = lon_e7 - dlon
+        self.lon_max = lon_e7 + dlon
+
+    def distance(self, x, y):
+        return sqrt(x * x + y * y) - self.radius
+
+
+class PolygonZone(Zone):
+    def __init__(self, name, points):
+        """
+        points - [(lat_e7, lon_e7), ...] vertices in order, at least 3
+        """
+        Zone.__init__(self, name, points[0][0], points[0][1])
+        self.xs = []
+        self.ys = []
+        for lat_e7, lon_e7 in points:
+            x, y = self.local(lat_e7, lon_e7)
+            self.xs.append(x)
+            self.ys.append(y)
+            self.lat_min = min(self.lat_min, lat_e7)
+            self.lat_max = max(self.lat_max, lat_e7)
+            self.lon_min = min(self.lon_min, lon_e7)
+            self.lon_max = max(self.lon_max, lon_e7)
+
+    def distance(self, x, y):
+        """
+        Distance to the nearest edge, negative if an even-odd ray cast
+        says the point is inside
+        """
+        xs = self.xs
+        ys = self.ys
+        inside = False
+        nearest2 = None
+
+        j = len(xs) - 1
+        for i in range(len(xs)):
+            xi = xs[i]
+            yi = ys[i]
+            xj = xs[j]
+            yj = ys[j]
+
+            if (yi > y) != (yj > y) and x < (xj - xi) * (y - yi) / (yj - yi) + xi:
+                inside = not inside
+
+            # squared distance to the edge i-j
+            dx = xj - xi
+            dy = yj - yi
+            length2 = dx * dx + dy * dy
+            t = 0
+            if length2 > 0:
+                t = ((x - xi) * dx + (y - yi) * dy) / length2
+                if t < 0:
+                    t = 0
+                elif t > 1:
+                    t = 1
+            ex = xi + t * dx - x
+            ey = yi + t * dy - y
+            d2 = ex * ex + ey * ey
+            if nearest2 is None or d2 < nearest2:
+                nearest2 = d2
+            j = i
+
+        return -sqrt(nearest2) if inside else sqrt(nearest2)
+
+
+class Geofence():
+    def __init__(self, hysteresis=10, dwell_ms=30000, margin=200, callback=None):
+        """
+        hysteresis - metres outside a zone before it is exited
+        dwell_ms   - time inside a zone before its dwell event
+        margin     - metres around the position searched for zones, the
+                     candidate list is rebuilt after moving this far
+        callback   - called as callback(event, zone) for every event
+        """
+        self.hysteresis = hysteresis
+        self.dwell_ms = dwell_ms
+        self.margin = margin
+        self.callback = callback
+        self.zones = []
+
+        # zones near where the candidate list was built
+        self.candidates = []
+        self.built_lat = 0
+        self.built_lon = 0
+        self.built_m_per_lon = M_PER_E7
+        self.built = False
+
+        # Statistics
+        self.rebuilds = 0
+        self.zone_tests = 0
+        self.events = 0
+
+    def add(self, zone):
+        self.zones.append(zone)
+        self.built = False
+        return zone
+
+    def add_circle(self, name, lat, lon, radius):
+        """
+        lat, lon - signed decimal degrees, numbers or strings
+        """
+        return self.add(CircleZone(name, to_e7(lat), to_e7(lon), radius))
+
+    def add_polygon(self, name, points):
+        """
+        points - [(lat, lon), ...] signed decimal degrees
+        """
+        return self.add(PolygonZone(name, [(to_e7(lat), to_e7(lon)) for lat, lon in points]))
+
+    def add_targets(self, table, radius):
+        """
+        A circle of radius metres around every target of a TargetTable
+        """
+        for target in table.targets.values():
+            self.add(CircleZone(target.code, target.lat_e7, target.lon_e7, radius))
+
+    def get(self, name):
+        for zone in self.zones:
+            if zone.name == name:
+                return zone
+        return None
+
+    def build(self, lat_e7, lon_e7):
+        """
+        Rebuild the candidate list, zones whose bounding box grown by
+        margin holds the position, plus every zone still inside
+        """
+        m_per_lon = M_PER_E7 * cos(lat_e7 * E7_TO_RAD)
+        dlat = int(self.margin / M_PER_E7) + 1
+        dlon = int(self.margin / m_per_lon) + 1
+
+        candidates = []
+        for zone in self.zones:
+            if zone.inside or (zone.lat_min - dlat <= lat_e7 <= zone.lat_max + dlat and
+                               zone.lon_min - dlon <= lon_e7 <= zone.lon_max + dlon):
+                candidates.append(zone)
+        self.candidates = candidates
+        self.built_lat = lat_e7
+        self.built_lon = lon_e7
+        self.built_m_per_lon = m_per_lon
+        self.built = True
+        self.rebuilds += 1
+
+    def moved(self, lat_e7, lon_e7):
+        """
+        Flat metres from where the candidate list was built
+        """
+        dy = (lat_e7 - self.built_lat) * M_PER_E7
+        dx = (lon_e7 - self.built_lon) * self.built_m_per_lon
+        return sqrt(dx * dx + dy * dy)
+
+    def update(self, lat_e7, lon_e7, now_ms=None):
+        """
+        Test the new fix (signed 1e-7 degrees) against the nearby zones
+          now_ms - fix time in ms for dwell timing, ticks_ms() by default
+          returns the list of (event, zone) raised by this fix
+        """
+        if now_ms is None:
+            now_ms = ticks_ms()
+
+        # no zone off the list can be entered within margin of the build
+        # point, and zones already inside stay on it until exited
+        if not self.built or self.moved(lat_e7, lon_e7) > self.margin:
+            self.build(lat_e7, lon_e7)
+
+        events = []
+        for zone in self.candidates:
+            self.zone_tests += 1
+            x, y = zone.local(lat_e7, lon_e7)
+            d = zone.distance(x, y)
+
+            if not zone.inside:
+                if d <= 0:
+                    zone.inside = True
+                    zone.entered_ms = now_ms
+                    zone.dwelled = False
+                    events.append((ENTER, zone))
+            elif d > self.hysteresis:
+                zone.inside = False
+                events.append((EXIT, zone))
+            elif not zone.dwelled and ticks_diff(now_ms, zone.entered_ms) >= self.dwell_ms:
+                zone.dwelled = True
+                events.append((DWELL, zone))
+
+        self.events += len(events)
+        if self.callback is not None:
+            for event, zone in events:
+                self.callback(event, zone)
+        return events
+
+    def inside(self):
+        """
+        Zones the position is currently in
+        """
+        return [zone for zone in self.zones if zone.inside]
@@ -0,0 +1,141 @@
+"""
+gps_async.py
+asyncio GPS reader task. Feeds a MicropyGPS parser from a stream and
+lets consumers await a new fix, or a position change, instead of polling
+
+MicroPython:
+  reader = GPSReader(asyncio.StreamReader(uart), gps)
+  asyncio.create_task(reader.run())
+
+CPython (pty, serial port or a file for testing), anything with an
+async readline() works:
+  stream = asyncio.StreamReader()
+  stream.feed_data(open('nmea_sample.nmea', 'rb').read())
+  stream.feed_eof()
+  reader = GPSReader(stream, MicropyGPS())
+
+check_gps_async.py runs a reader over nmea_sample.nmea this way
+"""
+from math import cos, radians, sqrt
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+# metres per degree of latitude
+M_PER_DEG = 111195
+
+
+class GPSReader():
+    def __init__(self, stream, gps):
+        """
+        stream - asyncio stream with an async readline(), e.g. a StreamReader on the GPS uart
+        gps    - MicropyGPS parser to feed
+        """
+        self.stream = stream
+        self.gps = gps
+        self.running = False
+        # set once the stream has ended, so later waiters don't wait on a
+        # pulse that will never come
+        self.stopped = False
+
+        # Latest fix, signed decimal degrees
+        #   valid goes False, and the position to 0, when the receiver
+        #   loses the fix
+        self.valid = False
+        self.latitude = 0.0
+        self.longitude = 0.0
+        self.fix_count = 0
+        self.fix_time = 0
+
+        # Pulsed on every new fix, the loss of the fix and when the
+        # stream ends
+        self.fix_event = asyncio.Event()
+
+    async def run(self):
+        """
+        Read and parse sentences until the stream ends
+        """
+        readline = self.stream.readline
+        gps = self.gps
+
+        self.running = True
+        self.stopped = False
+        try:
+            while True:
+                line = await readline()
+                if not line:
+                    break
+
+                if gps.parse_sentence(line) and (gps.fix_time != self.fix_time or gps.valid != self.valid):
+                    self.publish()
+        finally:
+            self.running = False
+            self.stopped = True
+            self.pulse()
+
+    def publish(self):
+        """
+        Copy the parser's latest position and wake everyone waiting
+          when the receiver has lost the fix the parser's position is
+          cleared, and valid is published as False
+        """
+        gps = self.gps
+        self.latitude = gps.latitude_decimal
+        self.longitude = gps.longitude_decimal
+        self.valid = gps.valid
+        self.fix_time = gps.fix_time
+        if self.valid:
+            self.fix_count += 1
+        self.pulse()
+
+    def pulse(self):
+        """
+        Wake the current waiters, later waiters wait for the next pulse
+        """
+        self.fix_event.set()
+        self.fix_event.clear()
+
+    async def wait_fix(self):
+        """
+        Wait for the next fix, or the loss of the fix
+          returns True when either is published, check valid to tell
+          them apart, False if the reader has stopped
+        """
+        if self.stopped:
+            return False
+        await self.fix_event.wait()
+        return not self.stopped
+
+    async def wait_moved(self, threshold):
+        """
+        Wait until the position is more than threshold metres from
+        where it was when called (or from the next valid fix), no fix
+        counts as not moving
+          returns the distance moved, or -1 if the reader stopped
+        """
+        while not self.valid:
+            if not await self.wait_fix():
+                return -1
+
+        start_lat = self.latitude
+        start_lon = self.longitude
+        while True:
+            if not await self.wait_fix():
+                return -1
+            if not self.valid:
+                continue
+
+            moved = distance_m(start_lat, start_lon, self.latitude, self.longitude)
+            if moved > threshold:
+                return moved
+
+
+def distance_m(lat1, lon1, lat2, lon2):
+    """
+    flat earth distance in metres, good for the short hops between fixes
+    """
+    dy = (lat2 - lat1) * M_PER_DEG
+    dx = (lon2 - lon1) * M_PER_DEG * cos(radians((lat1 + lat2) / 2))
+    return sqrt(dx * dx + dy * dy)
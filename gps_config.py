@@ -0,0 +1,374 @@
+"""
+gps_config.py
+Configure the GPS receiver over its UART so it only sends what the
+parser uses: RMC and GGA, at 115200 baud, 1 - 10 fixes a second
+
+  MediaTek receivers (PMTK commands) and u-blox receivers (UBX frames)
+  config = GPSConfig(uart, 'pmtk', baudrate=9600)
+  config.configure(sentences=("RMC", "GGA"), baudrate=115200, hz=5)
+
+  u-blox receivers can send binary NAV-PVT frames for ubx.UBXParser
+  instead, with every NMEA sentence turned off
+  config.configure(sentences=(), baudrate=115200, hz=5, nav_pvt=True)
+
+Every command is checked against the receiver's acknowledgement, PMTK001
+or UBX ACK-ACK/ACK-NAK. Baud rate changes aren't acknowledged at the old
+rate, so after one the UART is re-initialised and the change is only kept
+once a valid sentence or frame is heard at the new rate
+"""
+from struct import pack
+
+from ticks import sleep_ms, ticks_diff, ticks_ms
+
+# PMTK314 field of each NMEA sentence, 19 fields in all
+PMTK_FIELDS = {'GLL': 0, 'RMC': 1, 'VTG': 2, 'GGA': 3, 'GSA': 4, 'GSV': 5, 'ZDA': 17}
+
+# PMTK001 flags
+PMTK_INVALID = 0
+PMTK_UNSUPPORTED = 1
+PMTK_FAILED = 2
+PMTK_OK = 3
+
+# UBX message ids of the standard NMEA sentences, class 0xF0
+UBX_NMEA_IDS = {'GGA': 0x00, 'GLL': 0x01, 'GSA': 0x02, 'GSV': 0x03, 'RMC': 0x04, 'VTG': 0x05, 'ZDA': 0x08}
+
+UBX_CLASS_ACK = 0x05
+UBX_ACK_NAK = 0x00
+UBX_ACK_ACK = 0x01
+UBX_CLASS_CFG = 0x06
+UBX_CFG_PRT = 0x00
+UBX_CFG_MSG = 0x01
+UBX_CFG_RATE = 0x08
+UBX_CLASS_NMEA = 0xF0
+UBX_CLASS_NAV = 0x01
+UBX_NAV_PVT = 0x07
+
+BAUDRATES = (4800, 9600, 19200, 38400, 57600, 115200, 230400)
+
+
+def nmea_checksum(body):
+    """
+    XOR of every char between '$' and '*'
+    """
+    crc = 0
+    for c in body:
+        crc ^= c
+    return crc
+
+
+def pmtk_sentence(body):
+    """
+    Complete $...*hh CR LF sentence for a PMTK command body such as
+    'PMTK220,200'
+    """
+    body = body.encode() if isinstance(body, str) else body
+    return b'$' + body + ('*%02X\r\n' % nmea_checksum(body)).encode()
+
+
+def _hex_digit(c):
+    """
+    Value of an ASCII hex digit, -1 if c isn't one
+    """
+    if 48 <= c <= 57:
+        return c - 48
+    if 65 <= c <= 70:
+        return c - 55
+    if 97 <= c <= 102:
+        return c - 87
+    return -1
+
+
+def nmea_valid(rx, start, star):
+    """
+    True if rx[start] is '$', rx[star] is '*' and the two hex digits
+    after it match the checksum of the chars between
+    """
+    crc = 0
+    for i in range(start + 1, star):
+        crc ^= rx[i]
+    high = _hex_digit(rx[star + 1])
+    low = _hex_digit(rx[star + 2])
+    return high >= 0 and low >= 0 and high * 16 + low == crc
+
+
+def ubx_checksum(frame, start, end):
+    """
+    8 bit Fletcher checksum over frame[start:end]
+    """
+    ck_a = 0
+    ck_b = 0
+    for i in range(start, end):
+        ck_a = (ck_a + frame[i]) & 0xFF
+        ck_b = (ck_b + ck_a) & 0xFF
+    return ck_a, ck_b
+
+
+def ubx_frame(msg_class, msg_id, payload=b''):
+    """
+    Complete UBX frame: sync chars, class, id, length, payload, checksum
+    """
+    frame = bytearray(b'\xb5\x62' + pack('<BBH', msg_class, msg_id, len(payload)) + payload + b'\x00\x00')
+    frame[-2], frame[-1] = ubx_checksum(frame, 2, len(frame) - 2)
+    return frame
+
+
+class GPSConfig():
+    def __init__(self, uart, protocol='pmtk', baudrate=9600, timeout_ms=1000, ingest=None):
+        """
+        uart       - UART the receiver is attached to, needs write(),
+                     any(), readinto() and init(baudrate=)
+        protocol   - 'pmtk' for MediaTek receivers, 'ubx' for u-blox
+        baudrate   - rate the receiver and uart are running at now
+        timeout_ms - wait for an acknowledgement this long
+        ingest     - optional GPSIngest, resynced after a baud change
+        """
+        if protocol not in ('pmtk', 'ubx'):
+            raise ValueError("protocol must be 'pmtk' or 'ubx'")
+
+        self.uart = uart
+        self.protocol = protocol
+        self.baudrate = baudrate
+        self.timeout_ms = timeout_ms
+        self.ingest = ingest
+
+        # bytes read while waiting for replies, newest at the end
+        self.rx = bytearray(512)
+        self.rx_len = 0
+        self.chunk = bytearray(64)
+
+        # Statistics
+        self.commands = 0
+        self.acks = 0
+        self.naks = 0
+        self.timeouts = 0
+
+    ########################################
+    # Sending and receiving
+    ########################################
+    def send(self, data):
+        self.uart.write(data)
+        self.commands += 1
+
+    def send_pmtk(self, body):
+        self.send(pmtk_sentence(body))
+
+    def send_ubx(self, msg_class, msg_id, payload=b''):
+        self.send(ubx_frame(msg_class, msg_id, payload))
+
+    def read_some(self):
+        """
+        Append whatever the uart has to the reply buffer, the oldest
+        bytes are dropped when it is full
+          returns the number of bytes read
+        """
+        uart = self.uart
+        if not uart.any():
+            return 0
+
+        n = uart.readinto(self.chunk)
+        if not n:
+            return 0
+
+        rx = self.rx
+        keep = len(rx) - n
+        if self.rx_len > keep:
+            # slide the newest bytes to the front
+            drop = self.rx_len - keep
+            rx[0:keep] = rx[drop:self.rx_len]
+            self.rx_len = keep
+        rx[self.rx_len:self.rx_len + n] = self.chunk[0:n]
+        self.rx_len += n
+        return n
+
+    def wait_for(self, match, timeout_ms=None):
+        """
+        Read until match(rx, rx_len) returns something other than None
+          returns that, or None on timeout
+        """
+        if timeout_ms is None:
+            timeout_ms = self.timeout_ms
+
+        self.rx_len = 0
+        start = ticks_ms()
+        while True:
+            self.read_some()
+            result = match(self.rx, self.rx_len)
+            if result is not None:
+                return result
+            if ticks_diff(ticks_ms(), start) > timeout_ms:
+                self.timeouts += 1
+                return None
+            sleep_ms(5)
+
+    def _count(self, acked):
+        if acked:
+            self.acks += 1
+        else:
+            self.naks += 1
+        return acked
+
+    def wait_pmtk_ack(self, command):
+        """
+        Wait for $PMTK001,<command>,<flag>
+          returns True if the flag says the command succeeded
+        """
+        prefix = ('$PMTK001,%d,' % command).encode()
+
+        def match(rx, n):
+            i = rx.find(prefix, 0, n)
+            while i >= 0:
+                star = rx.find(b'*', i, n)
+                if star < 0 or star + 3 > n:
+                    return None
+                if nmea_valid(rx, i, star):
+                    return rx[i + len(prefix)] - 48 == PMTK_OK
+                i = rx.find(prefix, i + 1, n)
+            return None
+
+        result = self.wait_for(match)
+        return result is not None and self._count(result)
+
+    def wait_ubx_ack(self, msg_class, msg_id):
+        """
+        Wait for UBX ACK-ACK or ACK-NAK of msg_class, msg_id
+          returns True on ACK-ACK
+        """
+        def match(rx, n):
+            i = 0
+            while True:
+                i = rx.find(b'\xb5\x62\x05', i, n)
+                if i < 0 or i + 10 > n:
+                    return None
+                if rx[i + 6] == msg_class and rx[i + 7] == msg_id and \
+                        ubx_checksum(rx, i + 2, i + 8) == (rx[i + 8], rx[i + 9]):
+                    return rx[i + 3] == UBX_ACK_ACK
+                i += 2
+
+        result = self.wait_for(match)
+        return result is not None and self._count(result)
+
+    def heard_valid(self, timeout_ms=None):
+        """
+        True once a sentence with a good checksum, or a UBX frame with a
+        good checksum, is read, which says the uart baud rate matches
+        """
+        def match(rx, n):
+            i = rx.find(b'$', 0, n)
+            while i >= 0:
+                star = rx.find(b'*', i, n)
+                if star < 0 or star + 3 > n:
+                    break
+                if nmea_valid(rx, i, star):
+                    return True
+                i = rx.find(b'$', i + 1, n)
+
+            i = rx.find(b'\xb5\x62', 0, n)
+            while 0 <= i and i + 6 <= n:
+                length = rx[i + 4] | rx[i + 5] << 8
+                if i + 8 + length > n:
+                    break
+                if ubx_checksum(rx, i + 2, i + 6 + length) == (rx[i + 6 + length], rx[i + 7 + length]):
+                    return True
+                i = rx.find(b'\xb5\x62', i + 2, n)
+            return None
+
+        return self.wait_for(match, timeout_ms) is True
+
+    ########################################
+    # Commands
+    ########################################
+    def set_sentences(self, sentences=('RMC', 'GGA')):
+        """
+        Only output the given NMEA sentence types, once per fix
+          returns True if every command was acknowledged
+        """
+        if self.protocol == 'pmtk':
+            fields = [0] * 19
+            for name in sentences:
+                fields[PMTK_FIELDS[name]] = 1
+            self.send_pmtk('PMTK314,' + ','.join(str(f) for f in fields))
+            return self.wait_pmtk_ack(314)
+
+        ok = True
+        for name in UBX_NMEA_IDS:
+            rate = 1 if name in sentences else 0
+            self.send_ubx(UBX_CLASS_CFG, UBX_CFG_MSG, pack('<BBB', UBX_CLASS_NMEA, UBX_NMEA_IDS[name], rate))
+            ok = self.wait_ubx_ack(UBX_CLASS_CFG, UBX_CFG_MSG) and ok
+        return ok
+
+    def set_nav_pvt(self, rate=1):
+        """
+        u-blox only, send a NAV-PVT frame every rate fixes, 0 for none
+          returns True if acknowledged
+        """
+        if self.protocol != 'ubx':
+            raise ValueError('NAV-PVT needs a ubx receiver')
+
+        self.send_ubx(UBX_CLASS_CFG, UBX_CFG_MSG, pack('<BBB', UBX_CLASS_NAV, UBX_NAV_PVT, rate))
+        return self.wait_ubx_ack(UBX_CLASS_CFG, UBX_CFG_MSG)
+
+    def set_rate(self, hz):
+        """
+        Fixes per second, 1 - 10
+          returns True if acknowledged
+        """
+        if not 1 <= hz <= 10:
+            raise ValueError('update rate must be 1 - 10 Hz')
+
+        period_ms = 1000 // hz
+        if self.protocol == 'pmtk':
+            self.send_pmtk('PMTK220,%d' % period_ms)
+            return self.wait_pmtk_ack(220)
+
+        self.send_ubx(UBX_CLASS_CFG, UBX_CFG_RATE, pack('<HHH', period_ms, 1, 1))
+        return self.wait_ubx_ack(UBX_CLASS_CFG, UBX_CFG_RATE)
+
+    def set_baudrate(self, baudrate):
+        """
+        Switch the receiver and the uart to baudrate
+          the receiver changes rate without an acknowledgement, so the
+          uart follows and listens for valid data. if none is heard the
+          uart goes back to the old rate
+          returns True if the receiver is heard at the new rate
+        """
+        if baudrate not in BAUDRATES:
+            raise ValueError('unsupported baud rate')
+
+        if self.protocol == 'pmtk':
+            self.send_pmtk('PMTK251,%d' % baudrate)
+        else:
+            # UART1, 8N1, UBX + NMEA in and out
+            self.send_ubx(UBX_CLASS_CFG, UBX_CFG_PRT,
+                          pack('<BBHIIHHHH', 1, 0, 0, 0x000008D0, baudrate, 0x0003, 0x0003, 0, 0))
+
+        # let the command leave at the old rate before switching
+        sleep_ms(100)
+        old = self.baudrate
+        self.uart.init(baudrate=baudrate)
+
+        if self.heard_valid():
+            self.baudrate = baudrate
+            if self.ingest is not None:
+                self.ingest.resync()
+            return True
+
+        self.uart.init(baudrate=old)
+        return False
+
+    def configure(self, sentences=('RMC', 'GGA'), baudrate=115200, hz=1, nav_pvt=False):
+        """
+        Cut the output to sentences, then raise the baud rate, then the
+        update rate, in that order so the link never carries more than
+        the old rate can
+          nav_pvt - u-blox only, turn NAV-PVT frames on first, so there
+                    is something to hear after the baud change even with
+                    no sentences
+          returns True if every step succeeded
+        """
+        ok = True
+        if nav_pvt:
+            ok = self.set_nav_pvt(1)
+        ok = self.set_sentences(sentences) and ok
+        if baudrate != self.baudrate:
+            ok = self.set_baudrate(baudrate) and ok
+        return self.set_rate(hz) and ok
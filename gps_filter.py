@@ -0,0 +1,202 @@
+"""
+gps_filter.py
+Constant velocity Kalman filter for GPS fixes, weighted by HDOP, and a
+redraw gate that only lets the display update when what it shows has
+changed by a visible amount
+
+  kf = PositionFilter()
+  on every fix:
+    kf.update(gps.latitude_e7, gps.longitude_e7, gps.hdop, gps.fix_time)
+    use kf.lat_e7, kf.lon_e7
+
+Positions are filtered in flat metres from a reference point near the
+track, so the state stays small enough for float32. East and north are
+filtered separately with the same noise model, so they share one
+covariance. Constant memory and float math only
+"""
+from math import atan2, cos, degrees, sqrt
+
+from navigation import E7_TO_RAD, M_PER_E7
+from ticks import ticks_diff, ticks_ms
+
+# metres per second to knots
+KNOTS = 1.943844
+
+
+class PositionFilter():
+    def __init__(self, uere=4.0, accel=0.5, reset_ms=10000, reanchor_m=1000):
+        """
+        uere       - receiver position error (metres) at HDOP 1, a fix is
+                     weighted by 1 / (hdop * uere)**2
+        accel      - expected acceleration (m/s/s), higher follows turns
+                     and stops sooner, lower smooths more
+        reset_ms   - a gap between fixes longer than this restarts the
+                     filter on the next fix
+        reanchor_m - the reference point moves to the filtered position
+                     once it is this far away
+        """
+        self.uere = uere
+        self.q = accel * accel
+        self.reset_ms = reset_ms
+        self.reanchor_m = reanchor_m
+
+        self.valid = False
+        self.fix_ms = 0
+
+        # reference point, 1e-7 degrees
+        self.ref_lat = 0
+        self.ref_lon = 0
+        self.m_per_lon = M_PER_E7
+
+        # state, metres and metres per second east and north of the reference
+        self.x = 0.0
+        self.y = 0.0
+        self.vx = 0.0
+        self.vy = 0.0
+
+        # covariance shared by both axes
+        self.p00 = 0.0
+        self.p01 = 0.0
+        self.p11 = 0.0
+
+        # filtered position
+        self.lat_e7 = 0
+        self.lon_e7 = 0
+
+        # Statistics
+        self.updates = 0
+        self.resets = 0
+
+    def reset(self, lat_e7, lon_e7, r):
+        self.ref_lat = lat_e7
+        self.ref_lon = lon_e7
+        self.m_per_lon = M_PER_E7 * cos(lat_e7 * E7_TO_RAD)
+        self.x = self.y = 0.0
+        self.vx = self.vy = 0.0
+        self.p00 = r
+        self.p01 = 0.0
+        self.p11 = 100.0
+        self.valid = True
+        self.resets += 1
+
+    def update(self, lat_e7, lon_e7, hdop, now_ms=None):
+        """
+        Filter a new fix
+          lat_e7, lon_e7 - signed 1e-7 degrees
+          hdop           - horizontal dilution of precision, 0 if unknown
+          now_ms         - ticks_ms() of the fix, now by default
+        """
+        if now_ms is None:
+            now_ms = ticks_ms()
+
+        if hdop <= 0:
+            hdop = 1.0
+        sigma = hdop * self.uere
+        r = sigma * sigma
+
+        dt_ms = ticks_diff(now_ms, self.fix_ms)
+        self.fix_ms = now_ms
+        self.updates += 1
+
+        if not self.valid or dt_ms > self.reset_ms or dt_ms < 0:
+            self.reset(lat_e7, lon_e7, r)
+            self.lat_e7 = lat_e7
+            self.lon_e7 = lon_e7
+            return
+
+        # predict
+        dt = dt_ms / 1000
+        dt2 = dt * dt
+        q = self.q
+        self.x += self.vx * dt
+        self.y += self.vy * dt
+        p00 = self.p00 + 2 * dt * self.p01 + dt2 * self.p11 + q * dt2 * dt2 / 4
+        p01 = self.p01 + dt * self.p11 + q * dt2 * dt / 2
+        p11 = self.p11 + q * dt2
+
+        # measurement, as an offset from the reference point
+        zx = (lon_e7 - self.ref_lon) * self.m_per_lon
+        zy = (lat_e7 - self.ref_lat) * M_PER_E7
+
+        # update
+        s = p00 + r
+        k0 = p00 / s
+        k1 = p01 / s
+        ex = zx - self.x
+        ey = zy - self.y
+        self.x += k0 * ex
+        self.y += k0 * ey
+        self.vx += k1 * ex
+        self.vy += k1 * ey
+        self.p00 = (1 - k0) * p00
+        self.p01 = (1 - k0) * p01
+        self.p11 = p11 - k1 * p01
+
+        # integer output, the float offset is added to the integer reference
+        self.lat_e7 = self.ref_lat + int(round(self.y / M_PER_E7))
+        self.lon_e7 = self.ref_lon + int(round(self.x / self.m_per_lon))
+
+        if abs(self.x) > self.reanchor_m or abs(self.y) > self.reanchor_m:
+            self.ref_lat = self.lat_e7
+            self.ref_lon = self.lon_e7
+            self.m_per_lon = M_PER_E7 * cos(self.lat_e7 * E7_TO_RAD)
+            self.x = self.y = 0.0
+
+    def speed(self):
+        """
+        Filtered speed in knots
+        """
+        return sqrt(self.vx * self.vx + self.vy * self.vy) * KNOTS
+
+    def course(self):
+        """
+        Filtered course in degrees true
+        """
+        return (degrees(atan2(self.vx, self.vy)) + 360) % 360
+
+    def sigma(self):
+        """
+        Filtered position standard deviation in metres, per axis
+        """
+        return sqrt(self.p00)
+
+
+class RedrawGate():
+    def __init__(self, distance_m=2.0, bearing_deg=3.0):
+        """
+        distance_m  - smallest distance change worth redrawing
+        bearing_deg - smallest bearing change worth redrawing, about one
+                      pixel at the tip of a 20 pixel needle
+        """
+        self.distance_m = distance_m
+        self.bearing_deg = bearing_deg
+        self.distance = None
+        self.bearing = None
+
+        # Statistics
+        self.checks = 0
+        self.redraws = 0
+
+    def check(self, distance, bearing):
+        """
+        True if distance or bearing moved enough since the last redraw,
+        which is then taken as drawn
+        """
+        self.checks += 1
+        if self.distance is not None:
+            turn = abs(bearing - self.bearing) % 360
+            if turn > 180:
+                turn = 360 - turn
+            if abs(distance - self.distance) < self.distance_m and turn < self.bearing_deg:
+                return False
+
+        self.distance = distance
+        self.bearing = bearing
+        self.redraws += 1
+        return True
+
+    def force(self):
+        """
+        Make the next check() redraw
+        """
+        self.distance = None
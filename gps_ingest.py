@@ -0,0 +1,169 @@
+"""
+gps_ingest.py
+Drain a GPS UART continuously into a MicropyGPS parser and publish the
+latest fix for display code to read
+"""
+
+try:
+    # Assume running on MicroPython
+    import micropython
+except ImportError:
+    # Host Python can only poll
+    micropython = None
+
+
+class GPSIngest():
+    def __init__(self, uart, gps, rxbuf=1024, chunk=256, capture=None):
+        """
+        uart    - UART the receiver is attached to, needs any() and readinto()
+        gps     - MicropyGPS or ubx.UBXParser parser to feed
+        rxbuf   - size of the UART rx buffer, used to detect overflows
+        chunk   - bytes moved from the UART to the parser per readinto()
+        capture - optional NMEACapture that keeps the last raw sentences
+        """
+        self.uart = uart
+        self.gps = gps
+        self.capture = capture
+        self.rxbuf = rxbuf
+        self.buf = bytearray(chunk)
+
+        # Latest fix, signed decimal degrees and signed 1e-7 degrees
+        #   the e7 values are only kept by a fixed_point parser
+        self.valid = False
+        self.latitude = 0.0
+        self.longitude = 0.0
+        self.latitude_e7 = 0
+        self.longitude_e7 = 0
+        self.fix_count = 0
+        self.fix_time = 0
+
+        # Counters
+        self.polls = 0
+        self.bytes_read = 0
+        self.overflows = 0
+        self.max_backlog = 0
+
+        # IRQ support
+        self.irq_active = False
+        self.poll_scheduled = False
+        self.scheduled_poll_cb = self.scheduled_poll
+
+    def poll(self):
+        """
+        Move everything waiting in the UART into the parser
+          call from the main loop as often as possible
+          returns True when a new fix, or the loss of the fix, was
+          published
+        """
+        uart = self.uart
+        buf = self.buf
+        gps = self.gps
+
+        self.polls += 1
+        waiting = uart.any()
+        if not waiting:
+            return False
+
+        """
+        a full rx buffer means the UART may have dropped bytes since
+        the last poll. max_backlog well under rxbuf shows nothing is lost
+        """
+        if waiting > self.max_backlog:
+            self.max_backlog = waiting
+        if waiting >= self.rxbuf:
+            self.overflows += 1
+
+        while waiting > 0:
+            n = uart.readinto(buf, min(waiting, len(buf)))
+            if not n:
+                break
+            self.bytes_read += n
+            gps.update_buffer(buf, n)
+            if self.capture is not None:
+                self.capture.feed(buf, n)
+            waiting -= n
+
+        if gps.fix_time != self.fix_time or gps.valid != self.valid:
+            self.publish()
+            return True
+
+        return False
+
+    def publish(self):
+        """
+        Copy the parser's latest position into the published fix
+          when the receiver has lost the fix the parser's position is
+          cleared, and valid is published as False
+        """
+        gps = self.gps
+
+        self.latitude = gps.latitude_decimal
+        self.longitude = gps.longitude_decimal
+        self.latitude_e7 = gps.latitude_e7
+        self.longitude_e7 = gps.longitude_e7
+        self.valid = gps.valid
+        self.fix_time = gps.fix_time
+        if self.valid:
+            self.fix_count += 1
+
+    def resync(self):
+        """
+        Drop the parser's half received sentence, e.g. after the uart
+        changed baud rate mid sentence
+        """
+        self.gps.resync()
+
+    def fix_age(self):
+        """
+        Milliseconds since the last fix, -1 if there has been no fix
+        """
+        return self.gps.time_since_fix()
+
+    def stats(self):
+        """
+        Ingestion counters as a dict, for the REPL or a debug screen
+        """
+        return {'polls': self.polls,
+                'bytes_read': self.bytes_read,
+                'overflows': self.overflows,
+                'max_backlog': self.max_backlog,
+                'crc_fails': self.gps.crc_fails,
+                'fix_count': self.fix_count,
+                'fix_age': self.fix_age()}
+
+    def start_irq(self):
+        """
+        Drain from a UART rx idle interrupt instead of the main loop
+          the handler only schedules poll() so parsing never runs in
+          interrupt context
+          returns False if the port has no UART rx idle interrupt
+        """
+        if micropython is None:
+            return False
+
+        try:
+            trigger = self.uart.IRQ_RXIDLE
+            self.uart.irq(handler=self.uart_isr, trigger=trigger)
+        except AttributeError:
+            return False
+
+        self.irq_active = True
+        return True
+
+    def stop_irq(self):
+        if self.irq_active:
+            self.uart.irq(handler=None)
+            self.irq_active = False
+
+    def uart_isr(self, uart):
+        if not self.poll_scheduled:
+            self.poll_scheduled = True
+            try:
+                micropython.schedule(self.scheduled_poll_cb, None)
+            except RuntimeError:
+                # schedule queue full, the next interrupt will try again
+                self.poll_scheduled = False
+
+    def scheduled_poll(self, arg):
+        self.poll_scheduled = False
+        self.poll()
@@ -0,0 +1,110 @@
+"""
+gps_track.py
+Read binary track logs written by MicropyGPS.start_logging(log_format='track')
+and stream them back into a parser or analysis code
+"""
+from struct import unpack_from
+
+from micropyGPS import MicropyGPS
+
+TRACK_FORMAT = MicropyGPS.TRACK_FORMAT
+TRACK_RECORD_SIZE = MicropyGPS.TRACK_RECORD_SIZE
+
+
+def read_track(target_file, block_records=64):
+    """
+    Yield the records of a track log in order as tuples
+      (utc_seconds, milliseconds, latitude_e7, longitude_e7,
+       speed_knots, course, hdop)
+      utc_seconds counts from 2000-01-01, positions are signed 1e-7 degrees
+      hdop is 0 in records logged before the parser saw a GGA or GSA,
+      usually the first, as RMC comes first in an epoch
+      a partial record at the end of the file is ignored
+    """
+    block = bytearray(TRACK_RECORD_SIZE * block_records)
+    with open(target_file, 'rb') as f:
+        while True:
+            n = f.readinto(block)
+            if not n:
+                break
+
+            for offset in range(0, n - TRACK_RECORD_SIZE + 1, TRACK_RECORD_SIZE):
+                (utc_seconds, milliseconds, latitude_e7, longitude_e7,
+                 speed, course, hdop) = unpack_from(TRACK_FORMAT, block, offset)
+                yield (utc_seconds, milliseconds, latitude_e7, longitude_e7,
+                       speed / 100, course / 100, hdop / 100)
+
+            if n % TRACK_RECORD_SIZE:
+                break
+
+
+def _civil_from_days(days):
+    """
+    day, month, two digit year of a day count from 2000-01-01
+    """
+    year = 0
+    while True:
+        year_days = 366 if year % 4 == 0 else 365
+        if days < year_days:
+            break
+        days -= year_days
+        year += 1
+
+    month_days = (31, 29 if year % 4 == 0 else 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+    month = 0
+    while days >= month_days[month]:
+        days -= month_days[month]
+        month += 1
+
+    return days + 1, month + 1, year
+
+
+def _ddm(value_e7, deg_digits):
+    """
+    unsigned 1e-7 degrees as a NMEA ddmm.mmmmm string and hemisphere index
+    """
+    value_e7 = abs(value_e7)
+    degrees = value_e7 // 10000000
+    minutes_e5 = ((value_e7 % 10000000) * 60 + 50) // 100
+    return '%0*d%02d.%05d' % (deg_digits, degrees, minutes_e5 // 100000, minutes_e5 % 100000)
+
+
+def _sentence(body):
+    crc = 0
+    for c in body:
+        crc ^= ord(c)
+    return ('$%s*%02X\r\n' % (body, crc)).encode()
+
+
+def record_to_nmea(record):
+    """
+    Rebuild GPRMC and GPGGA sentences (bytes) carrying a track record
+    """
+    utc_seconds, milliseconds, latitude_e7, longitude_e7, speed, course, hdop = record
+
+    day, month, year = _civil_from_days(utc_seconds // 86400)
+    seconds = utc_seconds % 86400
+    utc = '%02d%02d%02d.%02d' % (seconds // 3600, (seconds // 60) % 60, seconds % 60, milliseconds // 10)
+    lat = _ddm(latitude_e7, 2) + (',S' if latitude_e7 < 0 else ',N')
+    lon = _ddm(longitude_e7, 3) + (',W' if longitude_e7 < 0 else ',E')
+
+    rmc = _sentence('GPRMC,%s,A,%s,%s,%.2f,%.2f,%02d%02d%02d,,,A' %
+                    (utc, lat, lon, speed, course, day, month, year))
+    gga = _sentence('GPGGA,%s,%s,%s,1,00,%.2f,,M,,M,,' % (utc, lat, lon, hdop))
+    return gga, rmc
+
+
+def replay_track(target_file, gps, callback=None):
+    """
+    Feed a track log back through a parser, e.g. MicropyGPS(fixed_point=True)
+      callback(gps, record) is called after each record is parsed
+      returns the number of records replayed
+    """
+    count = 0
+    for record in read_track(target_file):
+        for sentence in record_to_nmea(record):
+            gps.parse_sentence(sentence)
+        count += 1
+        if callback is not None:
+            callback(gps, record)
+    return count
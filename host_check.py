@@ -0,0 +1,43 @@
+"""
+host_check.py
+Shared by the host (CPython) benches and checks
+  CORPUS is the synthetic track make_nmea_sample.py writes, read as
+  lines by load_lines() or as the fixes in it by track_fixes()
+  check() prints one line of a check script's report and collects the
+  failures, the script exits 1 if there are any
+"""
+from micropyGPS import MicropyGPS
+
+CORPUS = "nmea_sample.nmea"
+
+# width of the label column in a check report
+LABEL_WIDTH = 68
+
+
+def load_lines(path=CORPUS):
+    """
+    every sentence of the corpus, CRLF included
+    """
+    with open(path, "rb") as f:
+        return f.read().splitlines(True)
+
+
+def track_fixes(path=CORPUS):
+    """
+    (ms of day, lat_e7, lon_e7, speed knots, course, hdop) for every fix,
+    RMC gives the position, speed and course, GGA the hdop
+    """
+    gps = MicropyGPS(sentences=("RMC", "GGA"), fixed_point=True)
+    fixes = []
+    for line in load_lines(path):
+        if gps.parse_sentence(line) and line[3:6] == b"RMC" and gps.valid:
+            h, m, s = gps.timestamp
+            fixes.append((int(((h * 60 + m) * 60 + s) * 1000), gps.latitude_e7, gps.longitude_e7,
+                          gps.speed[0], gps.course, gps.hdop))
+    return fixes
+
+
+def check(label, ok, failures):
+    print("%-*s %s" % (LABEL_WIDTH, label, "ok" if ok else "FAIL"))
+    if not ok:
+        failures.append(label)
@@ -0,0 +1,257 @@
+"""
+host_framebuf.py
+Host (CPython) stand in for MicroPython's framebuf and micropython
+modules, so the display code can be benchmarked off the device
+  import host_framebuf
+  host_framebuf.install()
+  import ssd1306
+
+MONO_VLSB only, the SSD1306 layout. Drawing follows the firmware's
+framebuf.c: the same clipping, the same line and ellipse algorithms and
+8x8 text cells. The font is a made up one, each char a fixed pattern, so
+text lands in the right bytes but doesn't read as letters
+
+FrameBuffer.calls counts the drawing methods called on it, the number
+of trips from Python into native code on the device
+"""
+import sys
+import types
+
+MONO_VLSB = 0
+
+
+def _glyph(c):
+    """
+    8 column bytes for char c, blank for a space
+    """
+    code = ord(c)
+    if code == 32:
+        return bytes(8)
+    return bytes(((code * (i + 3) * 37) >> 2 & 0x7F) | 0x01 for i in range(7)) + b'\x00'
+
+
+class FrameBuffer():
+    def __init__(self, buffer, width, height, format, stride=None):
+        if format != MONO_VLSB:
+            raise ValueError('only MONO_VLSB is emulated')
+        self.buf = buffer
+        self.w = width
+        self.h = height
+        self.stride = width if stride is None else stride
+        self.calls = 0
+
+    # pixels and fills
+    def _set(self, x, y, c):
+        i = (y >> 3) * self.stride + x
+        bit = 1 << (y & 7)
+        if c:
+            self.buf[i] |= bit
+        else:
+            self.buf[i] &= ~bit & 0xFF
+
+    def _fill_rect(self, x, y, w, h, c):
+        # clipped to the buffer, as framebuf.c
+        if w < 1 or h < 1 or x + w <= 0 or y + h <= 0 or y >= self.h or x >= self.w:
+            return
+        xend = min(self.w, x + w)
+        yend = min(self.h, y + h)
+        x = max(x, 0)
+        y = max(y, 0)
+        buf = self.buf
+        stride = self.stride
+        for yy in range(y, yend):
+            row = (yy >> 3) * stride
+            bit = 1 << (yy & 7)
+            if c:
+                for i in range(row + x, row + xend):
+                    buf[i] |= bit
+            else:
+                mask = ~bit & 0xFF
+                for i in range(row + x, row + xend):
+                    buf[i] &= mask
+
+    def fill(self, c):
+        self.calls += 1
+        value = 0xFF if c else 0x00
+        for i in range(self.stride * ((self.h + 7) >> 3)):
+            self.buf[i] = value
+
+    def pixel(self, x, y, c=None):
+        self.calls += 1
+        if not (0 <= x < self.w and 0 <= y < self.h):
+            return None
+        if c is None:
+            return self.buf[(y >> 3) * self.stride + x] >> (y & 7) & 1
+        self._set(x, y, c)
+
+    def hline(self, x, y, w, c):
+        self.calls += 1
+        self._fill_rect(x, y, w, 1, c)
+
+    def vline(self, x, y, h, c):
+        self.calls += 1
+        self._fill_rect(x, y, 1, h, c)
+
+    def fill_rect(self, x, y, w, h, c):
+        self.calls += 1
+        self._fill_rect(x, y, w, h, c)
+
+    def rect(self, x, y, w, h, c, f=False):
+        self.calls += 1
+        if f:
+            self._fill_rect(x, y, w, h, c)
+        else:
+            self._fill_rect(x, y, w, 1, c)
+            self._fill_rect(x, y + h - 1, w, 1, c)
+            self._fill_rect(x, y, 1, h, c)
+            self._fill_rect(x + w - 1, y, 1, h, c)
+
+    def line(self, x1, y1, x2, y2, c):
+        # Bresenham as framebuf.c, steep lines drawn along y
+        self.calls += 1
+        dx = x2 - x1
+        sx = 1
+        if dx <= 0:
+            dx = -dx
+            sx = -1
+        dy = y2 - y1
+        sy = 1
+        if dy <= 0:
+            dy = -dy
+            sy = -1
+        steep = dy > dx
+        if steep:
+            x1, y1 = y1, x1
+            dx, dy = dy, dx
+            sx, sy = sy, sx
+        e = 2 * dy - dx
+        for _ in range(dx):
+            if steep:
+                if 0 <= y1 < self.w and 0 <= x1 < self.h:
+                    self._set(y1, x1, c)
+            elif 0 <= x1 < self.w and 0 <= y1 < self.h:
+                self._set(x1, y1, c)
+            while e >= 0:
+                y1 += sy
+                e -= 2 * dx
+            x1 += sx
+            e += 2 * dy
+        if 0 <= x2 < self.w and 0 <= y2 < self.h:
+            self._set(x2, y2, c)
+
+    def _ellipse_points(self, cx, cy, x, y, c, f, m):
+        if f:
+            if m & 0x01:
+                self._fill_rect(cx, cy - y, x + 1, 1, c)
+            if m & 0x02:
+                self._fill_rect(cx - x, cy - y, x + 1, 1, c)
+            if m & 0x04:
+                self._fill_rect(cx - x, cy + y, x + 1, 1, c)
+            if m & 0x08:
+                self._fill_rect(cx, cy + y, x + 1, 1, c)
+        else:
+            for mask, px, py in ((0x01, cx + x, cy - y), (0x02, cx - x, cy - y),
+                                 (0x04, cx - x, cy + y), (0x08, cx + x, cy + y)):
+                if m & mask and 0 <= px < self.w and 0 <= py < self.h:
+                    self._set(px, py, c)
+
+    def ellipse(self, cx, cy, xr, yr, c, f=False, m=0x0F):
+        # midpoint ellipse as framebuf.c
+        self.calls += 1
+        if xr == 0 and yr == 0:
+            if m & 0x0F and 0 <= cx < self.w and 0 <= cy < self.h:
+                self._set(cx, cy, c)
+            return
+        two_asquare = 2 * xr * xr
+        two_bsquare = 2 * yr * yr
+        x = xr
+        y = 0
+        xchange = yr * yr * (1 - 2 * xr)
+        ychange = xr * xr
+        ellipse_error = 0
+        stoppingx = two_bsquare * xr
+        stoppingy = 0
+        while stoppingx >= stoppingy:
+            self._ellipse_points(cx, cy, x, y, c, f, m)
+            y += 1
+            stoppingy += two_asquare
+            ellipse_error += ychange
+            ychange += two_asquare
+            if 2 * ellipse_error + xchange > 0:
+                x -= 1
+                stoppingx -= two_bsquare
+                ellipse_error += xchange
+                xchange += two_bsquare
+        x = 0
+        y = yr
+        xchange = yr * yr
+        ychange = xr * xr * (1 - 2 * yr)
+        ellipse_error = 0
+        stoppingx = 0
+        stoppingy = two_asquare * yr
+        while stoppingx <= stoppingy:
+            self._ellipse_points(cx, cy, x, y, c, f, m)
+            x += 1
+            stoppingx += two_bsquare
+            ellipse_error += xchange
+            xchange += two_bsquare
+            if 2 * ellipse_error + ychange > 0:
+                y -= 1
+                stoppingy -= two_asquare
+                ellipse_error += ychange
+                ychange += two_asquare
+
+    def text(self, s, x, y, c=1):
+        self.calls += 1
+        for ch in s:
+            glyph = _glyph(ch)
+            for i in range(8):
+                column = glyph[i]
+                xx = x + i
+                if 0 <= xx < self.w:
+                    for j in range(8):
+                        if column >> j & 1 and 0 <= y + j < self.h:
+                            self._set(xx, y + j, c)
+            x += 8
+
+    def blit(self, fbuf, x, y, key=-1, palette=None):
+        self.calls += 1
+        for sy in range(fbuf.h):
+            yy = y + sy
+            if not 0 <= yy < self.h:
+                continue
+            for sx in range(fbuf.w):
+                xx = x + sx
+                if not 0 <= xx < self.w:
+                    continue
+                c = fbuf.buf[(sy >> 3) * fbuf.stride + sx] >> (sy & 7) & 1
+                if palette is not None:
+                    c = palette.buf[c] & 1
+                if c != key:
+                    self._set(xx, yy, c)
+
+    def scroll(self, xstep, ystep):
+        self.calls += 1
+        old = bytes(self.buf)
+        for y in range(self.h):
+            for x in range(self.w):
+                sx = x - xstep
+                sy = y - ystep
+                if 0 <= sx < self.w and 0 <= sy < self.h:
+                    self._set(x, y, old[(sy >> 3) * self.stride + sx] >> (sy & 7) & 1)
+
+
+def install():
+    """
+    Make 'import framebuf' and 'from micropython import const' work on
+    the host, unless real modules are already there
+    """
+    if 'framebuf' not in sys.modules:
+        module = types.ModuleType('framebuf')
+        module.FrameBuffer = FrameBuffer
+        module.MONO_VLSB = MONO_VLSB
+        sys.modules['framebuf'] = module
+    if 'micropython' not in sys.modules:
+        module = types.ModuleType('micropython')
+        module.const = lambda value: value
+        sys.modules['micropython'] = module
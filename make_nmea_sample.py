@@ -0,0 +1,119 @@
+"""
+make_nmea_sample.py
+Generates nmea_sample.nmea, the synthetic NMEA track the host benches
+replay. It is not a receiver capture: positions come from a scripted
+walk with gaussian jitter, the satellites are a fixed sky
+
+  200 one second epochs of RMC, VTG, GGA, GSA, 3 GSV and GLL, like a
+  MediaTek receiver at 1 Hz with every sentence on
+    20 s idle at Home
+    a walk at 1.4 m/s to the Substation, then a dwell there
+    5 m/s toward EP Clark Elementary until the track ends
+  fixes jittered by 1.5 m, HDOP between 0.9 and 1.3
+
+The random generator is seeded, so the file is the same on every run
+  run with: python3 make_nmea_sample.py [FILE]
+"""
+from math import atan2, cos, degrees, hypot, radians
+import random
+import sys
+
+OUTPUT = "nmea_sample.nmea"
+SEED = 7
+EPOCHS = 200
+
+# metres per degree of latitude
+M_PER_DEG = 111195.0
+
+HOME = (42.040545, -86.435835)
+SUBSTATION = (42.039323, -86.435976)
+EP_CLARK = (42.044174, -86.446875)
+
+# (epochs from, epochs to, walking to, m/s), idle when the target is None
+LEGS = ((0, 20, None, 0.0),
+        (20, 125, SUBSTATION, 1.4),
+        (125, 145, None, 0.0),
+        (145, EPOCHS, EP_CLARK, 5.0))
+
+# prn, elevation, azimuth, snr (0 not tracked)
+SKY = ((2, 45, 123, 38), (5, 61, 52, 41), (12, 23, 301, 33), (13, 12, 188, 27), (15, 74, 245, 44),
+       (18, 8, 40, 0), (20, 33, 96, 36), (25, 19, 270, 30), (29, 55, 160, 42), (31, 6, 330, 0))
+
+
+def sentence(body):
+    crc = 0
+    for c in body.encode():
+        crc ^= c
+    return '$%s*%02X\r\n' % (body, crc)
+
+
+def ddmm(value, width):
+    """
+    degrees and minutes, degrees zero padded to width digits
+    """
+    a = abs(value)
+    d = int(a)
+    return ('%0' + str(width) + 'd%08.5f') % (d, (a - d) * 60)
+
+
+def leg(epoch):
+    for start, end, target, speed in LEGS:
+        if start <= epoch < end:
+            return target, speed
+
+
+def generate(rng):
+    lat, lon = HOME
+    course = 0.0
+    h, m, s = 14, 21, 5
+    out = []
+    for epoch in range(EPOCHS):
+        target, speed = leg(epoch)
+        if target:
+            dy = (target[0] - lat) * M_PER_DEG
+            dx = (target[1] - lon) * M_PER_DEG * cos(radians(lat))
+            dist = hypot(dx, dy)
+            step = min(speed, dist)
+            if dist > 0.01:
+                course = (degrees(atan2(dx, dy)) + 360) % 360
+                lat += dy / dist * step / M_PER_DEG
+                lon += dx / dist * step / (M_PER_DEG * cos(radians(lat)))
+            if dist < 0.5:
+                speed = 0.0
+
+        fix_lat = lat + rng.gauss(0, 1.5) / M_PER_DEG
+        fix_lon = lon + rng.gauss(0, 1.5) / (M_PER_DEG * cos(radians(lat)))
+        t = '%02d%02d%02d.00' % (h, m, s)
+        hdop = 0.9 + rng.random() * 0.4
+        knots = max(0.0, speed * 1.94384 + rng.gauss(0, 0.05))
+        lat_s = ddmm(fix_lat, 2)
+        lon_s = ddmm(fix_lon, 3)
+
+        out.append(sentence('GPRMC,%s,A,%s,N,%s,W,%.3f,%.2f,171026,,,A' % (t, lat_s, lon_s, knots, course)))
+        out.append(sentence('GPVTG,%.2f,T,,M,%.3f,N,%.3f,K,A' % (course, knots, knots * 1.852)))
+        out.append(sentence('GPGGA,%s,%s,N,%s,W,1,08,%.2f,%.1f,M,-34.2,M,,' %
+                            (t, lat_s, lon_s, hdop, 186.4 + rng.random())))
+        out.append(sentence('GPGSA,A,3,02,05,12,13,15,20,25,29,,,,,1.71,%.2f,1.40' % hdop))
+        for k in range(3):
+            sats = ['%02d,%02d,%03d,%s' % (prn, el, az, '%02d' % snr if snr else '')
+                    for prn, el, az, snr in SKY[k * 4:k * 4 + 4]]
+            out.append(sentence('GPGSV,3,%d,10,%s' % (k + 1, ','.join(sats))))
+        out.append(sentence('GPGLL,%s,N,%s,W,%s,A,A' % (lat_s, lon_s, t)))
+
+        s += 1
+        if s == 60:
+            s = 0
+            m += 1
+    return ''.join(out)
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else OUTPUT
+    data = generate(random.Random(SEED))
+    with open(path, 'w', newline='') as f:
+        f.write(data)
+    print("%s: %d epochs, %d bytes" % (path, EPOCHS, len(data)))
+
+
+if __name__ == "__main__":
+    main()
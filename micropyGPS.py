@@ -5,26 +5,36 @@
 """
 
 # TODO:
-# Time Since First Fix
 # Distance/Time to Target
 # More Helper Functions
-# Dynamically limit sentences types to parse
 
 from math import floor, modf
+from struct import calcsize, pack_into
 
 # Import utime or time for fix time handling
 try:
     # Assume running on MicroPython
     import utime
+    from utime import ticks_diff as _ticks_diff, ticks_ms as _ticks_ms, ticks_us as _ticks_us
 except ImportError:
     # Otherwise default to time module for non-embedded implementations
     # Should still support millisecond resolution.
     import time
 
+    def _ticks_ms():
+        return time.perf_counter_ns() // 1000000
+
+    def _ticks_us():
+        return time.perf_counter_ns() // 1000
+
+    def _ticks_diff(ticks1, ticks2):
+        return ticks1 - ticks2
+
 
 class MicropyGPS(object):
     """GPS NMEA Sentence Parser. Creates object that stores all relevant GPS data and statistics.
-    Parses sentences one character at a time using update(). """
+    Parses sentences one character at a time using update(), or a whole buffer of bytes at a time using
+    update_bytes() and update_buffer(). """
 
     # Max Number of Characters a valid sentence can be (based on GGA sentence)
     SENTENCE_LIMIT = 90
@@ -38,7 +48,12 @@ class MicropyGPS(object):
                 'June', 'July', 'August', 'September', 'October',
                 'November', 'December')
 
-    def __init__(self, local_offset=0, location_formatting='ddm'):
+    # Binary track log record: UTC seconds since 2000-01-01, milliseconds, latitude and longitude in signed 1e-7
+    # degrees, speed in 0.01 knots, course in 0.01 degrees and HDOP in 0.01
+    TRACK_FORMAT = '<IHiiHHH'
+    TRACK_RECORD_SIZE = calcsize(TRACK_FORMAT)
+
+    def __init__(self, local_offset=0, location_formatting='ddm', sentences=None, fixed_point=False):
         """
         Setup GPS Object Status Flags, Internal Data Registers, etc
             local_offset (int): Timzone Difference to UTC
@@ -46,6 +61,10 @@ class MicropyGPS(object):
                                        Decimal Degree Minute (ddm) - 40° 26.767′ N
                                        Degrees Minutes Seconds (dms) - 40° 26′ 46″ N
                                        Decimal Degrees (dd) - 40.446° N
+            sentences (tuple): Sentence types to parse regardless of talker, e.g. ('RMC', 'GGA'). All other
+                               sentences are skipped as soon as their type is known. None parses everything
+            fixed_point (bool): Also keep latitude_e7/longitude_e7, signed integer 1e-7 degrees parsed straight
+                                from the NMEA digits so no precision is lost to single precision floats
         """
 
         #####################
@@ -53,21 +72,57 @@ class MicropyGPS(object):
         self.sentence_active = False
         self.active_segment = 0
         self.process_crc = False
-        self.gps_segments = []
         self.crc_xor = 0
         self.char_count = 0
         self.fix_time = 0
+        self._char_buf = bytearray(1)
+        self._skipping = False
+
+        #####################
+        # Sentence Accumulator
+        # Raw sentence chars (without '$') and the start offset of each field, reused for every sentence
+        self._sentence = bytearray(self.SENTENCE_LIMIT)
+        self._field_starts = bytearray(self.SENTENCE_LIMIT + 1)
+        self._field_count = 0
+        self._segments = _Segments(self)
+        self.gps_segments = self._segments
+
+        #####################
+        # Sentence Filter
+        # Subscribed sentence types packed into ints so they can be checked without allocating
+        if sentences is None:
+            self._sentence_filter = None
+        else:
+            self._sentence_filter = set(_type_code(ord(t[0]), ord(t[1]), ord(t[2])) for t in sentences)
 
         #####################
         # Sentence Statistics
         self.crc_fails = 0
         self.clean_sentences = 0
         self.parsed_sentences = 0
+        self.skipped_sentences = 0
+        self.skipped_bytes = 0
+        self.bytes_processed = 0
+        self.sentence_counts = dict()
+
+        #####################
+        # Performance Statistics
+        self.boot_ticks = _ticks_ms()
+        self.first_fix_ms = -1
+        self.fix_losses = 0
+        self.has_fix = False
+        self.parse_count = 0
+        self.parse_us_total = 0
+        self.parse_us_max = 0
 
         #####################
         # Logging Related
         self.log_handle = None
         self.log_en = False
+        self.log_format = 'nmea'
+        self._log_buf = None
+        self._log_mv = None
+        self._log_len = 0
 
         #####################
         # Data From Sentences
@@ -80,6 +135,11 @@ class MicropyGPS(object):
         self._latitude = [0, 0.0, 'N']
         self._longitude = [0, 0.0, 'W']
         self.coord_format = location_formatting
+        self.fixed_point = fixed_point
+        self.latitude_e7 = 0
+        self.longitude_e7 = 0
+        self._latitude_decimal = None
+        self._longitude_decimal = None
         self.speed = [0.0, 0.0, 0.0]
         self.course = 0.0
         self.altitude = 0.0
@@ -128,15 +188,52 @@ class MicropyGPS(object):
         else:
             return self._longitude
 
+    @property
+    def latitude_decimal(self):
+        """Signed Decimal Degrees Latitude, computed once per fix and cached"""
+        if self._latitude_decimal is None:
+            if self.fixed_point:
+                self._latitude_decimal = self.latitude_e7 / 10000000
+            else:
+                decimal_degrees = self._latitude[0] + (self._latitude[1] / 60)
+                self._latitude_decimal = -decimal_degrees if self._latitude[2] == 'S' else decimal_degrees
+        return self._latitude_decimal
+
+    @property
+    def longitude_decimal(self):
+        """Signed Decimal Degrees Longitude, computed once per fix and cached"""
+        if self._longitude_decimal is None:
+            if self.fixed_point:
+                self._longitude_decimal = self.longitude_e7 / 10000000
+            else:
+                decimal_degrees = self._longitude[0] + (self._longitude[1] / 60)
+                self._longitude_decimal = -decimal_degrees if self._longitude[2] == 'W' else decimal_degrees
+        return self._longitude_decimal
+
+    def _set_position(self, latitude, longitude, lat_e7, lon_e7):
+        """Store a newly parsed position. latitude/longitude are [deg, minutes, hemi] lists, lat_e7/lon_e7 are the
+        unsigned fixed point values (only used in fixed_point mode)"""
+        self._latitude = latitude
+        self._longitude = longitude
+        self.latitude_e7 = -lat_e7 if latitude[2] == 'S' else lat_e7
+        self.longitude_e7 = -lon_e7 if longitude[2] == 'W' else lon_e7
+        self._latitude_decimal = None
+        self._longitude_decimal = None
+
     ########################################
     # Logging Related Functions
     ########################################
-    def start_logging(self, target_file, mode="append"):
+    def start_logging(self, target_file, mode="append", log_format='nmea', block_size=512):
         """
         Create GPS data log object
+            log_format (str): 'nmea' logs every clean sentence, 'track' logs one binary TRACK_FORMAT record per
+                              valid RMC fix and switches the parser to fixed_point. A record's HDOP is the last
+                              GGA or GSA's, the previous epoch's when the receiver sends RMC first, and 0 in records
+                              written before any GGA or GSA has been parsed
+            block_size (int): Bytes buffered in RAM between writes to the file
         """
         # Set Write Mode Overwrite or Append
-        mode_code = 'w' if mode == 'new' else 'a'
+        mode_code = 'wb' if mode == 'new' else 'ab'
 
         try:
             self.log_handle = open(target_file, mode_code)
@@ -144,14 +241,22 @@ class MicropyGPS(object):
             print("Invalid FileName")
             return False
 
+        self.log_format = log_format
+        if log_format == 'track':
+            self.fixed_point = True
+
+        self._log_buf = bytearray(block_size)
+        self._log_mv = memoryview(self._log_buf)
+        self._log_len = 0
         self.log_en = True
         return True
 
     def stop_logging(self):
         """
-        Closes the log file handler and disables further logging
+        Flushes buffered log data, closes the log file handler and disables further logging
         """
         try:
+            self.flush_log()
             self.log_handle.close()
         except AttributeError:
             print("Invalid Handle")
@@ -160,15 +265,62 @@ class MicropyGPS(object):
         self.log_en = False
         return True
 
-    def write_log(self, log_string):
-        """Attempts to write the last valid NMEA sentence character to the active file handler
+    def flush_log(self):
+        """Writes the buffered log data to the active file handler"""
+        if self._log_len:
+            self.log_handle.write(self._log_mv[:self._log_len])
+            self._log_len = 0
+
+    def write_log(self, log_data):
+        """Buffers log data (bytes or string) for the active file handler, which is only written to a whole block at
+        a time
         """
         try:
-            self.log_handle.write(log_string)
+            if isinstance(log_data, str):
+                log_data = log_data.encode()
+            size = len(log_data)
+
+            if self._log_len + size > len(self._log_buf):
+                self.flush_log()
+                if size > len(self._log_buf):
+                    self.log_handle.write(log_data)
+                    return True
+
+            self._log_mv[self._log_len:self._log_len + size] = log_data
+            self._log_len += size
         except TypeError:
             return False
         return True
 
+    def _log_sentence(self):
+        """Log the clean sentence held in the accumulator"""
+        self.write_log(b'$')
+        self.write_log(memoryview(self._sentence)[:self.char_count])
+        self.write_log(b'\r\n')
+
+    def _log_fix(self):
+        """Pack the current fix into a binary track record in the log buffer"""
+        if not self.date[1]:
+            return  # No date stamp yet
+
+        if self._log_len + self.TRACK_RECORD_SIZE > len(self._log_buf):
+            self.flush_log()
+
+        # Timestamp is held in local time, records are UTC
+        hours = (self.timestamp[0] - self.local_offset) % 24
+        seconds = int(self.timestamp[2])
+        milliseconds = int((self.timestamp[2] - seconds) * 1000 + 0.5)
+        utc_seconds = _days_since_2000(self.date[0], self.date[1], self.date[2]) * 86400 + \
+            hours * 3600 + self.timestamp[1] * 60 + seconds
+
+        pack_into(self.TRACK_FORMAT, self._log_buf, self._log_len,
+                  utc_seconds, min(milliseconds, 999),
+                  self.latitude_e7, self.longitude_e7,
+                  min(int(self.speed[0] * 100 + 0.5), 65535),
+                  min(int(self.course * 100 + 0.5), 65535),
+                  min(int(self.hdop * 100 + 0.5), 65535))
+        self._log_len += self.TRACK_RECORD_SIZE
+
     ########################################
     # Sentence Parsers
     ########################################
@@ -218,12 +370,14 @@ class MicropyGPS(object):
                 l_string = self.gps_segments[3]
                 lat_degs = int(l_string[0:2])
                 lat_mins = float(l_string[2:])
+                lat_e7 = _ddm_to_e7(l_string, 2) if self.fixed_point else 0
                 lat_hemi = self.gps_segments[4]
 
                 # Longitude
                 l_string = self.gps_segments[5]
                 lon_degs = int(l_string[0:3])
                 lon_mins = float(l_string[3:])
+                lon_e7 = _ddm_to_e7(l_string, 3) if self.fixed_point else 0
                 lon_hemi = self.gps_segments[6]
             except ValueError:
                 return False
@@ -252,8 +406,7 @@ class MicropyGPS(object):
             # TODO - Add Magnetic Variation
 
             # Update Object Data
-            self._latitude = [lat_degs, lat_mins, lat_hemi]
-            self._longitude = [lon_degs, lon_mins, lon_hemi]
+            self._set_position([lat_degs, lat_mins, lat_hemi], [lon_degs, lon_mins, lon_hemi], lat_e7, lon_e7)
             # Include mph and hm/h
             self.speed = [spd_knt, spd_knt * 1.151, spd_knt * 1.852]
             self.course = course
@@ -262,12 +415,16 @@ class MicropyGPS(object):
             # Update Last Fix Time
             self.new_fix_time()
 
+            # One track record per fix
+            if self.log_en and self.log_format == 'track':
+                self._log_fix()
+
         else:  # Clear Position Data if Sentence is 'Invalid'
-            self._latitude = [0, 0.0, 'N']
-            self._longitude = [0, 0.0, 'W']
+            self._set_position([0, 0.0, 'N'], [0, 0.0, 'W'], 0, 0)
             self.speed = [0.0, 0.0, 0.0]
             self.course = 0.0
             self.valid = False
+            self.lost_fix()
 
         return True
 
@@ -299,12 +456,14 @@ class MicropyGPS(object):
                 l_string = self.gps_segments[1]
                 lat_degs = int(l_string[0:2])
                 lat_mins = float(l_string[2:])
+                lat_e7 = _ddm_to_e7(l_string, 2) if self.fixed_point else 0
                 lat_hemi = self.gps_segments[2]
 
                 # Longitude
                 l_string = self.gps_segments[3]
                 lon_degs = int(l_string[0:3])
                 lon_mins = float(l_string[3:])
+                lon_e7 = _ddm_to_e7(l_string, 3) if self.fixed_point else 0
                 lon_hemi = self.gps_segments[4]
             except ValueError:
                 return False
@@ -316,17 +475,16 @@ class MicropyGPS(object):
                 return False
 
             # Update Object Data
-            self._latitude = [lat_degs, lat_mins, lat_hemi]
-            self._longitude = [lon_degs, lon_mins, lon_hemi]
+            self._set_position([lat_degs, lat_mins, lat_hemi], [lon_degs, lon_mins, lon_hemi], lat_e7, lon_e7)
             self.valid = True
 
             # Update Last Fix Time
             self.new_fix_time()
 
         else:  # Clear Position Data if Sentence is 'Invalid'
-            self._latitude = [0, 0.0, 'N']
-            self._longitude = [0, 0.0, 'W']
+            self._set_position([0, 0.0, 'N'], [0, 0.0, 'W'], 0, 0)
             self.valid = False
+            self.lost_fix()
 
         return True
 
@@ -385,12 +543,14 @@ class MicropyGPS(object):
                 l_string = self.gps_segments[2]
                 lat_degs = int(l_string[0:2])
                 lat_mins = float(l_string[2:])
+                lat_e7 = _ddm_to_e7(l_string, 2) if self.fixed_point else 0
                 lat_hemi = self.gps_segments[3]
 
                 # Longitude
                 l_string = self.gps_segments[4]
                 lon_degs = int(l_string[0:3])
                 lon_mins = float(l_string[3:])
+                lon_e7 = _ddm_to_e7(l_string, 3) if self.fixed_point else 0
                 lon_hemi = self.gps_segments[5]
             except ValueError:
                 return False
@@ -410,8 +570,7 @@ class MicropyGPS(object):
                 geoid_height = 0
 
             # Update Object Data
-            self._latitude = [lat_degs, lat_mins, lat_hemi]
-            self._longitude = [lon_degs, lon_mins, lon_hemi]
+            self._set_position([lat_degs, lat_mins, lat_hemi], [lon_degs, lon_mins, lon_hemi], lat_e7, lon_e7)
             self.altitude = altitude
             self.geoid_height = geoid_height
 
@@ -424,6 +583,8 @@ class MicropyGPS(object):
         # If Fix is GOOD, update fix timestamp
         if fix_stat:
             self.new_fix_time()
+        else:
+            self.lost_fix()
 
         return True
 
@@ -465,6 +626,8 @@ class MicropyGPS(object):
         # If Fix is GOOD, update fix timestamp
         if fix_type > self.__NO_FIX:
             self.new_fix_time()
+        else:
+            self.lost_fix()
 
         self.satellites_used = sats_used
         self.hdop = hdop
@@ -545,91 +708,244 @@ class MicropyGPS(object):
 
     def new_sentence(self):
         """Adjust Object Flags in Preparation for a New Sentence"""
-        self.gps_segments = ['']
+        self._field_starts[0] = 0
+        self._field_count = 1
         self.active_segment = 0
         self.crc_xor = 0
         self.sentence_active = True
         self.process_crc = True
         self.char_count = 0
 
+    def resync(self):
+        """Drop a half received sentence, e.g. after the serial link changed baud rate mid sentence"""
+        self.sentence_active = False
+
     def update(self, new_char):
         """Process a new input char and updates GPS object if necessary based on special characters ('$', ',', '*')
-        Function builds a list of received string that are validate by CRC prior to parsing by the  appropriate
-        sentence function. Returns sentence type on successful parse, None otherwise"""
-
-        valid_sentence = False
-
-        # Validate new_char is a printable char
-        ascii_char = ord(new_char)
-
-        if 10 <= ascii_char <= 126:
-            self.char_count += 1
+        Function accumulates received chars in a preallocated buffer that is validated by CRC prior to parsing by the
+        appropriate sentence function. Returns sentence type on successful parse, None otherwise"""
+
+        self._char_buf[0] = ord(new_char)
+        return self._feed(self._char_buf, None)
+
+    def update_bytes(self, buf):
+        """Process a whole buffer of raw bytes (bytes, bytearray or memoryview) such as the result of uart.read()
+        in a single call. Returns a list of the sentence types parsed from the buffer, empty if none"""
+        parsed = []
+        self._feed(buf, parsed)
+        return parsed
+
+    def update_buffer(self, buf, nbytes):
+        """Process the first nbytes of a preallocated buffer filled by uart.readinto(). The buffer is sliced
+        through a memoryview so the received data is never copied. Returns a list of parsed sentence types"""
+        parsed = []
+        if nbytes:
+            self._feed(memoryview(buf)[:nbytes], parsed)
+        return parsed
+
+    def parse_sentence(self, line):
+        """Parse one complete '$...*hh' sentence (bytes or bytearray), e.g. from uart.readline(), with a few bulk
+        operations instead of the char by char state machine. Updates the same statistics as update().
+        Returns sentence type on successful parse, None otherwise"""
+
+        # Every byte handed in is counted, like _feed(), garbled and truncated lines included
+        self.bytes_processed += len(line)
+
+        # Locate the CRC and the last sentence start before it, sentence must be complete and not overlong
+        star = line.find(b'*')
+        if star < 0 or len(line) < star + 3:
+            return None
+
+        start = line.rfind(b'$', 0, star)
+        if start < 0 or star - start > self.SENTENCE_LIMIT:
+            return None
+
+        # Skip sentences that aren't subscribed to without checking them
+        if self._sentence_filter is not None:
+            if line.find(b',', start) != start + 6 or \
+                    _type_code(line[start + 3], line[start + 4], line[start + 5]) not in self._sentence_filter:
+                self.skipped_sentences += 1
+                self.skipped_bytes += len(line) - start
+                return None
 
-            # Write Character to log file if enabled
-            if self.log_en:
-                self.write_log(new_char)
+        crc_high = _hex_digit(line[star + 1])
+        crc_low = _hex_digit(line[star + 2])
+        if crc_high < 0 or crc_low < 0:
+            return None  # CRC Value was deformed and could not have been correct
 
-            # Check if a new string is starting ($)
-            if new_char == '$':
-                self.new_sentence()
-                return None
+        crc_xor = 0
+        for ascii_char in memoryview(line)[start + 1:star]:
+            crc_xor ^= ascii_char
 
-            elif self.sentence_active:
+        if crc_xor != (crc_high << 4) | crc_low:
+            self.crc_fails += 1
+            return None
 
-                # Check if sentence is ending (*)
-                if new_char == '*':
-                    self.process_crc = False
-                    self.active_segment += 1
-                    self.gps_segments.append('')
-                    return None
-
-                # Check if a section is ended (,), Create a new substring to feed
-                # characters to
-                elif new_char == ',':
-                    self.active_segment += 1
-                    self.gps_segments.append('')
-
-                # Store All Other printable character and check CRC when ready
-                else:
-                    self.gps_segments[self.active_segment] += new_char
+        try:
+            segments = str(line[start + 1:star], 'ascii').split(',')
+            segments.append(str(line[star + 1:star + 3], 'ascii'))
+        except UnicodeError:
+            return None
 
-                    # When CRC input is disabled, sentence is nearly complete
-                    if not self.process_crc:
+        self.clean_sentences += 1
+        self.gps_segments = segments
 
-                        if len(self.gps_segments[self.active_segment]) == 2:
-                            try:
-                                final_crc = int(self.gps_segments[self.active_segment], 16)
-                                if self.crc_xor == final_crc:
-                                    valid_sentence = True
-                                else:
-                                    self.crc_fails += 1
-                            except ValueError:
-                                pass  # CRC Value was deformed and could not have been correct
+        # Write sentence to log file if enabled
+        if self.log_en and self.log_format == 'nmea':
+            self.write_log(memoryview(line)[start:star + 3])
+            self.write_log(b'\r\n')
 
-                # Update CRC
-                if self.process_crc:
-                    self.crc_xor ^= ascii_char
+        # If it's a supported sentence, then parse it!!
+        sentence_type = segments[0]
+        if self._dispatch(sentence_type):
+            return sentence_type
 
-                # If a Valid Sentence Was received and it's a supported sentence, then parse it!!
-                if valid_sentence:
-                    self.clean_sentences += 1  # Increment clean sentences received
-                    self.sentence_active = False  # Clear Active Processing Flag
+        return None
 
-                    if self.gps_segments[0] in self.supported_sentences:
+    def _dispatch(self, sentence_type):
+        """Run the sentence parser for a clean sentence, timing it and counting it by type. Returns True if the
+        sentence was supported and parsed cleanly"""
+        sentence_parser = self.supported_sentences.get(sentence_type)
+        if sentence_parser is None:
+            return False
 
-                        # parse the Sentence Based on the message type, return True if parse is clean
-                        if self.supported_sentences[self.gps_segments[0]](self):
+        start = _ticks_us()
+        parsed = sentence_parser(self)
+        elapsed = _ticks_diff(_ticks_us(), start)
+
+        self.parse_count += 1
+        self.parse_us_total += elapsed
+        if elapsed > self.parse_us_max:
+            self.parse_us_max = elapsed
+
+        if parsed:
+            self.parsed_sentences += 1
+            self.sentence_counts[sentence_type] = self.sentence_counts.get(sentence_type, 0) + 1
+        return parsed
+
+    def _feed(self, buf, parsed):
+        """Byte oriented state machine shared by update(), update_bytes() and update_buffer(). Every int in buf is
+        processed as one received char. Parsed sentence types are appended to parsed (if not None) and the last
+        sentence type parsed is returned, None otherwise"""
+
+        last_parsed = None
+
+        # Hold the parser state in locals while the buffer is consumed
+        sentence = self._sentence
+        field_starts = self._field_starts
+        sentence_limit = self.SENTENCE_LIMIT
+        sentence_active = self.sentence_active
+        process_crc = self.process_crc
+        crc_xor = self.crc_xor
+        char_count = self.char_count
+        field_count = self._field_count
+        sentence_filter = self._sentence_filter
+        skipping = self._skipping
+        skipped_bytes = 0
 
-                            # Let host know that the GPS object was updated by returning parsed sentence type
-                            self.parsed_sentences += 1
-                            return self.gps_segments[0]
+        try:
+            for ascii_char in buf:
+
+                # Validate new char is a printable char
+                if ascii_char < 10 or ascii_char > 126:
+                    continue
+
+                # Check if a new string is starting ($)
+                if ascii_char == 36:
+                    field_starts[0] = 0
+                    field_count = 1
+                    crc_xor = 0
+                    sentence_active = True
+                    process_crc = True
+                    char_count = 0
+                    skipping = False
+                    continue
+
+                if not sentence_active:
+                    # Count what the sentence filter saved until the next sentence starts
+                    if skipping:
+                        skipped_bytes += 1
+                    continue
+
+                # Check that the sentence buffer isn't filling up with Garbage waiting for the sentence to complete
+                if char_count == sentence_limit:
+                    sentence_active = False
+                    continue
+
+                # Store every char of the sentence, separators included
+                sentence[char_count] = ascii_char
+                char_count += 1
 
-                # Check that the sentence buffer isn't filling up with Garage waiting for the sentence to complete
-                if self.char_count > self.SENTENCE_LIMIT:
-                    self.sentence_active = False
+                # Check if sentence is ending (*)
+                if ascii_char == 42:
+                    process_crc = False
+                    field_starts[field_count] = char_count
+                    field_count += 1
+                    continue
+
+                # Check if a section is ended (,), the next field starts after it
+                if ascii_char == 44:
+                    field_starts[field_count] = char_count
+                    field_count += 1
+
+                    # Sentence type is known once the first field ends, drop it here if not subscribed
+                    if field_count == 2 and sentence_filter is not None:
+                        if char_count != 6 or _type_code(sentence[2], sentence[3], sentence[4]) not in sentence_filter:
+                            sentence_active = False
+                            skipping = True
+                            skipped_bytes += char_count + 1  # Include the '$'
+                            self.skipped_sentences += 1
+                            continue
+
+                # When CRC input is disabled, sentence is complete once both CRC digits are in
+                elif not process_crc and char_count - field_starts[field_count - 1] == 2:
+                    crc_high = _hex_digit(sentence[char_count - 2])
+                    crc_low = _hex_digit(sentence[char_count - 1])
+
+                    if crc_high < 0 or crc_low < 0:
+                        continue  # CRC Value was deformed and could not have been correct
+
+                    if crc_xor == (crc_high << 4) | crc_low:
+                        self.clean_sentences += 1  # Increment clean sentences received
+                        sentence_active = False  # Clear Active Processing Flag
+
+                        # Publish the accumulator state so the sentence parser can read the fields
+                        self.char_count = char_count
+                        self._field_count = field_count
+                        self.gps_segments = self._segments
+
+                        # Write sentence to log file if enabled
+                        if self.log_en and self.log_format == 'nmea':
+                            self._log_sentence()
+
+                        # If it's a supported sentence, then parse it!!
+                        sentence_type = self.gps_segments[0]
+                        if self._dispatch(sentence_type):
+                            # Let host know that the GPS object was updated
+                            last_parsed = sentence_type
+                            if parsed is not None:
+                                parsed.append(sentence_type)
+                    else:
+                        self.crc_fails += 1
+                    continue
 
-        # Tell Host no new sentence was parsed
-        return None
+                # Update CRC
+                if process_crc:
+                    crc_xor ^= ascii_char
+
+        finally:
+            self.sentence_active = sentence_active
+            self.process_crc = process_crc
+            self.crc_xor = crc_xor
+            self.char_count = char_count
+            self._field_count = field_count
+            self.active_segment = field_count - 1
+            self._skipping = skipping
+            self.skipped_bytes += skipped_bytes
+            self.bytes_processed += len(buf)
+
+        # Tell Host which sentence was parsed last
+        return last_parsed
 
     def new_fix_time(self):
         """Updates a high resolution counter with current time when fix is updated. Currently only triggered from
@@ -639,6 +955,17 @@ class MicropyGPS(object):
         except NameError:
             self.fix_time = time.time()
 
+        if not self.has_fix:
+            self.has_fix = True
+            if self.first_fix_ms < 0:
+                self.first_fix_ms = _ticks_diff(_ticks_ms(), self.boot_ticks)
+
+    def lost_fix(self):
+        """Counts a fix loss event when a sentence reports no fix after a good one"""
+        if self.has_fix:
+            self.has_fix = False
+            self.fix_losses += 1
+
     #########################################
     # User Helper Functions
     # These functions make working with the GPS object data easier
@@ -684,6 +1011,21 @@ class MicropyGPS(object):
 
         return current
 
+    def stats(self):
+        """
+        Snapshot of the parser performance counters, cheap enough to poll in production
+        :return: dict
+        """
+        checked = self.clean_sentences + self.crc_fails
+        return {'first_fix_ms': self.first_fix_ms,
+                'fix_losses': self.fix_losses,
+                'sentence_counts': dict(self.sentence_counts),
+                'crc_fail_rate': self.crc_fails / checked if checked else 0.0,
+                'parse_us_avg': self.parse_us_total // self.parse_count if self.parse_count else 0,
+                'parse_us_max': self.parse_us_max,
+                'bytes_processed': self.bytes_processed,
+                'skipped_bytes': self.skipped_bytes}
+
     def compass_direction(self):
         """
         Determine a cardinal or inter-cardinal direction based on current course.
@@ -826,5 +1168,77 @@ class MicropyGPS(object):
                            'GNGSA': gpgsa,
                           }
 
+
+# Days before the first of each month in a non leap year
+_CUMULATIVE_DAYS = (0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334)
+
+
+def _ddm_to_e7(ddm_string, deg_digits):
+    """Convert a NMEA ddmm.mmmm (deg_digits=2) or dddmm.mmmm (deg_digits=3) string to unsigned 1e-7 degrees using
+    integer math only. Intermediate values fit a MicroPython small int; results past 107 degrees longitude do not"""
+    point = ddm_string.find('.')
+    if point < 0:
+        point = len(ddm_string)
+
+    degrees = int(ddm_string[0:deg_digits])
+    minutes_e7 = int(ddm_string[deg_digits:point]) * 10000000
+
+    # Up to 7 decimal places of minutes are significant
+    fraction = ddm_string[point + 1:point + 8]
+    if fraction:
+        minutes_e7 += int(fraction) * 10 ** (7 - len(fraction))
+
+    return degrees * 10000000 + (minutes_e7 + 30) // 60
+
+
+def _days_since_2000(day, month, year):
+    """Days from 2000-01-01 to a day, month, two digit year date (years 2000 - 2099)"""
+    days = year * 365 + (year + 3) // 4 + _CUMULATIVE_DAYS[month - 1] + day - 1
+    if month > 2 and year % 4 == 0:
+        days += 1
+    return days
+
+
+def _type_code(char_0, char_1, char_2):
+    """Pack the three char codes of a sentence type (e.g. 'RMC') into a single int"""
+    return (char_0 << 16) | (char_1 << 8) | char_2
+
+
+def _hex_digit(ascii_char):
+    """Value of a single hex digit char code, -1 if it is not one"""
+    if 48 <= ascii_char <= 57:
+        return ascii_char - 48
+    ascii_char |= 0x20  # Fold to lower case
+    if 97 <= ascii_char <= 102:
+        return ascii_char - 87
+    return -1
+
+
+class _Segments(object):
+    """Read only view of the fields of the sentence held in a MicropyGPS accumulator. Indexing returns the field as
+    a string, which is only created when a sentence parser actually reads it"""
+
+    def __init__(self, gps):
+        self._gps = gps
+
+    def __len__(self):
+        return self._gps._field_count
+
+    def __getitem__(self, index):
+        gps = self._gps
+        field_count = gps._field_count
+        if index < 0:
+            index += field_count
+        if index < 0 or index >= field_count:
+            raise IndexError('segment index out of range')
+
+        start = gps._field_starts[index]
+        if index + 1 < field_count:
+            end = gps._field_starts[index + 1] - 1  # Drop the ',' or '*' separator
+        else:
+            end = gps.char_count
+        return str(gps._sentence[start:end], 'ascii')
+
+
 if __name__ == "__main__":
     pass
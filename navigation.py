@@ -0,0 +1,211 @@
+"""
+navigation.py
+Distance and bearing from the current position to a table of fixed
+targets. Each target's trig is computed once when the table is loaded,
+the current position's once per fix
+
+Short hops use a flat earth (equirectangular) projection around the
+current latitude, no trig at all, and fall back to haversine beyond the
+distance where the projection error would exceed the Position's tolerance
+
+Positions are kept as integer 1e-7 degrees (MicropyGPS fixed_point) and
+every latitude/longitude difference is taken on the integers before it
+becomes a float. A float32 holds 42.04 degrees to about 0.4 m, so
+subtracting two float degrees leaves metre sized noise in a tens of
+metres hop, while the integer difference is exact
+"""
+from math import asin, atan2, cos, degrees, pi, sin, sqrt
+
+# radius of Earth in metres
+R = 6371000
+
+# 1e-7 degrees to radians
+E7_TO_RAD = pi / 1800000000
+
+# metres per 1e-7 degree of latitude
+M_PER_E7 = R * E7_TO_RAD
+
+
+def to_e7(value):
+    """
+    Signed decimal degrees to integer 1e-7 degrees
+      value - a number, or a string such as "-86.435835" which is
+              converted exactly, without passing through a float
+    """
+    if not isinstance(value, str):
+        return int(round(value * 10000000))
+
+    value = value.strip()
+    sign = 1
+    if value[0] in '+-':
+        if value[0] == '-':
+            sign = -1
+        value = value[1:]
+
+    point = value.find('.')
+    if point < 0:
+        return sign * int(value) * 10000000
+
+    fraction = value[point + 1:point + 8]
+    e7 = int(value[:point] or '0') * 10000000
+    if fraction:
+        e7 += int(fraction) * 10 ** (7 - len(fraction))
+    return sign * e7
+
+
+class Target():
+    def __init__(self, code, lat, lon):
+        """
+        code     - code the player enters to select the target
+        lat, lon - signed decimal degrees, numbers or strings (see to_e7)
+        """
+        self.code = code
+        self.lat_e7 = to_e7(lat)
+        self.lon_e7 = to_e7(lon)
+        self.lat = self.lat_e7 / 10000000
+        self.lon = self.lon_e7 / 10000000
+        self.sin_lat = sin(self.lat_e7 * E7_TO_RAD)
+        self.cos_lat = cos(self.lat_e7 * E7_TO_RAD)
+
+
+class TargetTable():
+    def __init__(self, targets):
+        """
+        targets - dict of code: (lat, lon) as kept in boot_quadcorder.py
+        """
+        self.targets = {}
+        for code in targets:
+            lat, lon = targets[code]
+            self.targets[code] = Target(code, lat, lon)
+
+    def __contains__(self, code):
+        return code in self.targets
+
+    def __len__(self):
+        return len(self.targets)
+
+    def get(self, code):
+        """
+        Target for a code, None if there is no such target
+        """
+        return self.targets.get(code)
+
+    def navigate(self, pos):
+        """
+        Yield (target, distance in metres, bearing in degrees) for every
+        target, reusing the trig of pos
+        """
+        # without a flat limit every target goes straight to haversine
+        distance_to = fast_distance_bearing if pos.flat_limit2 else distance_bearing
+        for target in self.targets.values():
+            distance, bearing = distance_to(pos, target)
+            yield target, distance, bearing
+
+
+class Position():
+    def __init__(self, lat=0.0, lon=0.0, tolerance=None):
+        """
+        Current position with its trig computed once, update it in
+        place with set() or set_e7() on every fix
+          tolerance - metres of distance error allowed from the flat
+                      earth projection, None always uses haversine
+        """
+        self.tolerance = tolerance
+        self.set(lat, lon)
+
+    def set(self, lat, lon):
+        """
+        Move to signed decimal degrees, numbers or strings (see to_e7)
+        """
+        self.set_e7(to_e7(lat), to_e7(lon))
+
+    def set_e7(self, lat_e7, lon_e7):
+        """
+        Move to integer 1e-7 degrees, e.g. MicropyGPS latitude_e7 and
+        longitude_e7 with the hemisphere sign applied
+        """
+        self.lat_e7 = lat_e7
+        self.lon_e7 = lon_e7
+        self.lat = lat_e7 / 10000000
+        self.lon = lon_e7 / 10000000
+        self.sin_lat = sin(lat_e7 * E7_TO_RAD)
+        self.cos_lat = cos(lat_e7 * E7_TO_RAD)
+
+        # squared distance up to which the flat projection is used
+        if self.tolerance is None:
+            self.flat_limit2 = 0.0
+        else:
+            self.flat_limit2 = flat_limit(self.tolerance, self.cos_lat) ** 2
+
+
+def distance_bearing(pos, target):
+    """
+    Great circle distance (metres) and initial bearing (degrees) from pos
+    to target, both Position or Target objects
+      haversine and bearing share sin/cos of the half angle differences,
+      so a target costs three sin/cos, one asin, one atan2 and two sqrt
+    """
+    half_dlat = (target.lat_e7 - pos.lat_e7) * E7_TO_RAD / 2
+    half_dlon = (target.lon_e7 - pos.lon_e7) * E7_TO_RAD / 2
+
+    sin_half_dlat = sin(half_dlat)
+    sin_half_dlon = sin(half_dlon)
+    cos_half_dlon = cos(half_dlon)
+    hav_dlon = sin_half_dlon * sin_half_dlon
+    target_cos_lat = target.cos_lat
+
+    # haversine formula, asin(sqrt(a)) is atan2(sqrt(a), sqrt(1 - a))
+    # with one sqrt less, and as accurate for anything short of the
+    # antipode
+    a = sin_half_dlat * sin_half_dlat + pos.cos_lat * target_cos_lat * hav_dlon
+    distance = 2 * R * asin(sqrt(a))
+
+    # the usual y = cos(lat1) sin(lat2) - sin(lat1) cos(lat2) cos(dlon)
+    # subtracts two nearly equal products, rewritten as
+    # y = sin(dlat) + sin(lat1) cos(lat2) (1 - cos(dlon)) it only adds
+    # small terms, all from the half angles
+    sin_dlat = 2 * sin_half_dlat * sqrt(1 - sin_half_dlat * sin_half_dlat)
+    x = target_cos_lat * 2 * sin_half_dlon * cos_half_dlon
+    y = sin_dlat + pos.sin_lat * target_cos_lat * 2 * hav_dlon
+    bearing = (degrees(atan2(x, y)) + 360) % 360
+
+    return distance, bearing
+
+
+def flat_limit(tolerance, cos_lat):
+    """
+    Distance (metres) up to which the flat projection stays within
+    tolerance metres of haversine at a latitude with cosine cos_lat
+      the error grows as d**3, err <= d**3 / (16 * R**2 * cos_lat**2)
+      check_navigation.py checks the bound
+    """
+    return (16 * R * R * tolerance * cos_lat * cos_lat) ** (1 / 3)
+
+
+def flat_distance_bearing(pos, target):
+    """
+    Equirectangular distance (metres) and bearing (degrees) from pos to
+    target, projected around their mean latitude
+      cos of the mean latitude comes from pos's sin/cos by a short series
+      in half the latitude difference, so no trig is needed
+    """
+    dlat = (target.lat_e7 - pos.lat_e7) * E7_TO_RAD
+    h = dlat / 2
+    cos_mid = pos.cos_lat * (1 - h * h / 2) - pos.sin_lat * h
+
+    x = R * (target.lon_e7 - pos.lon_e7) * E7_TO_RAD * cos_mid
+    y = R * dlat
+    bearing = (degrees(atan2(x, y)) + 360) % 360
+
+    return sqrt(x * x + y * y), bearing
+
+
+def fast_distance_bearing(pos, target):
+    """
+    Flat projection within pos's flat limit, haversine beyond it
+    """
+    if pos.flat_limit2:
+        distance, bearing = flat_distance_bearing(pos, target)
+        if distance * distance <= pos.flat_limit2:
+            return distance, bearing
+    return distance_bearing(pos, target)
@@ -0,0 +1,89 @@
+"""
+nmea_capture.py
+Fixed size ring buffer holding the last N raw NMEA sentences for
+debugging, dump it over the REPL or BLE
+"""
+
+
+class NMEACapture():
+    def __init__(self, count=16, size=82):
+        """
+        count - number of sentences kept
+        size  - bytes kept per sentence, NMEA allows 82 including CR LF.
+                longer sentences are truncated
+        """
+        self.count = count
+        self.size = size
+        self.data = bytearray(count * size)
+        self.lengths = bytearray(count)
+        self.mv = memoryview(self.data)
+        self.head = count - 1
+        self.captured = 0
+
+    def next_slot(self):
+        """
+        Start a new sentence, overwriting the oldest one
+        """
+        self.head = (self.head + 1) % self.count
+        self.lengths[self.head] = 0
+        self.captured += 1
+
+    def append(self, src, start, end):
+        """
+        Copy src[start:end] onto the end of the current sentence
+        """
+        used = self.lengths[self.head]
+        n = min(end - start, self.size - used)
+        if n > 0:
+            slot = self.head * self.size + used
+            self.mv[slot:slot + n] = src[start:start + n]
+            self.lengths[self.head] = used + n
+
+    def feed(self, buf, nbytes):
+        """
+        Capture the first nbytes of buf, as read from the uart
+          sentences are split on '$' and may span several calls
+          data before the first '$' ever seen is dropped
+        """
+        src = memoryview(buf)
+        i = 0
+        while i < nbytes:
+            if buf[i] == 36:  # '$'
+                self.next_slot()
+            end = buf.find(b'$', i + 1, nbytes)
+            if end < 0:
+                end = nbytes
+            if self.captured:
+                self.append(src, i, end)
+            i = end
+
+    def clear(self):
+        for i in range(self.count):
+            self.lengths[i] = 0
+        self.head = self.count - 1
+        self.captured = 0
+
+    def sentences(self):
+        """
+        Yield the captured sentences oldest first as memoryviews into
+        the ring, copy them if they must outlive the next feed()
+        """
+        kept = min(self.captured, self.count)
+        for i in range(kept):
+            slot = (self.head - kept + 1 + i) % self.count
+            start = slot * self.size
+            yield self.mv[start:start + self.lengths[slot]]
+
+    def dump(self, write=None):
+        """
+        Send every captured sentence, oldest first, to write()
+          e.g. a BLE characteristic write. prints to the REPL by default
+        """
+        for sentence in self.sentences():
+            if write is None:
+                try:
+                    print(str(bytes(sentence), 'ascii').rstrip())
+                except UnicodeError:
+                    print(bytes(sentence))
+            else:
+                write(sentence)
@@ -0,0 +1,58 @@
+"""
+oled_background.py
+The static parts of an oled screen, drawn once and kept as a whole
+background frame that is copied back into the display buffer every frame
+
+  background = Background(display)
+  each frame:
+    if background.stale(key):
+        display.fill(0)
+        draw what only changes with key
+        background.capture(display, key)
+    else:
+        background.restore(display)
+    draw what changes
+
+restore() is one memory copy of the display buffer, 1 kB for a 128x64
+panel, and replaces fill(0) too
+"""
+
+
+class Background():
+    def __init__(self, display):
+        """
+        display - an SSD1306 or anything else with its frame in .buffer
+        """
+        self.buffer = bytearray(len(display.buffer))
+        self.key = None
+
+        # Statistics
+        self.captures = 0
+        self.restores = 0
+
+    def stale(self, key):
+        """
+        True if the background was captured for something other than key
+        """
+        return self.key is None or key != self.key
+
+    def capture(self, display, key):
+        """
+        Keep the display's frame as the background for key
+        """
+        self.buffer[:] = display.buffer
+        self.key = key
+        self.captures += 1
+
+    def restore(self, display):
+        """
+        Start the display's frame from the background
+        """
+        display.buffer[:] = self.buffer
+        self.restores += 1
+
+    def invalidate(self):
+        """
+        Make the next stale() True
+        """
+        self.key = None
@@ -0,0 +1,17 @@
+"""
+quadcorder_targets.py
+The Quadcorder's GPS targets, code: (lat, lon) in signed decimal degrees
+shared by boot_quadcorder.py and the host benches and checks
+
+Coordinates are strings: they reach navigation's 1e-7 degree integers
+exactly, a float32 literal would already be off by up to half a metre
+"""
+
+targets = {"0000#CCCC": ("42.040545", "-86.435835"), # Home
+           "A08D#6CDD": ("42.039323", "-86.435976"), # Substation
+           "CB69#A409": ("42.044174", "-86.446875"), # EP Clark Elementary
+           "D694#734A": ("42.048659", "-86.473342"), # Upton Middle School
+           "B2A5#55BD": ("42.013209", "-86.492442"), # Lakeshore High School
+           "60C3#6748": ("42.094203", "-86.391581"), # Lake Michigan College
+           "5DC3#154D": ("42.015690", "-86.504157")  # Lincoln Twp Library
+}
@@ -3,6 +3,18 @@
 from micropython import const
 import framebuf
 
+# Import utime or time for the flush time budget
+try:
+    from utime import ticks_diff, ticks_us
+except ImportError:
+    import time
+
+    def ticks_us():
+        return time.perf_counter_ns() // 1000
+
+    def ticks_diff(ticks1, ticks2):
+        return ticks1 - ticks2
+
 
 # register definitions
 SET_CONTRAST = const(0x81)
@@ -23,8 +35,20 @@ SET_PRECHARGE = const(0xD9)
 SET_VCOM_DESEL = const(0xDB)
 SET_CHARGE_PUMP = const(0x8D)
 
+
 # Subclassing FrameBuffer provides support for graphics primitives
 # http://docs.micropython.org/en/latest/pyboard/library/framebuf.html
+#
+# show() only sends what changed since the last show(): the buffer is
+# compared against a shadow copy of the panel's RAM, page by page, and
+# each changed page is sent as the column window spanning its changes.
+# a window is only widened to cover a neighbouring page when that sends
+# fewer bytes, counted with what the interface adds to each command and
+# data write: cmd_bytes and data_prefix, set by the subclass
+#
+# begin_flush() sends the same windows without blocking, one page per
+# transfer from poll() or flush_async(), so a main loop can keep serving
+# events between pages
 class SSD1306(framebuf.FrameBuffer):
     def __init__(self, width, height, external_vcc):
         self.width = width
@@ -32,6 +56,27 @@ class SSD1306(framebuf.FrameBuffer):
         self.external_vcc = external_vcc
         self.pages = self.height // 8
         self.buffer = bytearray(self.pages * self.width)
+        self.shadow = bytearray(self.pages * self.width)
+        self.buffer_mv = memoryview(self.buffer)
+        self.shadow_mv = memoryview(self.shadow)
+        self.synced = False
+        self.col_offset = 32 if self.width == 64 else 0
+        # the six commands of set_window()
+        self.window_cost = 6 * self.cmd_bytes
+
+        # Statistics, bytes written to the bus by write_cmd() and
+        # write_data(), I2C address bytes not counted
+        self.shows = 0
+        self.bytes_sent = 0
+        self.bytes_total = 0
+        self.windows = 0
+
+        # chunked flush in flight, windows still to send and the next
+        # page of the first one, -1 before its address commands
+        self.flush_windows = []
+        self.flush_page = -1
+        self.flush_bytes = 0
+
         super().__init__(self.buffer, self.width, self.height, framebuf.MONO_VLSB)
         self.init_display()
 
@@ -70,7 +115,7 @@ class SSD1306(framebuf.FrameBuffer):
         ):  # on
             self.write_cmd(cmd)
         self.fill(0)
-        self.show()
+        self.show(full=True)
 
     def poweroff(self):
         self.write_cmd(SET_DISP | 0x00)
@@ -85,20 +130,207 @@ class SSD1306(framebuf.FrameBuffer):
     def invert(self, invert):
         self.write_cmd(SET_NORM_INV | (invert & 1))
 
-    def show(self):
-        x0 = 0
-        x1 = self.width - 1
-        if self.width == 64:
-            # displays with width of 64 pixels are shifted by 32
-            x0 += 32
-            x1 += 32
+    def show(self, full=False):
+        """
+        Send the changed parts of the buffer to the panel, or all of it if
+        full or the panel's RAM is unknown. a chunked flush in flight is
+        dropped, this sends everything it would have
+          returns the number of bytes sent
+        """
+        self.flush_windows = []
+        if full or not self.synced:
+            sent = self.write_window(0, self.width - 1, 0, self.pages - 1)
+            self.synced = True
+        else:
+            sent = 0
+            for window in self.dirty_windows():
+                sent += self.write_window(*window)
+
+        self.shows += 1
+        self.bytes_sent = sent
+        self.bytes_total += sent
+        return sent
+
+    def begin_flush(self, full=False):
+        """
+        Start sending the frame as show() would, a page per transfer from
+        poll(). the buffer can still be drawn on, each page is sent as it
+        is when its turn comes
+          returns the number of windows queued
+        """
+        if full or not self.synced:
+            self.flush_windows = [(0, self.width - 1, 0, self.pages - 1)]
+        else:
+            self.flush_windows = self.dirty_windows()
+        self.flush_page = -1
+        self.flush_bytes = 0
+        if not self.flush_windows:
+            self.shows += 1
+            self.bytes_sent = 0
+        return len(self.flush_windows)
+
+    def flushing(self):
+        """
+        True while a frame from begin_flush() is still in flight
+        """
+        return len(self.flush_windows) > 0
+
+    def poll(self, budget_us=2000):
+        """
+        Send pages of the frame in flight until budget_us has passed, at
+        least one page per call
+          returns True while there is more to send
+        """
+        windows = self.flush_windows
+        if not windows:
+            return False
+
+        start = ticks_us()
+        while windows:
+            col0, col1, page0, page1 = windows[0]
+            if self.flush_page < 0:
+                self.set_window(col0, col1, page0, page1)
+                self.flush_page = page0
+                self.flush_bytes += self.window_cost
+
+            self.write_page(col0, col1, self.flush_page)
+            self.flush_bytes += self.data_prefix + col1 - col0 + 1
+
+            if self.flush_page < page1:
+                self.flush_page += 1
+            else:
+                windows.pop(0)
+                self.flush_page = -1
+                self.windows += 1
+            if ticks_diff(ticks_us(), start) >= budget_us:
+                break
+
+        if windows:
+            return True
+
+        self.synced = True
+        self.shows += 1
+        self.bytes_sent = self.flush_bytes
+        self.bytes_total += self.flush_bytes
+        return False
+
+    async def flush_async(self, full=False, budget_us=2000):
+        """
+        begin_flush() and poll() until it is sent, yielding to other tasks
+        between pages
+        """
+        # imported here so drivers that never flush this way don't load it
+        try:
+            import uasyncio as asyncio
+        except ImportError:
+            import asyncio
+
+        self.begin_flush(full)
+        while self.poll(budget_us):
+            await asyncio.sleep(0)
+
+    def dirty_windows(self):
+        """
+        (col0, col1, page0, page1) windows covering every byte that
+        differs from the shadow, one per changed page or run of pages
+        """
+        windows = []
+        width = self.width
+        prefix = self.data_prefix
+        buf = self.buffer_mv
+        shadow = self.shadow_mv
+        current = None
+        for page in range(self.pages):
+            start = page * width
+            end = start + width
+            if buf[start:end] == shadow[start:end]:
+                continue
+
+            # first changed column, longest matching prefix by bisection
+            lo = 0
+            hi = width - 1
+            while lo < hi:
+                mid = (lo + hi + 1) >> 1
+                if buf[start:start + mid] == shadow[start:start + mid]:
+                    lo = mid
+                else:
+                    hi = mid - 1
+            col0 = lo
+
+            # last changed column, longest matching suffix
+            lo = 0
+            hi = width - 1 - col0
+            while lo < hi:
+                mid = (lo + hi + 1) >> 1
+                if buf[end - mid:end] == shadow[end - mid:end]:
+                    lo = mid
+                else:
+                    hi = mid - 1
+            col1 = width - 1 - lo
+
+            if current is not None and current[3] == page - 1:
+                # one window over both if that is cheaper than two, each
+                # page is a data write of its own
+                c0 = min(current[0], col0)
+                c1 = max(current[1], col1)
+                merged = (prefix + c1 - c0 + 1) * (page - current[2] + 1)
+                separate = ((prefix + current[1] - current[0] + 1) * (page - current[2]) +
+                            self.window_cost + prefix + col1 - col0 + 1)
+                if merged <= separate:
+                    current = (c0, c1, current[2], page)
+                    continue
+            if current is not None:
+                windows.append(current)
+            current = (col0, col1, page, page)
+
+        if current is not None:
+            windows.append(current)
+        return windows
+
+    def set_window(self, col0, col1, page0, page1):
+        """
+        Point the panel's RAM address at columns col0 - col1 of pages
+        page0 - page1, data then fills it a page at a time
+        """
         self.write_cmd(SET_COL_ADDR)
-        self.write_cmd(x0)
-        self.write_cmd(x1)
+        self.write_cmd(col0 + self.col_offset)
+        self.write_cmd(col1 + self.col_offset)
         self.write_cmd(SET_PAGE_ADDR)
-        self.write_cmd(0)
-        self.write_cmd(self.pages - 1)
-        self.write_data(self.buffer)
+        self.write_cmd(page0)
+        self.write_cmd(page1)
+
+    def write_page(self, col0, col1, page):
+        """
+        Send columns col0 - col1 of one page and copy them to the shadow
+        """
+        start = page * self.width
+        self.write_data(self.buffer_mv[start + col0:start + col1 + 1])
+        self.shadow_mv[start + col0:start + col1 + 1] = self.buffer_mv[start + col0:start + col1 + 1]
+
+    def write_window(self, col0, col1, page0, page1):
+        """
+        Send columns col0 - col1 of pages page0 - page1 and copy them to
+        the shadow
+          returns the number of bytes sent
+        """
+        self.set_window(col0, col1, page0, page1)
+
+        width = self.width
+        if col0 == 0 and col1 == width - 1:
+            # whole pages are contiguous in the buffer
+            start = page0 * width
+            end = (page1 + 1) * width
+            self.write_data(self.buffer_mv[start:end])
+            self.shadow_mv[start:end] = self.buffer_mv[start:end]
+            writes = 1
+        else:
+            # the panel's column pointer wraps to the next page at col1
+            for page in range(page0, page1 + 1):
+                self.write_page(col0, col1, page)
+            writes = page1 - page0 + 1
+
+        self.windows += 1
+        return self.window_cost + self.data_prefix * writes + (col1 - col0 + 1) * (page1 - page0 + 1)
 
 
 class SSD1306_I2C(SSD1306):
@@ -107,6 +339,9 @@ class SSD1306_I2C(SSD1306):
         self.addr = addr
         self.temp = bytearray(2)
         self.write_list = [b"\x40", None]  # Co=0, D/C#=1
+        # a control byte goes before every command and data write
+        self.cmd_bytes = 2
+        self.data_prefix = 1
         super().__init__(width, height, external_vcc)
 
     def write_cmd(self, cmd):
@@ -136,6 +371,9 @@ class SSD1306_SPI(SSD1306):
         self.res(0)
         time.sleep_ms(10)
         self.res(1)
+        # D/C# is a pin, commands and data go as they are
+        self.cmd_bytes = 1
+        self.data_prefix = 0
         super().__init__(width, height, external_vcc)
 
     def write_cmd(self, cmd):
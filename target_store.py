@@ -0,0 +1,161 @@
+"""
+target_store.py
+Target table with a grid index over lat/lon for hunts with hundreds or
+thousands of waypoints. Nearest k and within R metres queries only look
+at the grid cells around the current position instead of every target
+
+  store = TargetStore(targets, cell_m=250)
+  here = Position(tolerance=1.0)
+  here.set_e7(gps.latitude_e7, gps.longitude_e7)
+  for target, distance, bearing in store.nearest(here, 3):
+      ...
+"""
+from math import cos
+
+from navigation import E7_TO_RAD, fast_distance_bearing, M_PER_E7, TargetTable
+
+
+class TargetStore(TargetTable):
+    def __init__(self, targets, cell_m=250):
+        """
+        targets - dict of code: (lat, lon) as for TargetTable
+        cell_m  - grid cell size in metres, around the typical query
+                  radius. cells are square at the targets' mean latitude
+        """
+        TargetTable.__init__(self, targets)
+        self.cell_m = cell_m
+        self.cells = {}
+
+        if not self.targets:
+            self.rows = self.cols = 0
+            return
+
+        lats = [t.lat_e7 for t in self.targets.values()]
+        lons = [t.lon_e7 for t in self.targets.values()]
+        mid_lat = (min(lats) + max(lats)) // 2
+
+        self.cell_lat = max(1, int(cell_m / M_PER_E7))
+        self.cell_lon = max(1, int(cell_m / (M_PER_E7 * cos(mid_lat * E7_TO_RAD))))
+        self.lat0 = min(lats)
+        self.lon0 = min(lons)
+        self.rows = (max(lats) - self.lat0) // self.cell_lat + 1
+        self.cols = (max(lons) - self.lon0) // self.cell_lon + 1
+
+        # cell key is row * cols + col, an int so lookups don't allocate
+        cells = self.cells
+        for target in self.targets.values():
+            key = self.row(target.lat_e7) * self.cols + self.col(target.lon_e7)
+            bucket = cells.get(key)
+            if bucket is None:
+                cells[key] = [target]
+            else:
+                bucket.append(target)
+
+    def row(self, lat_e7):
+        return (lat_e7 - self.lat0) // self.cell_lat
+
+    def col(self, lon_e7):
+        return (lon_e7 - self.lon0) // self.cell_lon
+
+    def _collect(self, pos, row_min, row_max, col_min, col_max, found):
+        """
+        Append (distance, bearing, target) for every target in the cells
+        of the block, clipped to the grid
+        """
+        if row_min < 0:
+            row_min = 0
+        if col_min < 0:
+            col_min = 0
+        if row_max >= self.rows:
+            row_max = self.rows - 1
+        if col_max >= self.cols:
+            col_max = self.cols - 1
+
+        cells = self.cells
+        cols = self.cols
+        for row in range(row_min, row_max + 1):
+            for col in range(col_min, col_max + 1):
+                bucket = cells.get(row * cols + col)
+                if bucket is not None:
+                    for target in bucket:
+                        distance, bearing = fast_distance_bearing(pos, target)
+                        found.append((distance, bearing, target))
+
+    def within(self, pos, radius):
+        """
+        Targets within radius metres of pos, nearest first, as
+        (target, distance, bearing)
+        """
+        if not self.cells:
+            return []
+
+        # a degree of longitude is shortest at the box's poleward edge,
+        # where the circle reaches furthest in longitude
+        dlat = int(radius / M_PER_E7) + 1
+        dlon = int(radius / (M_PER_E7 * _cos_poleward(pos.lat_e7, dlat))) + 1
+
+        found = []
+        self._collect(pos, self.row(pos.lat_e7 - dlat), self.row(pos.lat_e7 + dlat),
+                      self.col(pos.lon_e7 - dlon), self.col(pos.lon_e7 + dlon), found)
+        found.sort(key=_distance)
+        return [(t, d, b) for d, b, t in found if d <= radius]
+
+    def nearest(self, pos, k=1):
+        """
+        The k targets nearest pos, nearest first, as
+        (target, distance, bearing)
+          searches rings of cells outward from pos's cell and stops once
+          the k-th nearest found is closer than any unsearched cell
+        """
+        if not self.cells:
+            return []
+
+        row = self.row(pos.lat_e7)
+        col = self.col(pos.lon_e7)
+
+        # smallest cell side in metres at pos, an unsearched cell beyond
+        # ring r is at least r of these away. cells narrow toward the
+        # pole, so the width is taken at the ring's poleward edge
+        height = self.cell_lat * M_PER_E7
+
+        # rings needed to cover the whole grid from pos's cell
+        last = max(row, self.rows - 1 - row, col, self.cols - 1 - col)
+
+        # rings inside this one miss the grid, e.g. pos far outside it
+        ring = max(0, -row, row - self.rows + 1, -col, col - self.cols + 1)
+
+        found = []
+        while True:
+            if ring == 0:
+                self._collect(pos, row, row, col, col, found)
+            else:
+                # top and bottom rows of the ring, then the sides between
+                self._collect(pos, row - ring, row - ring, col - ring, col + ring, found)
+                self._collect(pos, row + ring, row + ring, col - ring, col + ring, found)
+                self._collect(pos, row - ring + 1, row + ring - 1, col - ring, col - ring, found)
+                self._collect(pos, row - ring + 1, row + ring - 1, col + ring, col + ring, found)
+
+            if ring >= last or len(found) == len(self.targets):
+                break
+            if len(found) >= k:
+                found.sort(key=_distance)
+                side = min(height, self.cell_lon * M_PER_E7 *
+                           _cos_poleward(pos.lat_e7, (ring + 1) * self.cell_lat))
+                if found[k - 1][0] <= ring * side:
+                    break
+            ring += 1
+
+        found.sort(key=_distance)
+        return [(t, d, b) for d, b, t in found[:k]]
+
+
+def _distance(item):
+    return item[0]
+
+
+def _cos_poleward(lat_e7, dlat):
+    """
+    cos of the latitude dlat 1e-7 degrees poleward of lat_e7, short of
+    the pole
+    """
+    return cos(min(abs(lat_e7) + dlat, 899999999) * E7_TO_RAD)
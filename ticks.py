@@ -0,0 +1,20 @@
+"""
+ticks.py
+utime's millisecond ticks for the Quadcorder modules, with stand-ins
+from time when they run under CPython for the host benches
+
+  from ticks import sleep_ms, ticks_diff, ticks_ms
+"""
+try:
+    from utime import sleep_ms, ticks_diff, ticks_ms
+except ImportError:
+    import time
+
+    def sleep_ms(ms):
+        time.sleep(ms / 1000)
+
+    def ticks_ms():
+        return time.perf_counter_ns() // 1000000
+
+    def ticks_diff(ticks1, ticks2):
+        return ticks1 - ticks2
@@ -0,0 +1,276 @@
+"""
+ubx.py
+u-blox UBX binary parser, a drop in for MicropyGPS when the receiver is
+set to send NAV-PVT frames instead of NMEA sentences
+
+  gps = UBXParser()
+  gps_in = GPSIngest(uart, gps)
+
+One 100 byte NAV-PVT frame carries everything RMC and GGA do, as
+integers. Decoding it is one struct.unpack_from() on a memoryview over
+the receive buffer, no text is split and no floats are parsed, and the
+position arrives as 1e-7 degree integers already. The parser keeps the
+MicropyGPS attributes the Quadcorder reads: latitude_e7, longitude_e7,
+latitude_decimal, longitude_decimal, speed, course, altitude, hdop,
+satellites_in_use, timestamp, date, valid, fix_type, fix_stat, fix_time
+"""
+from struct import unpack_from
+
+from gps_config import ubx_checksum
+from ticks import ticks_diff, ticks_ms
+
+UBX_SYNC = b'\xb5\x62'
+UBX_CLASS_NAV = 0x01
+UBX_NAV_PVT = 0x07
+NAV_PVT_LENGTH = 92
+
+# NAV-PVT up to pDOP: iTOW, year, month, day, hour, min, sec, valid, tAcc,
+# nano, fixType, flags, flags2, numSV, lon, lat, height, hMSL, hAcc,
+# vAcc, velN, velE, velD, gSpeed, headMot, sAcc, headAcc, pDOP
+NAV_PVT_FORMAT = '<IHBBBBBBIiBBBBiiiiIIiiiiiIIH'
+
+# NAV-PVT flags
+PVT_GNSS_FIX_OK = 0x01
+PVT_DIFF_SOLN = 0x02
+
+# mm/s to knots, mph and km/h
+MMS_TO_KNOTS = 0.001943844
+MMS_TO_MPH = 0.002236936
+MMS_TO_KMH = 0.0036
+
+
+class UBXParser():
+    """
+    UBX frame parser with MicropyGPS's fix attributes
+      frames are collected from update_buffer() or update_bytes() and
+      any frame with a bad Fletcher checksum is dropped. only NAV-PVT is
+      decoded, other frames are stepped over without checksumming
+    """
+
+    # Longest payload accepted, a longer length field is taken as noise
+    PAYLOAD_LIMIT = 256
+
+    def __init__(self, local_offset=0):
+        """
+        local_offset - hours added to the UTC timestamp, as MicropyGPS
+        """
+        self.local_offset = local_offset
+
+        # receive buffer, room for a whole frame plus a chunk behind it
+        self._rx = bytearray(2 * (self.PAYLOAD_LIMIT + 8))
+        self._mv = memoryview(self._rx)
+        self._rx_len = 0
+
+        # Frame statistics
+        self.crc_fails = 0
+        self.clean_sentences = 0
+        self.parsed_sentences = 0
+        self.skipped_sentences = 0
+        self.bytes_processed = 0
+
+        # Fix statistics
+        self.fix_time = 0
+        self.has_fix = False
+        self.boot_ticks = ticks_ms()
+        self.first_fix_ms = -1
+        self.fix_losses = 0
+
+        # Time
+        self.itow = 0
+        self.timestamp = [0, 0, 0.0]
+        self.date = (0, 0, 0)
+
+        # Position/Motion
+        self.latitude_e7 = 0
+        self.longitude_e7 = 0
+        self.speed = [0.0, 0.0, 0.0]
+        self.course = 0.0
+        self.altitude = 0.0
+        self.geoid_height = 0.0
+        self.h_acc = 0.0
+        self.v_acc = 0.0
+
+        # Fix info
+        #   NAV-PVT has no HDOP, hdop holds pDOP, which is never smaller
+        self.satellites_in_use = 0
+        self.pdop = 0.0
+        self.hdop = 0.0
+        self.valid = False
+        self.fix_stat = 0
+        self.fix_type = 1
+
+    ########################################
+    # Position
+    ########################################
+    @property
+    def latitude_decimal(self):
+        return self.latitude_e7 / 10000000
+
+    @property
+    def longitude_decimal(self):
+        return self.longitude_e7 / 10000000
+
+    @property
+    def latitude(self):
+        """
+        [degrees, minutes, hemisphere], MicropyGPS's ddm format
+        """
+        return _ddm(self.latitude_e7, 'N', 'S')
+
+    @property
+    def longitude(self):
+        return _ddm(self.longitude_e7, 'E', 'W')
+
+    ########################################
+    # Frame collection
+    ########################################
+    def update_bytes(self, buf):
+        """
+        Process a whole buffer of raw bytes, as MicropyGPS. Returns a list
+        of the frame types decoded from it, 'PVT' for each NAV-PVT, empty
+        if none
+        """
+        return self.update_buffer(buf, len(buf))
+
+    def update_buffer(self, buf, nbytes):
+        """
+        Add nbytes of buf to the receive buffer and decode every complete
+        frame, copying through a memoryview so buf is never sliced.
+        Returns a list of the decoded frame types
+        """
+        parsed = []
+        self.bytes_processed += nbytes
+        rx = self._rx
+        mv = memoryview(buf)
+        start = 0
+        while start < nbytes:
+            n = min(nbytes - start, len(rx) - self._rx_len)
+            rx[self._rx_len:self._rx_len + n] = mv[start:start + n]
+            self._rx_len += n
+            start += n
+            self._scan(parsed)
+        return parsed
+
+    def resync(self):
+        """
+        Drop a half received frame
+        """
+        self._rx_len = 0
+
+    def _scan(self, parsed):
+        """
+        Decode the complete frames in the receive buffer, appending their
+        types to parsed, and move what is left of it, a partial frame at
+        most, to the front
+        """
+        rx = self._rx
+        n = self._rx_len
+        i = 0
+        while True:
+            i = rx.find(UBX_SYNC, i, n)
+            if i < 0:
+                # keep a trailing first sync char
+                i = n - 1 if n and rx[n - 1] == 0xB5 else n
+                break
+            if i + 6 > n:
+                break
+
+            length = rx[i + 4] | rx[i + 5] << 8
+            if length > self.PAYLOAD_LIMIT:
+                i += 2
+                continue
+            end = i + 6 + length
+            if end + 2 > n:
+                break
+
+            if rx[i + 2] == UBX_CLASS_NAV and rx[i + 3] == UBX_NAV_PVT and length == NAV_PVT_LENGTH:
+                if ubx_checksum(rx, i + 2, end) == (rx[end], rx[end + 1]):
+                    self.clean_sentences += 1
+                    self._nav_pvt(i + 6)
+                    parsed.append('PVT')
+                    i = end + 2
+                else:
+                    self.crc_fails += 1
+                    i += 2
+            else:
+                self.skipped_sentences += 1
+                i = end + 2
+
+        if i >= n:
+            self._rx_len = 0
+        elif i > 0:
+            rx[0:n - i] = rx[i:n]
+            self._rx_len = n - i
+
+    ########################################
+    # Messages
+    ########################################
+    def _nav_pvt(self, offset):
+        (itow, year, month, day, hour, minute, second, valid_flags, t_acc,
+         nano, fix_type, flags, flags2, num_sv, lon, lat, height, h_msl, h_acc,
+         v_acc, vel_n, vel_e, vel_d, g_speed, head_mot, s_acc, head_acc,
+         p_dop) = unpack_from(NAV_PVT_FORMAT, self._mv, offset)
+        self.parsed_sentences += 1
+
+        self.itow = itow
+        self.timestamp = [(hour + self.local_offset) % 24, minute, second + nano / 1000000000]
+        self.date = (day, month, year % 100)
+        self.satellites_in_use = num_sv
+        self.pdop = p_dop / 100
+        self.hdop = self.pdop
+
+        fix_ok = flags & PVT_GNSS_FIX_OK and 2 <= fix_type <= 4
+        if not fix_ok:
+            self.valid = False
+            self.fix_stat = 0
+            self.fix_type = 1
+            self.lost_fix()
+            return
+
+        self.latitude_e7 = lat
+        self.longitude_e7 = lon
+        self.altitude = h_msl / 1000
+        self.geoid_height = (height - h_msl) / 1000
+        self.h_acc = h_acc / 1000
+        self.v_acc = v_acc / 1000
+        self.speed = [g_speed * MMS_TO_KNOTS, g_speed * MMS_TO_MPH, g_speed * MMS_TO_KMH]
+        self.course = head_mot / 100000
+        self.valid = True
+        self.fix_stat = 2 if flags & PVT_DIFF_SOLN else 1
+        # 4 is GNSS plus dead reckoning, a 3D fix
+        self.fix_type = 3 if fix_type == 4 else fix_type
+        self.new_fix_time()
+
+    ########################################
+    # Fix timing, as MicropyGPS
+    ########################################
+    def new_fix_time(self):
+        self.fix_time = ticks_ms()
+        if not self.has_fix:
+            self.has_fix = True
+            if self.first_fix_ms < 0:
+                self.first_fix_ms = ticks_diff(self.fix_time, self.boot_ticks)
+
+    def lost_fix(self):
+        if self.has_fix:
+            self.has_fix = False
+            self.fix_losses += 1
+
+    def time_since_fix(self):
+        """
+        Milliseconds since the last frame with a valid fix, -1 if there
+        has been none
+        """
+        if self.fix_time == 0:
+            return -1
+        return ticks_diff(ticks_ms(), self.fix_time)
+
+
+def _ddm(value_e7, positive, negative):
+    """
+    Signed 1e-7 degrees as [degrees, minutes, hemisphere]
+    """
+    hemisphere = positive if value_e7 >= 0 else negative
+    value_e7 = abs(value_e7)
+    degrees = value_e7 // 10000000
+    return [degrees, (value_e7 - degrees * 10000000) * 60 / 10000000, hemisphere]